@@ -0,0 +1,96 @@
+# benchmarks/bench_callback_data.py
+# Проверка и замер кодека подписанных callback_data (utils/callback_data.py):
+# кодирование/декодирование без потерь на случайных состояниях, лимит
+# Telegram в 64 байта в худшем случае, отказ при подделке и чужой версии.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_callback_data [--cases 20000]
+import argparse
+import base64
+import random
+import time
+
+from utils.callback_data import (
+    CallbackState, InvalidCallback, MAX_CALLBACK_BYTES, encode_callback, decode_callback,
+)
+
+ACTIONS = ["bar", "svc", "sdone", "chb", "day", "earl", "hour", "chd", "min", "chh", "chs", "conf"]
+# Сколько услуг у мастера помещается в маску при самом длинном действии
+MAX_SERVICES = 120
+
+def random_state(rnd):
+    return CallbackState(
+        rnd.randint(1, 2**32 - 1),
+        barber_id=rnd.choice([None, rnd.randint(1, 2**32 - 1)]),
+        any_barber=rnd.random() < 0.3,
+        services=rnd.getrandbits(rnd.choice([0, 8, 40, MAX_SERVICES])),
+        date=rnd.choice([None, f"{rnd.randint(2024, 2030)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"]),
+        time=rnd.choice([None, rnd.randrange(0, 24 * 60, 5)]),
+        arg=rnd.randint(0, 2**16 - 1),
+        catalog=rnd.getrandbits(32),
+    )
+
+def tamper(data, rnd):
+    action, _, token = data.partition(":")
+    raw = bytearray(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    raw[rnd.randrange(len(raw))] ^= 1 << rnd.randrange(8)
+    return f"{action}:{base64.urlsafe_b64encode(bytes(raw)).rstrip(b'=').decode()}"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=20000)
+    args = parser.parse_args()
+    rnd = random.Random(1)
+
+    cases = [(rnd.choice(ACTIONS), random_state(rnd)) for _ in range(args.cases)]
+    t0 = time.perf_counter()
+    encoded = [encode_callback(action, state) for action, state in cases]
+    encode_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    decoded = [decode_callback(data) for data in encoded]
+    decode_time = time.perf_counter() - t0
+
+    # Без потерь
+    for (action, state), (got_action, got_state) in zip(cases, decoded):
+        assert (action, state) == (got_action, got_state), (action, state, got_state)
+    sizes = [len(data.encode()) for data in encoded]
+    assert max(sizes) <= MAX_CALLBACK_BYTES
+
+    # Худший случай: самое длинное действие, все поля и полная маска
+    worst = encode_callback("sdone", CallbackState(
+        2**32 - 1, barber_id=2**32 - 1, any_barber=True, services=2**MAX_SERVICES - 1,
+        date="2030-12-31", time=23 * 60 + 55, arg=2**16 - 1, catalog=2**32 - 1,
+    ))
+    try:
+        encode_callback("sdone", CallbackState(1, services=2**(MAX_SERVICES + 8) - 1))
+        raise AssertionError("oversized callback_data was accepted")
+    except ValueError:
+        pass
+
+    # Подделка: изменённый бит, чужое действие, мусор
+    rejected = 0
+    for data in encoded[:2000]:
+        action, _, token = data.partition(":")
+        other = "conf" if action != "conf" else "svc"
+        for forged in (tamper(data, rnd), f"{other}:{token}", data[:-4]):
+            try:
+                decode_callback(forged)
+            except InvalidCallback:
+                rejected += 1
+    assert rejected == 6000, rejected
+    for junk in ("", "svc", "svc:", "svc:!!!", "salon_12", "svc:AAAA"):
+        try:
+            decode_callback(junk)
+            raise AssertionError(f"junk accepted: {junk!r}")
+        except InvalidCallback:
+            pass
+
+    n = len(cases)
+    print(f"round-trip: {n} states, all equal")
+    print(f"size:       avg {sum(sizes) / n:.1f} B, max {max(sizes)} B, "
+          f"worst case {len(worst.encode())} B (limit {MAX_CALLBACK_BYTES})")
+    print(f"forgery:    {rejected} of 6000 tampered callbacks rejected")
+    print(f"speed:      encode {encode_time / n * 1e6:.2f} us, decode {decode_time / n * 1e6:.2f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_callback_router.py
+# Стоимость диспетчеризации inline-кнопок: прежняя цепочка
+# CallbackQueryHandler с регулярными выражениями (проверка по порядку,
+# затем повторный разбор callback_data в хендлере) против одного
+# CallbackRouter (utils/callback_router.py). Поток — смесь подписанных кнопок
+# всех действий, "salon_N", "cancel_booking", подделанных и чужих данных,
+# обёрнутых в настоящие telegram.Update.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_callback_router [--updates 20000] [--seed 1]
+import argparse
+import random
+import re
+import time
+
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler
+
+from utils.callback_data import (
+    CallbackState, InvalidCallback, decode_callback, encode_callback,
+)
+from utils.callback_router import CallbackRouter
+
+# (действия, как в прежнем main.py) — порядок важен для цепочки
+SIGNED_GROUPS = [
+    ("bar",), ("svc", "sdone"), ("chb",), ("day", "earl"), ("hour", "chd"),
+    ("min",), ("chh",), ("chs",), ("conf",),
+]
+ACTIONS = [action for group in SIGNED_GROUPS for action in group]
+
+def callback_pattern(*actions):
+    """Регулярное выражение прежних CallbackQueryHandler: подписанные данные этих действий."""
+    return re.compile(r"^(%s):[A-Za-z0-9_-]+$" % "|".join(re.escape(a) for a in actions))
+
+async def noop(*args):
+    pass
+
+def make_stream(count, rng):
+    user = User(7, "U", False)
+    stream = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.80:
+            state = CallbackState(
+                rng.randint(1, 500), barber_id=rng.randint(1, 5000),
+                services=rng.getrandbits(rng.randint(1, 40)),
+                date="2025-01-%02d" % rng.randint(1, 28), time=rng.randrange(0, 1440, 5),
+                arg=rng.randint(0, 30),
+            )
+            data = encode_callback(rng.choice(ACTIONS), state)
+        elif kind < 0.88:
+            data = f"salon_{rng.randint(1, 500)}"
+        elif kind < 0.92:
+            data = "cancel_booking"
+        elif kind < 0.96:
+            data = encode_callback("day", CallbackState(1))
+            data = data[:-2] + ("AA" if data[-2:] != "AA" else "BB")
+        else:
+            data = rng.choice(["admin_menu", "lang_ru", "salon_x", "noop"])
+        query = CallbackQuery(str(i), user, "inst", data=data)
+        stream.append(Update(i, callback_query=query))
+    return stream
+
+def regex_chain():
+    handlers = [CallbackQueryHandler(noop, pattern=callback_pattern(*group)) for group in SIGNED_GROUPS]
+    handlers.append(CallbackQueryHandler(noop, pattern="^salon_.*"))
+    handlers.append(CallbackQueryHandler(noop, pattern="^cancel_booking$"))
+    return handlers
+
+def dispatch_chain(handlers, update):
+    for handler in handlers:
+        if handler.check_update(update):
+            data = update.callback_query.data
+            # Хендлер сам разбирал data заново
+            if ":" in data:
+                try:
+                    return decode_callback(data)
+                except InvalidCallback:
+                    return None
+            return data.split("_")
+    return None
+
+def make_router():
+    router = CallbackRouter(noop)
+    for group in SIGNED_GROUPS:
+        router.signed(group, noop)
+    return router.route("salon", noop, int).route("cancel_booking", noop)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    stream = make_stream(args.updates, random.Random(args.seed))
+    chain, router = regex_chain(), make_router()
+
+    t0 = time.perf_counter()
+    for update in stream:
+        dispatch_chain(chain, update)
+    chain_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for update in stream:
+        result = router.check_update(update)
+        if result and result[0] is not None:
+            result[0].hits += 1
+        elif result:
+            router.invalid += 1
+    router_s = time.perf_counter() - t0
+
+    n = len(stream)
+    print(f"{n} callback updates")
+    print(f"regex chain: {chain_s / n * 1e6:6.2f} us/update")
+    print(f"router:      {router_s / n * 1e6:6.2f} us/update (x{chain_s / router_s:.2f})")
+    print(f"route hits:  {router.stats()}")
+
+if __name__ == "__main__":
+    main()
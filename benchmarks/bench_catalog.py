@@ -0,0 +1,128 @@
+# benchmarks/bench_catalog.py
+# Каталог салонов: сырые dict из JSON против моделей utils/models.py.
+# Сравниваются время разбора, занимаемая память и поиск на горячих путях
+# (мастер по id, услуги мастера, салон по id).
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_catalog [--salons 200] [--barbers 12] [--services 40]
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from utils.models import Salon, SalonList
+
+def make_salon(salon_id, barbers, services, categories=6, seed=0):
+    rnd = random.Random(seed + salon_id)
+    return {
+        "id": salon_id,
+        "name": f"Salon {salon_id}",
+        "mod": "category",
+        "appointment_mod": "handler",
+        "telegram_barbersMod": "with_images",
+        "opening_hours": {day: {"open": "10:00", "close": "20:00"} for day in
+                          ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday")},
+        "barbers": [{
+            "id": salon_id * 1000 + i,
+            "name": f"Barber {i}",
+            "description": "Опытный мастер, стрижки и бороды",
+            "avatar": f"https://reservon.am/media/barbers/{salon_id}_{i}.jpg",
+            "categories": rnd.sample(range(1, categories + 1), rnd.randint(1, 3)),
+        } for i in range(barbers)],
+        "services": [{
+            "id": salon_id * 1000 + i,
+            "name": f"Service {i}",
+            "category": rnd.randint(1, categories),
+            "duration": rnd.choice(["00:15:00", "00:30:00", "00:45:00", "01:00:00"]),
+        } for i in range(services)],
+    }
+
+def measure_memory(build):
+    """Память, занятая результатом build() (байт, по tracemalloc)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def timeit(func, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - t0) / repeat
+
+# Поиск так, как он был написан по сырому JSON в хендлерах
+def raw_barber(salon, barber_id):
+    return next((b for b in salon["barbers"] if str(b["id"]) == barber_id), None)
+
+def raw_barber_services(salon, barber_id):
+    barber = raw_barber(salon, barber_id)
+    allowed = barber.get("categories", [])
+    return [s for s in salon["services"] if s.get("category") in allowed]
+
+def raw_salon(salons, salon_id):
+    return next((s for s in salons if str(s["id"]) == salon_id), None)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--salons", type=int, default=200)
+    parser.add_argument("--barbers", type=int, default=12)
+    parser.add_argument("--services", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    details = [make_salon(i, args.barbers, args.services) for i in range(1, args.salons + 1)]
+    blobs = [json.dumps(d, ensure_ascii=False) for d in details]
+    salons_blob = json.dumps([{"id": d["id"], "name": d["name"]} for d in details])
+    del details
+
+    # Разбор: json.loads против json.loads + модели (раз на обновление каталога)
+    t0 = time.perf_counter()
+    raw = [json.loads(b) for b in blobs]
+    raw_parse = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    models = [Salon.from_dict(json.loads(b)) for b in blobs]
+    model_parse = time.perf_counter() - t0
+
+    # Память того, что остаётся в кэше
+    raw, raw_mem = measure_memory(lambda: [json.loads(b) for b in blobs])
+    models, model_mem = measure_memory(lambda: [Salon.from_dict(json.loads(b)) for b in blobs])
+
+    # Поиск на горячих путях (последний элемент — худший случай для перебора)
+    raw_details, model_details = raw[-1], models[-1]
+    barber_id = str(raw_details["barbers"][-1]["id"])
+    raw_list = json.loads(salons_blob)
+    model_list = SalonList.from_list(raw_list)
+    salon_id = str(raw_list[-1]["id"])
+
+    assert raw_barber(raw_details, barber_id)["name"] == model_details.barber(barber_id).name
+    assert [s["id"] for s in raw_barber_services(raw_details, barber_id)] == \
+        [s.id for s in model_details.services_for_barber(barber_id)]
+    assert raw_salon(raw_list, salon_id)["name"] == model_list.get(salon_id).name
+
+    rows = [
+        ("barber by id", lambda: raw_barber(raw_details, barber_id),
+         lambda: model_details.barber(barber_id)),
+        ("barber services", lambda: raw_barber_services(raw_details, barber_id),
+         lambda: model_details.services_for_barber(barber_id)),
+        ("salon by id", lambda: raw_salon(raw_list, salon_id),
+         lambda: model_list.get(salon_id)),
+    ]
+
+    n = args.salons
+    print(f"catalog: {n} salons x {args.barbers} barbers x {args.services} services")
+    print(f"parse:   raw {raw_parse / n * 1e6:.1f} us/salon, "
+          f"models {model_parse / n * 1e6:.1f} us/salon (once per refresh)")
+    print(f"memory:  raw {raw_mem / n / 1024:.1f} KiB/salon, "
+          f"models {model_mem / n / 1024:.1f} KiB/salon ({model_mem / raw_mem:.0%})")
+    for name, raw_func, model_func in rows:
+        raw_t = timeit(raw_func, args.repeat)
+        model_t = timeit(model_func, args.repeat)
+        print(f"{name + ':':17}raw {raw_t * 1e6:.2f} us, models {model_t * 1e6:.2f} us")
+
+if __name__ == "__main__":
+    main()
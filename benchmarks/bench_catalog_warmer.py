@@ -0,0 +1,103 @@
+# benchmarks/bench_catalog_warmer.py
+# Фоновый прогрев каталога (utils/catalog_warmer.py). API Reservon — имитация
+# (httpx.MockTransport) с задержкой --api-ms на запрос, ETag и ответом 304 на
+# If-None-Match. Сравниваются:
+#   - первый /start после истечения кэша без прогрева (пользователь ждёт API)
+#     и после прогрева (ответ из памяти);
+#   - полный прогрев (200 + JSON) и повторный, когда каталог не изменился (304).
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_catalog_warmer [--salons 50] [--api-ms 60] [--concurrency 4]
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import httpx
+
+import utils.api as api
+from benchmarks.bench_catalog import make_salon
+from utils.catalog_warmer import CatalogWarmer
+
+class FakeApi:
+    def __init__(self, salons, api_ms):
+        self.api_ms = api_ms
+        self.details = {
+            f"/salons/{i}": json.dumps(make_salon(i, 12, 40)).encode() for i in range(1, salons + 1)
+        }
+        self.details["/salons"] = json.dumps([{"id": i, "name": f"Salon {i}"} for i in range(1, salons + 1)]).encode()
+        self.status = Counter()
+        self.bytes = 0
+
+    async def __call__(self, request):
+        await asyncio.sleep(self.api_ms / 1000)
+        path = request.url.path.removeprefix("/api")
+        body = self.details[path]
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        if request.headers.get("if-none-match") == etag:
+            self.status[304] += 1
+            return httpx.Response(304, headers={"etag": etag})
+        self.status[200] += 1
+        self.bytes += len(body)
+        return httpx.Response(200, content=body, headers={"etag": etag, "content-type": "application/json"})
+
+def reset_caches():
+    api._salons_cache.clear()
+    api._salon_details_cache.clear()
+    api._validators.clear()
+
+async def first_start(salon_id):
+    """То, что ждёт пользователь: список салонов и детали выбранного салона."""
+    t0 = time.perf_counter()
+    await api.get_salons()
+    await api.get_salon_details(salon_id)
+    return time.perf_counter() - t0
+
+async def run(args):
+    fake = FakeApi(args.salons, args.api_ms)
+    api._client = httpx.AsyncClient(
+        base_url=api.API_BASE_URL, transport=httpx.MockTransport(fake)
+    )
+    warmer = CatalogWarmer(interval=240, concurrency=args.concurrency, max_salons=1000)
+    salon_id = args.salons // 2
+
+    reset_caches()
+    cold = await first_start(salon_id)
+
+    reset_caches()
+    fake.status.clear()
+    fake.bytes = 0
+    t0 = time.perf_counter()
+    await warmer.warm()
+    full = time.perf_counter() - t0
+    full_status, full_bytes = dict(fake.status), fake.bytes
+    warm = await first_start(salon_id)
+
+    fake.status.clear()
+    fake.bytes = 0
+    before = api._salon_details_cache.peek(str(salon_id))
+    t0 = time.perf_counter()
+    await warmer.warm()
+    conditional = time.perf_counter() - t0
+    # 304: в кэше тот же объект, разбор JSON не повторялся
+    assert api._salon_details_cache.peek(str(salon_id)) is before
+
+    print(f"{args.salons} salons, {args.api_ms:g} ms per API call, concurrency {args.concurrency}")
+    print(f"first /start, cold cache   {cold * 1000:8.1f} ms")
+    print(f"first /start, after warm   {warm * 1000:8.1f} ms")
+    print(f"full warm-up               {full * 1000:8.1f} ms, {full_status}, {full_bytes / 1024:.0f} KiB")
+    print(f"unchanged catalog refresh  {conditional * 1000:8.1f} ms, {dict(fake.status)}, {fake.bytes / 1024:.0f} KiB")
+    print(f"warmer: {warmer.stats()}, not modified: {api.get_cache_stats()['catalog_not_modified']}")
+    await api.close_client()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--salons", type=int, default=50)
+    parser.add_argument("--api-ms", type=float, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
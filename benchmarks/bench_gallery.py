@@ -0,0 +1,117 @@
+# benchmarks/bench_gallery.py
+# Вызовы Telegram API и время на один показ списка мастеров в каждом режиме
+# telegram_barbersMod: with_images (фото на мастера), media_group (альбом +
+# клавиатура) и collage (одно фото). choose_barbers вызывается как есть;
+# каталог салона, медиасервер (MockTransport с ETag) и Telegram — имитация.
+# Первый показ собирает коллаж и получает file_id, повторные идут из кэша.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_gallery [--barbers 12] [--views 5] [--api-ms 40]
+import argparse
+import asyncio
+import io
+import tempfile
+import time
+import types
+from collections import Counter
+
+import httpx
+
+import utils.api as api
+import utils.media_cache as media
+from utils.media_cache import MediaCache
+from utils.session import session_store
+from utils.thumbnails import thumbnail_service
+
+def sample_jpeg(seed):
+    from PIL import Image
+    output = io.BytesIO()
+    Image.new("RGB", (400, 500), ((seed * 40) % 256, 120, 200)).save(output, format="JPEG")
+    return output.getvalue()
+
+class FakeMessage:
+    def __init__(self, api_ms):
+        self.api_ms = api_ms
+        self.calls = Counter()
+        self.uploads = 0
+
+    async def _call(self, method, photos=()):
+        self.calls[method] += 1
+        self.uploads += sum(1 for p in photos if not (isinstance(p, str) and p.startswith("file-")))
+        await asyncio.sleep(self.api_ms / 1000)
+
+    @staticmethod
+    def _sent(photo):
+        return types.SimpleNamespace(photo=[types.SimpleNamespace(file_id=f"file-{abs(hash(photo))}")])
+
+    async def reply_text(self, text, **kwargs):
+        await self._call("sendMessage")
+
+    async def reply_photo(self, photo, **kwargs):
+        await self._call("sendPhoto", [photo])
+        return self._sent(photo)
+
+    async def reply_media_group(self, media, **kwargs):
+        await self._call("sendMediaGroup", [m.media for m in media])
+        return [self._sent(m.media) for m in media]
+
+async def run(mode, args):
+    from handlers.barbers import choose_barbers
+
+    images = {f"/media/{i}.jpg": sample_jpeg(i) for i in range(args.barbers)}
+
+    def media_server(request):
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"etag": '"v1"'})
+        return httpx.Response(200, content=images[request.url.path])
+
+    async def salon_details(salon_id, conditional=False):
+        return {
+            "id": 1, "name": "S", "mod": "category", "telegram_barbersMod": mode,
+            "barbers": [
+                {"id": i, "name": f"Мастер {i}", "avatar": f"https://reservon.am/media/{i}.jpg"}
+                for i in range(args.barbers)
+            ],
+            "services": [],
+        }
+
+    api._client = httpx.AsyncClient(transport=httpx.MockTransport(media_server))
+    api._fetch_salon_details = salon_details
+    api._salon_details_cache.clear()
+    media.media_cache = MediaCache(revalidate_ttl=3600, max_entries=1024)
+    import utils.gallery as gallery
+    import utils.thumbnails as thumbnails
+    gallery.media_cache = thumbnails.media_cache = media.media_cache
+    # Миниатюры — во временный каталог, а не в кэш бота
+    thumbnail_service.cache_dir = tempfile.mkdtemp(prefix="bench_gallery_")
+    thumbnail_service._index.clear()
+
+    session_store.get(7)["salon_id"] = "1"
+    results = []
+    for _ in range(args.views):
+        message = FakeMessage(args.api_ms)
+        query = types.SimpleNamespace(message=message, from_user=types.SimpleNamespace(id=7))
+        update = types.SimpleNamespace(callback_query=query, effective_user=query.from_user)
+        t0 = time.perf_counter()
+        await choose_barbers(update, None)
+        results.append((time.perf_counter() - t0, message.calls, message.uploads))
+    await api.close_client()
+    thumbnail_service.shutdown()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--barbers", type=int, default=12)
+    parser.add_argument("--views", type=int, default=5)
+    parser.add_argument("--api-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    print(f"{args.barbers} barbers, {args.views} views, {args.api_ms:g} ms per API call")
+    for mode in ("with_images", "media_group", "collage"):
+        results = asyncio.run(run(mode, args))
+        for label, (elapsed, calls, uploads) in (("first", results[0]), ("repeat", results[-1])):
+            print(f"{mode:12s} {label:6s} {sum(calls.values()):3d} API calls {dict(calls)}, "
+                  f"{uploads} uploads, {elapsed * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
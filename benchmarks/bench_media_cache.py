@@ -0,0 +1,79 @@
+# benchmarks/bench_media_cache.py
+# Отправка галереи мастеров с кэшем file_id (utils/media_cache.py) и без
+# него. «Telegram» имитируется: фото по URL стоит скачивания с медиасервера
+# (--media-ms) плюс обработки (--process-ms), фото по file_id — только вызова
+# API (--api-ms). Медиасервер отвечает на HEAD с ETag через MockTransport и
+# считает запросы; галерею открывают --views раз подряд.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_media_cache [--barbers 15] [--views 20]
+#       [--media-ms 300] [--process-ms 150] [--api-ms 40]
+import argparse
+import asyncio
+import statistics
+import time
+import types
+
+import httpx
+
+import utils.api as api
+from utils.media_cache import MediaCache
+import utils.media_cache as media
+
+class FakeTelegram:
+    def __init__(self, args):
+        self.args = args
+        self.downloads = 0
+        self.uploads = 0
+
+    async def reply_photo(self, photo, **kwargs):
+        if photo.startswith("http"):
+            self.downloads += 1
+            await asyncio.sleep((self.args.media_ms + self.args.process_ms) / 1000)
+        await asyncio.sleep(self.args.api_ms / 1000)
+        self.uploads += 1
+        file_id = f"file-{photo.rsplit('/', 1)[-1]}"
+        return types.SimpleNamespace(photo=[types.SimpleNamespace(file_id=file_id)])
+
+async def run(args, cached):
+    media_requests = []
+
+    def media_server(request):
+        media_requests.append(request.method)
+        return httpx.Response(200, headers={"etag": '"v1"'})
+
+    api._client = httpx.AsyncClient(transport=httpx.MockTransport(media_server))
+    media.media_cache = MediaCache(revalidate_ttl=3600, max_entries=1024)
+    telegram = FakeTelegram(args)
+    urls = [f"https://reservon.am/media/barbers/{i}.jpg" for i in range(args.barbers)]
+
+    views = []
+    for _ in range(args.views):
+        t0 = time.perf_counter()
+        for url in urls:
+            if cached:
+                await media.reply_photo_cached(telegram, url, caption="")
+            else:
+                await telegram.reply_photo(url, caption="")
+        views.append(time.perf_counter() - t0)
+    await api.close_client()
+    return views, telegram.downloads, len(media_requests)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--barbers", type=int, default=15)
+    parser.add_argument("--views", type=int, default=20)
+    parser.add_argument("--media-ms", type=float, default=300)
+    parser.add_argument("--process-ms", type=float, default=150)
+    parser.add_argument("--api-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    print(f"gallery of {args.barbers} photos, {args.views} views")
+    for name, cached in (("by URL", False), ("file_id cache", True)):
+        views, downloads, media_requests = asyncio.run(run(args, cached))
+        print(f"{name:14s} first view {views[0] * 1000:7.0f} ms, "
+              f"repeat views median {statistics.median(views[1:]) * 1000:7.0f} ms, "
+              f"Telegram downloads {downloads}, media server requests {media_requests}")
+
+if __name__ == "__main__":
+    main()
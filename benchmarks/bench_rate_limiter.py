@@ -0,0 +1,149 @@
+# benchmarks/bench_rate_limiter.py
+# Исходящий ограничитель (utils/ratelimit.py) против имитации Telegram с
+# flood control: несколько пользователей одновременно открывают галерею
+# мастеров (по --photos sendPhoto в свой чат), а другие пользователи в это
+# время нажимают кнопки (sendMessage / answerCallbackQuery). «Telegram»
+# отвечает RetryAfter, если в скользящем окне превышен лимит чата или общий
+# лимит, и ещё изредка — случайно (--flood-rate).
+#
+# Без ограничителя ошибки RetryAfter доходят до хендлеров; с ним — запросы
+# ждут токенов, повторяются после RetryAfter, а кнопки обгоняют фото.
+# Все лимиты и паузы ускорены в --speedup раз, чтобы замер шёл секунды.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_rate_limiter [--users 8] [--photos 15]
+#       [--clicks 60] [--speedup 10] [--flood-rate 0.01]
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+
+from telegram.error import RetryAfter
+
+from utils.ratelimit import PriorityRateLimiter
+
+# Лимиты имитации Telegram (в реальном времени): сообщений за окно 1 с
+TELEGRAM_CHAT_LIMIT = 5
+TELEGRAM_GLOBAL_LIMIT = 35
+
+class FakeTelegram:
+    def __init__(self, speedup, flood_rate, rng):
+        self.window = 1 / speedup
+        self.speedup = speedup
+        self.flood_rate = flood_rate
+        self.rng = rng
+        self.chat_sent = defaultdict(deque)
+        self.global_sent = deque()
+        self.floods = 0
+
+    @staticmethod
+    def _count(sent, now, window):
+        while sent and now - sent[0] > window:
+            sent.popleft()
+        return len(sent)
+
+    async def request(self, chat_id):
+        await asyncio.sleep(0.002)  # сеть
+        now = time.monotonic()
+        over = (
+            self._count(self.chat_sent[chat_id], now, self.window) >= TELEGRAM_CHAT_LIMIT
+            or self._count(self.global_sent, now, self.window) >= TELEGRAM_GLOBAL_LIMIT
+        )
+        if over or self.rng.random() < self.flood_rate:
+            self.floods += 1
+            # retry_after в секундах Telegram, ускоренный как и лимиты
+            raise RetryAfter(1 / self.speedup)
+        self.chat_sent[chat_id].append(now)
+        self.global_sent.append(now)
+        return True
+
+async def scenario(args, limiter):
+    rng = random.Random(args.seed)
+    telegram = FakeTelegram(args.speedup, args.flood_rate, rng)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    if limiter:
+        await limiter.initialize()
+
+    async def send(endpoint, chat_id):
+        t0 = time.monotonic()
+        try:
+            if limiter:
+                await limiter.process_request(
+                    telegram.request, (chat_id,), {}, endpoint, {"chat_id": chat_id}, None
+                )
+            else:
+                await telegram.request(chat_id)
+        except RetryAfter:
+            errors[endpoint] += 1
+            return
+        latencies[endpoint].append(time.monotonic() - t0)
+
+    async def open_gallery(chat_id):
+        await asyncio.gather(*(send("sendPhoto", chat_id) for _ in range(args.photos)))
+
+    async def click(i):
+        await asyncio.sleep(i * 0.5 / args.speedup)  # клик раз в 0.5 с
+        chat_id = 10_000 + i
+        await send("answerCallbackQuery", None)
+        await send("sendMessage", chat_id)
+
+    depth = []
+
+    async def sample():
+        while True:
+            if limiter:
+                depth.append(sum(limiter.stats()["queued"].values()))
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.ensure_future(sample())
+    t0 = time.monotonic()
+    await asyncio.gather(
+        *(open_gallery(1000 + u) for u in range(args.users)),
+        *(click(i) for i in range(args.clicks)),
+    )
+    elapsed = time.monotonic() - t0
+    sampler.cancel()
+    if limiter:
+        await limiter.shutdown()
+    return elapsed, latencies, errors, telegram.floods, max(depth, default=0)
+
+def report(name, result, limiter):
+    elapsed, latencies, errors, floods, depth = result
+    print(f"{name}: {elapsed:.2f} s, RetryAfter from Telegram {floods}, "
+          f"surfaced to handlers {dict(errors) or 0}")
+    for endpoint, values in sorted(latencies.items()):
+        values.sort()
+        p95 = values[int(len(values) * 0.95) - 1] if len(values) > 1 else values[0]
+        print(f"  {endpoint:20s} n={len(values):4d}  median {statistics.median(values) * 1000:7.1f} ms"
+              f"  p95 {p95 * 1000:7.1f} ms")
+    if limiter:
+        stats = limiter.stats()
+        print(f"  peak queue depth {depth}, retries {stats['retries']}, "
+              f"failed {stats['failed']}, sent {stats['sent']}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--photos", type=int, default=15)
+    parser.add_argument("--clicks", type=int, default=60)
+    parser.add_argument("--speedup", type=float, default=10)
+    parser.add_argument("--flood-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.users} galleries x {args.photos} photos, {args.clicks} clicks, "
+          f"limits x{args.speedup:g}")
+    report("no limiter", asyncio.run(scenario(args, None)), None)
+    limiter = PriorityRateLimiter(
+        global_per_second=30 * args.speedup,
+        chat_per_second=1 * args.speedup,
+        group_per_minute=20 * args.speedup,
+    )
+    report("PriorityRateLimiter", asyncio.run(scenario(args, limiter)), limiter)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# benchmarks/bench_slots.py
+# Сравнение локального расчёта слотов (utils/slots.py) с серверными
+# /salons/availability/ и /salons/get_nearest_available_time/.
+# Сервер подменяется локальной заглушкой с тем же API.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_slots [--bookings 12] [--latency-ms 0]
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STEP = 5
+SALON_ID = 1
+BARBER_ID = 7
+DATE = "2025-03-14"
+DURATIONS = [15, 30, 45, 60, 90, 120]
+HOURS = list(range(8, 23))
+
+def make_schedule(bookings, seed=42):
+    """Рабочий день 10:00-20:00 и случайные записи, выровненные по сетке."""
+    rnd = random.Random(seed)
+    working = (10 * 60, 20 * 60)
+    busy = []
+    for _ in range(bookings):
+        start = rnd.randrange(working[0], working[1], STEP)
+        busy.append((start, start + rnd.choice([15, 20, 30, 45, 60])))
+    return working, busy
+
+def naive_starts(schedule, duration):
+    """Эталон: перебор всех стартов, как это делает сервер."""
+    (open_min, close_min), busy = schedule
+    starts = []
+    for start in range(open_min, close_min, STEP):
+        end = start + duration
+        if end > close_min:
+            break
+        if all(end <= b_start or start >= b_end for b_start, b_end in busy):
+            starts.append(start)
+    return starts
+
+def make_handler(schedule, latency):
+    class StandInHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            duration = int(body.get("total_service_duration") or 30)
+            starts = naive_starts(schedule, duration)
+            if self.path.endswith("/salons/availability/"):
+                result = {"available_minutes": {
+                    str(h): [s % 60 for s in starts if s // 60 == int(h)]
+                    for h in body.get("hours", [])
+                }}
+            elif self.path.endswith("/salons/get_nearest_available_time/"):
+                target = int(body["chosen_hour"]) * 60
+                before = [s for s in starts if s <= target]
+                after = [s for s in starts if s >= target]
+                result = {
+                    "nearest_before": f"{before[-1] // 60:02d}:{before[-1] % 60:02d}" if before else None,
+                    "nearest_after": f"{after[0] // 60:02d}:{after[0] % 60:02d}" if after else None,
+                }
+            else:
+                self.send_error(404)
+                return
+            if latency:
+                time.sleep(latency)
+            data = json.dumps(result).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return StandInHandler
+
+def payload_for(duration, hours):
+    return {
+        "salon_id": SALON_ID,
+        "date": DATE,
+        "hours": hours,
+        "booking_details": [{"categoryId": None, "services": [], "barberId": BARBER_ID, "duration": duration}],
+        "total_service_duration": duration
+    }
+
+async def run(args):
+    from utils import api
+    from utils.slots import minutes_to_hm
+
+    client = api.get_client()
+    remote_times, local_times = [], []
+    mismatches = 0
+    queries = 0
+
+    # Загрузка дня для локального движка: один запрос
+    t0 = time.perf_counter()
+    day = await api.get_day_availability(SALON_ID, BARBER_ID, DATE)
+    load_time = time.perf_counter() - t0
+
+    for duration in DURATIONS:
+        for hour in HOURS:
+            queries += 1
+            t0 = time.perf_counter()
+            r = await client.post("/salons/availability/", json=payload_for(duration, [hour]))
+            remote_minutes = r.json()["available_minutes"][str(hour)]
+            r = await client.post("/salons/get_nearest_available_time/", json={
+                **payload_for(duration, []), "chosen_hour": hour
+            })
+            remote_nearest = r.json()
+            remote_times.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            local_minutes = day.free_starts_in_hour(hour, duration)
+            before, after = day.nearest_start(hour, duration)
+            local_times.append(time.perf_counter() - t0)
+
+            local_nearest = {
+                "nearest_before": minutes_to_hm(before) if before is not None else None,
+                "nearest_after": minutes_to_hm(after) if after is not None else None,
+            }
+            if local_minutes != remote_minutes or local_nearest != remote_nearest:
+                mismatches += 1
+                print(f"MISMATCH duration={duration} hour={hour}: "
+                      f"{local_minutes} {local_nearest} != {remote_minutes} {remote_nearest}")
+
+    await api.close_client()
+
+    print(f"queries:           {queries} (hour minutes + nearest time each)")
+    print(f"mismatches:        {mismatches}")
+    print(f"local day load:    {load_time * 1000:.2f} ms (one request)")
+    print(f"remote per query:  median {statistics.median(remote_times) * 1000:.3f} ms, "
+          f"total {sum(remote_times) * 1000:.1f} ms")
+    print(f"local per query:   median {statistics.median(local_times) * 1e6:.1f} us, "
+          f"total {sum(local_times) * 1000:.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, default=12)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="искусственная задержка ответа заглушки")
+    args = parser.parse_args()
+
+    schedule = make_schedule(args.bookings)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(schedule, args.latency_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Адрес API нужно подменить до импорта config/utils.api
+    os.environ["API_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/api"
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
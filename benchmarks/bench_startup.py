@@ -0,0 +1,126 @@
+# benchmarks/bench_startup.py
+# Время холодного старта бота: импорт main, сборка Application
+# (main.build_application) и готовность к первому обновлению — initialize,
+# post_init (регистрация команд, хранилище), start и обработка первого
+# обновления. Каждый замер — отдельный процесс; Telegram не нужен: бот —
+# ExtBot без сети. Дополнительно — самые медленные импорты (python -X importtime)
+# и загружены ли при старте тяжёлые модули, которые должны грузиться лениво.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_startup [--runs 5] [--top 10]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LAZY_MODULES = ("PIL", "requests")
+
+def run_child():
+    t0 = time.perf_counter()
+    import asyncio
+    from telegram import Chat, Message, Update, User
+    from telegram.ext import ExtBot
+    import main
+    t_import = time.perf_counter()
+
+    class OfflineBot(ExtBot):
+        async def get_me(self, *args, **kwargs):
+            self._bot_user = User(1, "bench", True, username="bench_bot")
+            return self._bot_user
+
+        async def set_my_commands(self, *args, **kwargs):
+            return True
+
+    app = main.build_application(bot=OfflineBot("1:bench"))
+    t_build = time.perf_counter()
+
+    async def start():
+        await app.initialize()
+        await app.post_init(app)
+        await app.start()
+        t_ready = time.perf_counter()
+        user = User(7, "U", False)
+        message = Message(1, None, Chat(7, "private"), from_user=user, text="hello")
+        message.set_bot(app.bot)
+        await app.process_update(Update(1, message=message))
+        t_first = time.perf_counter()
+        await app.stop()
+        await app.shutdown()
+        await main.post_shutdown(app)
+        return t_ready, t_first
+
+    t_ready, t_first = asyncio.run(start())
+    print(json.dumps({
+        "import": t_import - t0,
+        "build": t_build - t_import,
+        "ready": t_ready - t0,
+        "first_update": t_first - t0,
+        "lazy_loaded": [name for name in LAZY_MODULES if name in sys.modules],
+    }))
+
+def child_env(tmp):
+    return dict(
+        os.environ,
+        BENCH_STARTUP_CHILD="1",
+        BOT_WORKERS="0",
+        WORKER_INDEX="",
+        PERSISTENCE_PATH=os.path.join(tmp, "bot_state.sqlite3"),
+    )
+
+def measure(runs):
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup"],
+                env=child_env(tmp), capture_output=True, text=True, check=True,
+            )
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            result["process"] = time.perf_counter() - t0
+            results.append(result)
+    return results
+
+def slowest_imports(top):
+    with tempfile.TemporaryDirectory() as tmp:
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            env=child_env(tmp), capture_output=True, text=True, check=True,
+        )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.strip()))
+    # Модули проекта и корневые пакеты зависимостей (без main — это всё сразу)
+    own = ("handlers.", "utils.", "config", "states")
+    picked = [(us, name) for us, name in rows
+              if name != "main" and ("." not in name or name.startswith(own))]
+    return sorted(picked, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    print(f"{args.runs} cold starts (median, ms):")
+    for key in ("import", "build", "ready", "first_update", "process"):
+        print(f"  {key:13s} {statistics.median(r[key] for r in results) * 1000:8.1f}")
+    print(f"  lazy modules loaded at startup: {results[0]['lazy_loaded'] or 'none'}")
+    print("slowest top-level imports (cumulative, ms):")
+    for us, name in slowest_imports(args.top):
+        print(f"  {us / 1000:8.1f}  {name}")
+
+if __name__ == "__main__":
+    if os.environ.get("BENCH_STARTUP_CHILD"):
+        run_child()
+    else:
+        main()
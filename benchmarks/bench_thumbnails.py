@@ -0,0 +1,140 @@
+# benchmarks/bench_thumbnails.py
+# Прежний compress_image (requests.get + PIL прямо в event loop, по одному
+# мастеру) против сервиса миниатюр (utils/thumbnails.py): холодный кэш и
+# повторный показ. Картинки отдаёт локальный HTTP-сервер с задержкой
+# --latency-ms и ETag (в отдельном процессе, чтобы не делить GIL с ботом).
+# Пока идёт обработка, фоновая задача тикает каждые
+# 10 мс и меряет, насколько event loop опаздывал, — это задержка для всех
+# остальных пользователей бота.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_thumbnails [--barbers 15] [--latency-ms 80] [--source-px 1600]
+import argparse
+import asyncio
+import io
+import multiprocessing
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.api import close_client, get_client
+from utils.thumbnails import ThumbnailService
+import utils.thumbnails as thumbnails
+
+def make_images(count, px):
+    from PIL import Image
+    images = {}
+    for i in range(count):
+        output = io.BytesIO()
+        image = Image.effect_noise((px, px), 60 + i).convert("RGB")
+        image.save(output, format="JPEG", quality=90)
+        images[f"/media/{i}.jpg"] = output.getvalue()
+    return images
+
+def serve(images, latency, port):
+    class Handler(BaseHTTPRequestHandler):
+        def _headers(self, body):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+
+        def do_HEAD(self):
+            time.sleep(latency)
+            self._headers(images[self.path])
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = images[self.path]
+            self._headers(body)
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port.put(server.server_address[1])
+    server.serve_forever()
+
+def start_server(images, latency):
+    """Сервер картинок в дочернем процессе; возвращает (процесс, порт)."""
+    context = multiprocessing.get_context("spawn")
+    port = context.Queue()
+    process = context.Process(target=serve, args=(images, latency, port), daemon=True)
+    process.start()
+    return process, port.get()
+
+def compress_image(image_url, size=(128, 128)):
+    """Прежняя реализация из handlers/salon.py и handlers/language.py."""
+    import requests
+    from PIL import Image
+    from io import BytesIO
+
+    response = requests.get(image_url)
+    image = Image.open(BytesIO(response.content))
+    image.thumbnail(size)
+    output = BytesIO()
+    image.save(output, format="JPEG")
+    output.seek(0)
+    return output
+
+async def measure(work):
+    lag = [0.0]
+    running = True
+
+    async def ticker():
+        while running:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag[0] = max(lag[0], time.perf_counter() - t0 - 0.01)
+
+    tick = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - t0
+    running = False
+    await tick
+    return elapsed, lag[0]
+
+async def run(args, urls):
+    async def legacy():
+        for url in urls:
+            compress_image(url)
+
+    service = ThumbnailService(tempfile.mkdtemp(prefix="bench_thumbs_"), args.workers, 8, 85)
+    thumbnails.thumbnail_service = service
+    # Пул процессов и HTTP-клиент в боте уже подняты — прогреваем заранее
+    await service.run(sum, [0])
+    await get_client().head(urls[0])
+
+    async def via_service():
+        await service.get_many(urls, (128, 128))
+
+    print(f"{'legacy compress_image':24s} {{:8.0f}} ms, max loop lag {{:6.0f}} ms".format(
+        *(x * 1000 for x in await measure(legacy))))
+    for label in ("service, cold cache", "service, repeat view"):
+        elapsed, lag = await measure(via_service)
+        print(f"{label:24s} {elapsed * 1000:8.0f} ms, max loop lag {lag * 1000:6.0f} ms, {service.stats()}")
+    service.shutdown()
+    await close_client()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--barbers", type=int, default=15)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--source-px", type=int, default=1600)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    images = make_images(args.barbers, args.source_px)
+    server, port = start_server(images, args.latency_ms / 1000)
+    base = f"http://127.0.0.1:{port}"
+    urls = [base + path for path in images]
+    print(f"{args.barbers} avatars {args.source_px}px, {args.latency_ms:g} ms server latency")
+    asyncio.run(run(args, urls))
+    server.terminate()
+
+if __name__ == "__main__":
+    main()
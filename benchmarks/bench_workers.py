@@ -0,0 +1,150 @@
+# benchmarks/bench_workers.py
+# Пропускная способность многопроцессного режима (utils/sharding.py) при
+# разном числе рабочих процессов. Рабочие — заглушки на том же webhook-
+# сервере (utils/webhook.py), что и бот, но без Telegram: обработчик лишь
+# нагружает процессор (--work cpu) или блокирует event loop (--work blocking,
+# как синхронные запросы/обработка картинок). Фронт — ShardRouter в этом
+# процессе; время — пока все рабочие не обработают все обновления.
+# Работа на обновление (--work-ms) должна заметно превышать стоимость
+# пересылки, иначе упираемся во фронт. В режиме cpu рабочих не больше, чем
+# доступных процессору ядер (на одном ядре процессы только делят его — бенчмарк
+# отказывается запускаться); blocking масштабируется и на одном ядре.
+#
+# Запуск из корня проекта:
+#   python -m benchmarks.bench_workers [--workers 1,2,4] [--updates 600]
+#       [--users 200] [--work cpu] [--work-ms 10]
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+def run_worker():
+    """Рабочий процесс-заглушка (запускается через spawn_workers)."""
+    from telegram import User
+    from telegram.ext import ApplicationBuilder, ExtBot, MessageHandler, filters
+    from config import WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, MAX_CONCURRENT_UPDATES
+    from utils.updates import PerUserUpdateProcessor
+    from utils.webhook import serve_webhook
+
+    class OfflineBot(ExtBot):
+        async def get_me(self, *args, **kwargs):
+            self._bot_user = User(1, "bench", True, username="bench_bot")
+            return self._bot_user
+
+    work = os.environ["BENCH_WORK"]
+    work_s = float(os.environ["BENCH_WORK_MS"]) / 1000
+    handled = [0]
+
+    async def handler(update, context):
+        if work == "blocking":
+            time.sleep(work_s)
+        else:
+            deadline = time.process_time() + work_s
+            while time.process_time() < deadline:
+                pass
+        handled[0] += 1
+
+    app = (
+        ApplicationBuilder()
+        .bot(OfflineBot("1:bench"))
+        .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .build()
+    )
+    app.add_handler(MessageHandler(filters.ALL, handler))
+    asyncio.run(serve_webhook(
+        app, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+        stats=lambda: {"handled": handled[0]},
+    ))
+
+def make_update(update_id, user_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "U"},
+            "text": "svc_1",
+        },
+    }
+
+async def measure(workers, args):
+    from utils.sharding import ShardRouter
+
+    router = ShardRouter(
+        [f"http://127.0.0.1:{args.base_port + i}/telegram" for i in range(workers)], "bench"
+    )
+    if not await router.wait_ready(timeout=60):
+        raise RuntimeError("workers did not start")
+    updates = [make_update(i, 1000 + i % args.users) for i in range(args.updates)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(data):
+        async with semaphore:
+            await router.forward(data)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(send(data) for data in updates))
+    while True:
+        health = await router.worker_health()
+        if sum(h.get("handled", 0) for h in health) >= args.updates:
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - t0
+    shares = router.stats()["forwarded"]
+    await router.close()
+    return elapsed, shares
+
+def available_cpus():
+    """Ядра, на которых процессу разрешено работать (с учётом affinity)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--updates", type=int, default=600)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--work", choices=["cpu", "blocking"], default="cpu")
+    parser.add_argument("--work-ms", type=float, default=10.0)
+    parser.add_argument("--base-port", type=int, default=18100)
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    counts = [int(w) for w in args.workers.split(",")]
+    if args.work == "cpu":
+        if cpus < 2:
+            parser.error(f"{cpus} CPU available (os.cpu_count()={os.cpu_count()}): CPU-bound "
+                         f"work cannot scale across processes; use --work blocking or a multi-core host")
+        skipped = [w for w in counts if w > cpus]
+        counts = [w for w in counts if w <= cpus]
+        if skipped:
+            print(f"skipping workers={skipped}: only {cpus} CPUs")
+
+    os.environ["BENCH_WORK"] = args.work
+    os.environ["BENCH_WORK_MS"] = str(args.work_ms)
+    from utils.sharding import spawn_workers, stop_workers
+
+    print(f"{args.updates} updates from {args.users} users, {args.work} work "
+          f"{args.work_ms} ms/update, {cpus} CPUs available (os.cpu_count()={os.cpu_count()})")
+    baseline = None
+    for workers in counts:
+        processes = spawn_workers(workers, args.base_port, "", "bench", script=__file__)
+        try:
+            elapsed, shares = asyncio.run(measure(workers, args))
+        finally:
+            stop_workers(processes)
+        throughput = args.updates / elapsed
+        baseline = baseline or throughput
+        print(f"workers={workers}: {throughput:8.1f} updates/s "
+              f"(x{throughput / baseline:.2f}), per worker {shares}")
+
+if __name__ == "__main__":
+    if os.environ.get("WORKER_INDEX"):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        run_worker()
+    else:
+        main()
@@ -0,0 +1,82 @@
+# benchmarks/post_updates.py
+# Отправка записанных обновлений Telegram (JSON Update) на локальный
+# webhook-сервер бота — сквозная проверка режима webhook без Telegram.
+#
+# Запуск бота без регистрации webhook:
+#   BOT_MODE=webhook WEBHOOK_URL= python main.py
+# Отправка (файл — один Update, список Update или JSON Lines; без файла —
+# встроенная команда /start):
+#   python -m benchmarks.post_updates [updates.json] [--url http://127.0.0.1:8080/telegram]
+#       [--user-id 1] [--repeat 1] [--concurrency 1]
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from config import WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+from utils.webhook import SECRET_HEADER
+
+def sample_update(update_id, user_id, text="/start"):
+    user = {"id": user_id, "is_bot": False, "first_name": "Test", "language_code": "ru"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": "Test"},
+            "from": user,
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else [],
+        },
+    }
+
+def load_updates(path):
+    with open(path, encoding="utf-8") as f:
+        content = f.read().strip()
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+async def run(args):
+    updates = load_updates(args.file) if args.file else [sample_update(1, args.user_id)]
+    updates = updates * args.repeat
+    headers = {SECRET_HEADER: args.secret} if args.secret else {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    statuses, latencies = {}, []
+
+    async with httpx.AsyncClient(timeout=10) as client:
+        async def post(update):
+            async with semaphore:
+                t0 = time.perf_counter()
+                r = await client.post(args.url, json=update, headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(post(update) for update in updates))
+        total = time.perf_counter() - t0
+
+        health = await client.get(httpx.URL(args.url).copy_with(path="/healthz"))
+
+    print(f"posted:   {len(updates)} updates in {total * 1000:.1f} ms, statuses {statuses}")
+    print(f"latency:  median {statistics.median(latencies) * 1000:.2f} ms, "
+          f"max {max(latencies) * 1000:.2f} ms")
+    print(f"healthz:  {health.status_code} {health.text}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", nargs="?")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
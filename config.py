@@ -1,9 +1,101 @@
 # config.py
 import os
+import hashlib
 from dotenv import load_dotenv
 
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-API_BASE_URL = "https://reservon.am/api"
+API_BASE_URL = os.getenv("API_BASE_URL", "https://reservon.am/api")
 DEFAULT_LANGUAGE = "ru"
+
+# HTTP-клиент Reservon API (секунды / количество соединений)
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "10"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", "20"))
+API_MAX_KEEPALIVE = int(os.getenv("API_MAX_KEEPALIVE", "10"))
+
+# Кэш каталога салонов: TTL, окно stale-while-revalidate (секунды) и размер
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", "300"))
+CATALOG_STALE_TTL = float(os.getenv("CATALOG_STALE_TTL", "600"))
+CATALOG_MAX_ENTRIES = int(os.getenv("CATALOG_MAX_ENTRIES", "256"))
+# Фоновый прогрев каталога (utils/catalog_warmer.py): период в секундах
+# (меньше CATALOG_TTL, 0 — выключен) и сколько салонов обновлять одновременно
+# (в многопроцессном режиме — на все рабочие процессы вместе)
+CATALOG_WARM_INTERVAL = float(os.getenv("CATALOG_WARM_INTERVAL", "240"))
+CATALOG_WARM_CONCURRENCY = int(os.getenv("CATALOG_WARM_CONCURRENCY", "4"))
+
+# Кэш свободного времени: короткий TTL, сбрасывается после бронирования
+AVAILABILITY_TTL = float(os.getenv("AVAILABILITY_TTL", "60"))
+AVAILABILITY_MAX_ENTRIES = int(os.getenv("AVAILABILITY_MAX_ENTRIES", "2048"))
+# Сколько дней запрашивать параллельно при построении списка дней
+AVAILABILITY_PREFETCH_CONCURRENCY = int(os.getenv("AVAILABILITY_PREFETCH_CONCURRENCY", "4"))
+
+# Как часто перепроверять, не сменилась ли фотография мастера, для которой
+# в кэше есть file_id Telegram (секунды, utils/media_cache.py)
+MEDIA_REVALIDATE_TTL = float(os.getenv("MEDIA_REVALIDATE_TTL", "3600"))
+
+# Коллаж мастеров (telegram_barbersMod = "collage", utils/gallery.py): размер
+# плитки в пикселях, плиток в ряд и шрифт подписей (TrueType с кириллицей)
+GALLERY_TILE_SIZE = int(os.getenv("GALLERY_TILE_SIZE", "256"))
+GALLERY_COLUMNS = int(os.getenv("GALLERY_COLUMNS", "3"))
+GALLERY_FONT_PATH = os.getenv("GALLERY_FONT_PATH", "DejaVuSans.ttf")
+
+# Миниатюры картинок (utils/thumbnails.py): каталог дискового кэша, число
+# процессов для уменьшения, сколько картинок обрабатывать одновременно, качество JPEG
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", "thumbnails")
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_CONCURRENCY = int(os.getenv("THUMBNAIL_CONCURRENCY", "8"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "85"))
+
+# Шаг сетки начала записи (минуты) для локального расчёта слотов
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "5"))
+
+# Сессии пользователей: удаляются после простоя (секунды) и по LRU сверх лимита
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", str(3 * 24 * 3600)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+# Сколько обновлений Telegram обрабатывается одновременно (обновления
+# одного пользователя всё равно выполняются по очереди)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))
+
+# Режим получения обновлений: "polling" (по умолчанию, для локальной
+# разработки) или "webhook" — встроенный HTTP-сервер (utils/webhook.py).
+# Если WEBHOOK_URL пуст, webhook в Telegram не регистрируется и сервер только
+# слушает порт (для локальной отправки записанных обновлений).
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8080")))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# Секрет в заголовке X-Telegram-Bot-Api-Secret-Token; по умолчанию выводится из токена
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or (
+    hashlib.sha256(TELEGRAM_BOT_TOKEN.encode()).hexdigest()[:32] if TELEGRAM_BOT_TOKEN else ""
+)
+
+# Многопроцессный режим (utils/sharding.py): при BOT_WORKERS > 1 main.py
+# запускает столько рабочих процессов (порты WORKER_BASE_PORT + i на
+# 127.0.0.1), а сам становится фронтом, который получает обновления в
+# режиме BOT_MODE и пересылает их рабочему по user_id % BOT_WORKERS.
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "0"))
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "8100"))
+WORKER_INDEX = os.getenv("WORKER_INDEX", "")
+
+# Исходящие запросы к Telegram (utils/ratelimit.py): общий лимит в секунду,
+# лимит на личный чат в секунду и на группу в минуту (с запасом
+# RATE_LIMIT_CHAT_BURST сообщений), повторы после RetryAfter.
+RATE_LIMIT_GLOBAL_PER_SECOND = float(os.getenv("RATE_LIMIT_GLOBAL_PER_SECOND", "30"))
+RATE_LIMIT_CHAT_PER_SECOND = float(os.getenv("RATE_LIMIT_CHAT_PER_SECOND", "1"))
+RATE_LIMIT_GROUP_PER_MINUTE = float(os.getenv("RATE_LIMIT_GROUP_PER_MINUTE", "20"))
+RATE_LIMIT_CHAT_BURST = int(os.getenv("RATE_LIMIT_CHAT_BURST", "3"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+
+# Ключ подписи callback_data (utils/callback_data.py). Должен совпадать у
+# всех процессов бота; по умолчанию выводится из токена.
+CALLBACK_SECRET = os.getenv("CALLBACK_SECRET") or TELEGRAM_BOT_TOKEN or ""
+
+# Сохранение сессий и состояний диалогов между перезапусками (SQLite).
+# Пустой путь отключает сохранение. Изменения пишутся на диск пачкой
+# раз в PERSISTENCE_FLUSH_INTERVAL секунд.
+PERSISTENCE_PATH = os.getenv("PERSISTENCE_PATH", "bot_state.sqlite3")
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "5"))
@@ -1,5 +1,5 @@
 import re
-import requests
+import httpx
 from datetime import datetime, timedelta
 
 from telegram import (
@@ -12,6 +12,7 @@ from telegram.ext import (
 )
 from asgiref.sync import sync_to_async
 
+from utils.api import get_salon_details, book_salon, verify_admin, invalidate_availability
 from states import ADMIN_PHONE, ADMIN_SELECT_BARBER, ADMIN_SELECT_SALON, ADMIN_WAIT_COMMAND
 
 def parse_booking_command(text, default_duration=30):
@@ -175,10 +176,8 @@ async def admin_handle_phone(update: Update, context: ContextTypes.DEFAULT_TYPE)
         phone_number = update.message.text.strip()
     context.user_data["phone_number"] = phone_number
 
-    payload = {"phone_number": phone_number}
-    url = "https://reservon.am/api/admin/verify/"
     try:
-        resp = requests.post(url, json=payload)
+        resp = await verify_admin(phone_number)
     except Exception:
         await update.message.reply_text("Ошибка запроса к серверу.")
         return ConversationHandler.END
@@ -234,23 +233,21 @@ async def admin_choose_barber(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not salon:
         await update.message.reply_text("Салон не найден в сессии.")
         return ConversationHandler.END
-    url = f"https://reservon.am/api/salons/{salon['id']}/"
     try:
-        resp = requests.get(url)
-        if resp.status_code != 200:
-            await update.message.reply_text("Не удалось получить данные салона.")
-            return ADMIN_WAIT_COMMAND
-        data = resp.json()
+        data = await get_salon_details(salon['id'])
+    except httpx.HTTPStatusError:
+        await update.message.reply_text("Не удалось получить данные салона.")
+        return ADMIN_WAIT_COMMAND
     except Exception:
         await update.message.reply_text("Ошибка запроса к серверу при получении мастеров.")
         return ADMIN_WAIT_COMMAND
-    barbers = data.get("barbers", [])
+    barbers = data.barbers
     if not barbers:
         await update.message.reply_text("В салоне нет зарегистрированных мастеров.")
         return ADMIN_WAIT_COMMAND
     buttons = []
     for barber in barbers:
-        buttons.append([InlineKeyboardButton(barber.get("name", "Без имени"), callback_data=f"admin_barber_{barber['id']}")])
+        buttons.append([InlineKeyboardButton(barber.name, callback_data=f"admin_barber_{barber.id}")])
     markup = InlineKeyboardMarkup(buttons)
     if update.message:
         await update.message.reply_text(
@@ -328,9 +325,8 @@ async def admin_booking_command(update: Update, context: ContextTypes.DEFAULT_TY
         "phone_number": phone_number if phone_number.startswith("+") else ("+" + phone_number)
     }
 
-    url = f"https://reservon.am/api/salons/{salon['id']}/book/"
     try:
-        resp = requests.post(url, json=payload)
+        resp = await book_salon(salon["id"], payload)
     except Exception:
         await update.message.reply_text("Ошибка запроса к серверу.", reply_markup=change_master_button())
         return ADMIN_WAIT_COMMAND
@@ -346,6 +342,8 @@ async def admin_booking_command(update: Update, context: ContextTypes.DEFAULT_TY
 
     data = resp.json()
     if data.get("success"):
+        if chosen_barber:
+            invalidate_availability(salon["id"], chosen_barber, parsed["date"])
         await update.message.reply_text("Бронирование успешно создано!", reply_markup=change_master_button())
     else:
         await update.message.reply_text("Не удалось создать бронирование: " + str(data), reply_markup=change_master_button())
@@ -357,7 +355,7 @@ async def admin_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     await update.message.reply_text("Админ сессия завершена.", reply_markup=ReplyKeyboardRemove())
     return ConversationHandler.END
 
-def get_admin_conv_handler() -> ConversationHandler:
+def get_admin_conv_handler(persistent: bool = False) -> ConversationHandler:
     return ConversationHandler(
         entry_points=[CommandHandler("admin", admin_start)],
         states={
@@ -372,6 +370,8 @@ def get_admin_conv_handler() -> ConversationHandler:
             ]
         },
         fallbacks=[CommandHandler("cancel", admin_cancel)],
-        allow_reentry=True
+        allow_reentry=True,
+        name="admin",
+        persistent=persistent
     )
 
@@ -4,7 +4,12 @@ from telegram.ext import CallbackContext
 # from utils.api import get_barbers
 from utils.localization import get_texts
 from utils.api import get_salon_details
+from utils.catalog import get_barber
+from utils.callback_data import CallbackState, encode_callback
+from utils.booking_state import restore_session
 from utils.session import get_user_language, get_session
+from utils.media_cache import reply_photo_cached
+from utils.gallery import send_album, send_collage, barber_label
 from handlers.services import choose_services
 import logging
 
@@ -13,6 +18,10 @@ logger = logging.getLogger(__name__)
 
 from states import CHOOSING_BARBERS, CHOOSING_SERVICES
 
+def barber_callback(salon_id, barber_id=None, any_barber=False):
+    """Подписанная кнопка выбора мастера (или «любого мастера»)."""
+    return encode_callback("bar", CallbackState(salon_id, barber_id=barber_id, any_barber=any_barber))
+
 async def choose_barbers(update: Update, context: CallbackContext):
     query = update.callback_query
     user_id = query.from_user.id if query else update.effective_user.id
@@ -23,23 +32,33 @@ async def choose_barbers(update: Update, context: CallbackContext):
         await query.message.reply_text("Не выбран салон.")
         return
 
-    salon_data = get_salon_details(salon_id)
-    barbers_mod = salon_data.get("telegram_barbersMod", "with_images") 
-    barbers = salon_data.get("barbers", [])
+    salon = await get_salon_details(salon_id)
+    barbers_mod = salon.barbers_mod
+    barbers = salon.barbers
+
+    # «Любой мастер» — только для салонов с общими услугами (mod = category):
+    # в режиме barber у каждого мастера свой список услуг.
+    any_barber_button = None
+    if salon.mod != "barber" and len(barbers) > 1:
+        any_barber_button = InlineKeyboardButton(
+            "Любой свободный мастер", callback_data=barber_callback(salon_id, any_barber=True)
+        )
 
     if barbers_mod == "without_images":
         # Без фотографий — просто кнопки (row_size=2), сразу уходим на CHOOSING_SERVICES
         buttons = []
         for barber in barbers:
-            barber_name = barber.get("name", "Без имени")
-            barber_id = barber.get("id", 0)
-            cb_data = f"barber_{barber_id}"
+            barber_name = barber.name
+            barber_id = barber.id
+            cb_data = barber_callback(salon_id, barber_id)
             buttons.append(InlineKeyboardButton(barber_name, callback_data=cb_data))
 
         keyboard = []
         row_size = 2
         for i in range(0, len(buttons), row_size):
             keyboard.append(buttons[i:i+row_size])
+        if any_barber_button:
+            keyboard.append([any_barber_button])
 
         reply_markup = InlineKeyboardMarkup(keyboard)
         await query.message.reply_text("Выберите мастера:", reply_markup=reply_markup)
@@ -51,44 +70,67 @@ async def choose_barbers(update: Update, context: CallbackContext):
         # handle_barber_selection, который затем переведёт в CHOOSING_SERVICES.
         # Поэтому возвращаем CHOOSING_BARBERS.
 
+    elif barbers_mod in ("media_group", "collage"):
+        # Галерея одним альбомом или коллажем (utils/gallery.py) и одна
+        # клавиатура с номерами, как на фотографиях
+        keyboard = [
+            [InlineKeyboardButton(barber_label(i, barber), callback_data=barber_callback(salon_id, barber.id))]
+            for i, barber in enumerate(barbers, 1)
+        ]
+        if any_barber_button:
+            keyboard.append([any_barber_button])
+        reply_markup = InlineKeyboardMarkup(keyboard)
+
+        if barbers_mod == "collage":
+            await send_collage(query.message, salon_id, barbers,
+                               caption="Выберите мастера:", reply_markup=reply_markup)
+        else:
+            await send_album(query.message, barbers)
+            await query.message.reply_text("Выберите мастера:", reply_markup=reply_markup)
+        return CHOOSING_BARBERS
+
     else:
         # === WITH IMAGES ===
         # Для каждого барбера отправляем отдельное сообщение (фото+описание+кнопка)
         for barber in barbers:
-            barber_name = barber.get("name", "No name")
-            barber_id = barber.get("id", 0)
-            barber_desc = barber.get("description") or ""
-            avatar_url = barber.get("avatar")  # например "https://example.com/image.jpg"
+            barber_name = barber.name
+            barber_id = barber.id
+            barber_desc = barber.description
+            avatar_url = barber.avatar  # например "https://example.com/image.jpg"
             # caption
             caption = f"<b>{barber_name}</b>\n{barber_desc}"
 
             # Кнопка "Выбрать"
-            cb_data = f"barber_{barber_id}"
+            cb_data = barber_callback(salon_id, barber_id)
             button = InlineKeyboardButton(f"Выбрать {barber_name}", callback_data=cb_data)
             markup = InlineKeyboardMarkup([[button]])
 
-            # Отправляем фото
+            # Отправляем фото: по file_id, если картинка уже отправлялась
             # Если avatar_url - это путь на Ваш сервер, убедитесь, что URL доступен извне
-            await query.message.reply_photo(
-                photo=avatar_url,
+            await reply_photo_cached(
+                query.message,
+                avatar_url,
                 caption=caption,
                 parse_mode="HTML",
                 reply_markup=markup
             )
 
-        # Опционально, в конце, можно добавить какую-то кнопку "Пропустить" или "Нет барбера"
-        # Но не обязательно.
+        if any_barber_button:
+            await query.message.reply_text(
+                "Или запишитесь к любому мастеру на ближайшее время:",
+                reply_markup=InlineKeyboardMarkup([[any_barber_button]])
+            )
         return CHOOSING_BARBERS
     
-async def handle_change_barber(update: Update, context: CallbackContext):
+async def handle_change_barber(update: Update, context: CallbackContext, action, state):
     query = update.callback_query
+    # Салон берём из подписанной кнопки
+    await restore_session(get_session(query.from_user.id), state)
     await query.answer("Вы меняете мастера.")
-    # Возвращаем пользователя в состояние выбора мастера,
-    # вызывая функцию choose_barbers (она уже есть в handlers/barbers.py)
-    from handlers.barbers import choose_barbers
+    # Возвращаем пользователя в состояние выбора мастера
     return await choose_barbers(update, context)
 
-async def handle_barber_selection(update, context: CallbackContext):
+async def handle_barber_selection(update, context: CallbackContext, action, state):
 
     logger.info("handle_barber_selection")
       # Сохранение текущего состояния
@@ -96,31 +138,33 @@ async def handle_barber_selection(update, context: CallbackContext):
 
     query = update.callback_query
     user_id = query.from_user.id
-    data = query.data
 
     # print(data['service'])
     session = get_session(user_id)
 
     texts = get_texts(get_user_language(user_id))
 
-    # Получаем список мастеров из сессии
-    barbers = session.get("barbers_list", [])
+    # Кнопка подписана и несёт салон и мастера — сессия восстанавливается по ней
+    await restore_session(session, state)
 
-    if data.startswith("barber_"):
-        barber_id = int(data.split("_")[1])
-        barber = next((b for b in barbers if b["id"] == barber_id), None)
+    if state.any_barber:
+        # Мастер определится по выбранному времени (см. handlers/datetime_handler.py)
+        await query.answer()
+        await query.message.reply_text(f"{texts['barber_chosen']} любой свободный мастер")
+        return await choose_services(update, context)
+
+    if action == "bar":
+        # Мастера берём из общего каталога салона (индекс по id)
+        barber = await get_barber(session["salon_id"], state.barber_id)
 
         if not barber:
             await query.answer("Ошибка: мастер не найден!", show_alert=True)
             return CHOOSING_BARBERS
 
-        # Сохраняем выбранного мастера в сес\ии
-        session["chosen_barber"] = barber
-
         # Подтверждаем выбор
-        await query.answer(f"{texts['barber_chosen']} {barber['name']}", show_alert=False)
+        await query.answer(f"{texts['barber_chosen']} {barber.name}", show_alert=False)
         await query.message.reply_text(
-            f"{texts['barber_chosen']} {barber['name']}"
+            f"{texts['barber_chosen']} {barber.name}"
         )
 
         # Переход к следующему шагу (например, выбору услуг)
@@ -3,27 +3,30 @@ import logging
 from telegram import Update
 from telegram.ext import CallbackContext
 from utils.session import get_session
-import requests
+from utils.api import book_salon, invalidate_availability
+from handlers.datetime_handler import slot_barber_id
+from utils.booking_state import restore_session
+from handlers.steps import go_to
 from states import CONFIRM_BOOKING, ASK_TG_PHONE
 
 logger = logging.getLogger(__name__)
 
-async def confirm_booking(update: Update, context: CallbackContext):
+async def confirm_booking(update: Update, context: CallbackContext, action, state):
     query = update.callback_query
-    await query.answer()
     user_id = update.effective_user.id
     session = get_session(user_id)
-    
-    # Если данные содержат выбранное время (начинается с "confirm_")
-    callback_data = query.data  # например, "confirm_10:00"
-    if callback_data.startswith("confirm_"):
-        chosen_time = callback_data.split("_", 1)[1]
-        session["chosen_time"] = chosen_time  # сохраняем выбранное время в сессии
-    
+
+    # Подписанная кнопка "conf" несёт всю запись (салон, мастер, услуги,
+    # дата, время) — восстанавливаем по ней сессию
+    await restore_session(session, state)
+    await query.answer()
+    if state.date is None or state.time is None:
+        await query.message.reply_text("Дата/время не выбраны.")
+        return CONFIRM_BOOKING
+
     # Если телефон ещё не получен, попросим его
     if "phone_number" not in session:
-        from handlers.phone import ask_telegram_phone
-        return await ask_telegram_phone(update, context)
+        return await go_to(ASK_TG_PHONE, update, context)
     
     # Переходим к логике подтверждения бронирования
     await confirm_booking_logic(session, query.message)
@@ -47,6 +50,14 @@ async def confirm_booking_logic(session, message):
         await message.reply_text("Дата/время не выбраны.")
         return
 
+    if session.get("any_barber"):
+        # «Любой мастер»: подставляем мастера, которому принадлежит выбранное время
+        barber_id = await slot_barber_id(session, chosen_date, chosen_time)
+        if barber_id is None:
+            await message.reply_text("Выбранное время уже недоступно, выберите другое.")
+            return
+        booking_details = [dict(detail, barberId=barber_id) for detail in booking_details]
+
     h, m = chosen_time.split(":")
     startH = int(h)
     startM = int(m)
@@ -77,14 +88,16 @@ async def confirm_booking_logic(session, message):
 
     logger.warning("[confirm_booking_logic] => %r", payload)
     
-    url = f"https://reservon.am/api/salons/{salon_id}/book/"
     try:
-        resp = requests.post(url, json=payload)
+        resp = await book_salon(salon_id, payload)
         if resp.status_code >= 400:
             await message.reply_text(f"Ошибка бронирования: {resp.status_code}\n{resp.text}")
             return
         data = resp.json()
         if data.get("success"):
+            # Слоты мастера на этот день изменились — сбрасываем кэш
+            for detail in booking_details:
+                invalidate_availability(salon_id, detail.get("barberId"), chosen_date)
             await message.reply_text("Бронирование успешно!")
         else:
             await message.reply_text("Не удалось создать бронирование: " + str(data))
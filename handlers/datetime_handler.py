@@ -5,17 +5,138 @@ from utils.session import get_session
 from utils.localization import SHORT_DAYS
 from states import CHOOSING_SERVICES, CHOOSING_DATE, CHOOSING_HOUR, CHOOSING_MINUTES, CONFIRM_BOOKING
 from datetime import datetime, timedelta
-from utils.api import get_available_minutes
-import requests
+from utils.api import get_salon_details, get_day_availability_many
+from config import AVAILABILITY_PREFETCH_CONCURRENCY
+from utils.functions import working_hours_for_date
+from utils.catalog import get_barber, get_barbers, get_chosen_services
+from utils.slots import (
+    hm_to_minutes,
+    minutes_to_hm,
+    combined_start_mask,
+    hours_mask,
+    mask_hours,
+    mask_minutes_in_hour,
+    mask_nearest
+)
+from utils.callback_data import encode_callback
+from utils.booking_state import session_state, restore_session
+from handlers.steps import go_to
 
 logger = logging.getLogger(__name__)
 
+# Часы, для которых запрашиваем свободное время, если у салона не указан график
+DEFAULT_HOURS = list(range(9, 23))
+
 def build_grid(buttons, row_size=3):
     keyboard = []
     for i in range(0, len(buttons), row_size):
         keyboard.append(buttons[i:i+row_size])
     return keyboard
 
+async def salon_hours(session, chosen_date):
+    """Часы работы салона в этот день (по графику из деталей салона)."""
+    try:
+        salon_data = await get_salon_details(session["salon_id"])
+    except Exception as e:
+        logger.warning("Salon details unavailable, using default hours: %s", e)
+        return DEFAULT_HOURS
+    return working_hours_for_date(salon_data.schedule, chosen_date, DEFAULT_HOURS)
+
+def segment_durations(session):
+    """Длительности частей записи по порядку (booking_details)."""
+    durations = [int(detail.get("duration") or 0) for detail in session.get("booking_details") or []]
+    return [d for d in durations if d > 0] or [int(session.get("total_service_duration") or 30)]
+
+async def candidate_barbers(session):
+    """
+    Мастера, у которых ищем время: выбранный или, в режиме «любой мастер»,
+    все, кто делает выбранные услуги (в порядке списка салона).
+    """
+    if not session.get("any_barber"):
+        return [session.get("chosen_barber_id")]
+    categories = {svc.category for svc in await get_chosen_services(session)}
+    return [
+        barber.id for barber in await get_barbers(session["salon_id"])
+        if categories <= barber.categories
+    ]
+
+async def fetch_start_masks_many(session, dates):
+    """
+    Старты записи на несколько дней: для каждой даты — [(barber_id, маска
+    стартов)] (utils/slots.py) или None, если свободное время не загрузилось.
+    Свободные минуты мастера на день приходят одним запросом (все дни и
+    мастера параллельно, через кэш свободного времени), а старты для частей
+    booking_details считаются локально и только в часы работы салона.
+    """
+    barbers = await candidate_barbers(session)
+    durations = segment_durations(session)
+    requests = [(barber_id, chosen_date) for chosen_date in dates for barber_id in barbers]
+    loaded = dict(zip(requests, await get_day_availability_many(session["salon_id"], requests)))
+    results = []
+    for chosen_date in dates:
+        window = hours_mask(await salon_hours(session, chosen_date))
+        parts = []
+        for barber_id in barbers:
+            day = loaded[(barber_id, chosen_date)]
+            if day is not None:
+                mask = combined_start_mask([(day, duration) for duration in durations])
+                parts.append((barber_id, mask & window))
+        # Ни одного ответа — ошибка; ни одного подходящего мастера — просто нет времени
+        results.append(parts if parts or not barbers else None)
+    return results
+
+async def fetch_start_masks(session, chosen_date):
+    return (await fetch_start_masks_many(session, [chosen_date]))[0]
+
+def merged_mask(parts):
+    """Старты, свободные хотя бы у одного мастера."""
+    mask = 0
+    for _, barber_mask in parts:
+        mask |= barber_mask
+    return mask
+
+async def find_earliest_slot(session, dates, wave_size=AVAILABILITY_PREFETCH_CONCURRENCY):
+    """
+    Самый ранний свободный старт среди дней `dates` (по порядку).
+    Дни запрашиваются волнами по wave_size параллельно (дни из кэша — без
+    запросов). Поиск останавливается на первой волне со слотом.
+    Возвращает (date, "HH:MM") или None.
+    """
+    for i in range(0, len(dates), wave_size):
+        wave = dates[i:i + wave_size]
+        for chosen_date, parts in zip(wave, await fetch_start_masks_many(session, wave)):
+            if parts is None:
+                continue
+            _, first = mask_nearest(merged_mask(parts), 0)
+            if first is not None:
+                return chosen_date, minutes_to_hm(first)
+    return None
+
+async def slot_barber_id(session, chosen_date, hm_str):
+    """
+    Мастер для старта hm_str в режиме «любой мастер»: первый по порядку в
+    списке салона, у которого это время свободно. Свободное время берётся из
+    кэша, поэтому в сессии владельцев слотов не храним.
+    """
+    start = hm_to_minutes(hm_str)
+    for barber_id, mask in await fetch_start_masks(session, chosen_date) or []:
+        if mask >> start & 1:
+            return barber_id
+    return None
+
+async def barber_display_name(session, chosen_date=None, hm_str=None):
+    barber = await get_barber(session["salon_id"], session.get("chosen_barber_id"))
+    if barber:
+        return barber.name
+    if session.get("any_barber"):
+        if hm_str:
+            barber_id = await slot_barber_id(session, chosen_date, hm_str)
+            barber = await get_barber(session["salon_id"], barber_id)
+            if barber:
+                return barber.name
+        return "любой свободный"
+    return "—"
+
 async def choose_day(update: Update, context: CallbackContext):
     """
     Показывает список дат и кнопку "Изменить услуги"
@@ -32,44 +153,66 @@ async def choose_day(update: Update, context: CallbackContext):
     now = datetime.now()
     dates = [now + timedelta(days=i) for i in range(reservDays)]
 
+    # Запрашиваем свободное время сразу для всех дней (параллельно);
+    # ответы попадают в кэш, поэтому show_hours после выбора дня не ходит в сеть.
+    isos = [d.strftime("%Y-%m-%d") for d in dates]
+    results = await fetch_start_masks_many(session, isos)
+
+    # Кнопки подписаны и несут выбор пользователя (utils/callback_data.py)
+    state = await session_state(session)
     dayNames = SHORT_DAYS["ru"]
     buttons = []
-    for d in dates:
+    for d, parts in zip(dates, results):
         wday = d.weekday()
         day_abbr = dayNames[wday]
         ddmm = d.strftime("%d.%m")
         iso = d.strftime("%Y-%m-%d")
         text = f"{day_abbr}, {ddmm}"
-        cb = f"day_{iso}"
+        if parts is not None:
+            free_slots = merged_mask(parts).bit_count()
+            if not free_slots:
+                # Полностью занятый день не показываем
+                continue
+            text = f"{text} ({free_slots})"
+        cb = encode_callback("day", state.replace(date=iso))
         buttons.append(InlineKeyboardButton(text, callback_data=cb))
 
     kb = build_grid(buttons, row_size=3)
-    # Добавляем фиксированную строку
-    kb.append([InlineKeyboardButton("Изменить услуги", callback_data="change_services")])
+    # Добавляем фиксированные строки
+    if buttons:
+        kb.append([InlineKeyboardButton("Ближайшее свободное время", callback_data=encode_callback("earl", state))])
+    kb.append([InlineKeyboardButton("Изменить услуги", callback_data=encode_callback("chs", state))])
     await update.effective_message.reply_text(
-        "Выберите день:",
+        "Выберите день:" if buttons else "Нет свободного времени в ближайшие дни.",
         reply_markup=InlineKeyboardMarkup(kb)
     )
     return CHOOSING_DATE
 
-async def handle_day_selection(update: Update, context: CallbackContext):
+async def handle_day_selection(update: Update, context: CallbackContext, action, state):
     query = update.callback_query
-    data = query.data
-    await query.answer()
-
     user_id = query.from_user.id
     session = get_session(user_id)
 
-    if data == "change_services":
-        from handlers.services import choose_services
-        return await choose_services(update, context)
+    await restore_session(session, state)
+    await query.answer()
 
-    if not data.startswith("day_"):
+    if action == "earl":
+        reservDays = session.get("reservDays", 7)
+        now = datetime.now()
+        dates = [(now + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(reservDays)]
+        found = await find_earliest_slot(session, dates)
+        if not found:
+            await query.message.reply_text("Нет свободного времени в ближайшие дни.")
+            return CHOOSING_DATE
+        chosen_date, hm_str = found
+        session["chosen_date"] = chosen_date
+        return await reply_time_choice(query.message, session, chosen_date, [hm_str])
+
+    if action != "day" or not state.date:
         await query.message.reply_text("Invalid day format.")
         return CHOOSING_DATE
 
-    chosen_date = data.split("_", 1)[1]
-    session["chosen_date"] = chosen_date
+    chosen_date = state.date
 
     # После выбора дня показываем часы
     return await show_hours(update, context, chosen_date)
@@ -80,43 +223,31 @@ async def show_hours(update: Update, context: CallbackContext, chosen_date: str)
     """
     user_id = update.callback_query.from_user.id
     session = get_session(user_id)
-    booking_details = session.get("booking_details", [])
-    total_duration = sum(cat.get("duration", 0) for cat in booking_details) or 30
-
-    hours_list = list(range(9, 23))
-    payload = {
-        "salon_id": session["salon_id"],
-        "date": chosen_date,
-        "hours": hours_list,
-        "booking_details": booking_details,
-        "total_service_duration": total_duration
-    }
-    logger.warning("[show_hours] sending => %r", payload)
-    try:
-        response = get_available_minutes(payload)
-        data_json = response.json()
-        avail = data_json.get("available_minutes", {})
-    except Exception as e:
-        logger.error("Error get_available_minutes: %s", e)
+
+    hours_list = await salon_hours(session, chosen_date)
+    parts = await fetch_start_masks(session, chosen_date)
+    if parts is None:
         await update.callback_query.message.reply_text("Ошибка сервера.")
         return CHOOSING_DATE
 
-    valid_hours = [h for h in hours_list if avail.get(str(h))]
+    # Часы, в которых есть старт на всю длительность записи
+    valid_hours = mask_hours(merged_mask(parts), hours_list)
     if not valid_hours:
         await update.callback_query.message.reply_text("Нет доступных часов для этого дня.")
         return CHOOSING_DATE
 
+    state = await session_state(session, date=chosen_date)
     hour_buttons = []
     for h in valid_hours:
-        cb = f"hour_{h}"
+        cb = encode_callback("hour", state.replace(arg=h))
         txt = f"≈ {h}:00"
         hour_buttons.append(InlineKeyboardButton(txt, callback_data=cb))
 
     kb = build_grid(hour_buttons, row_size=2)
     # Фиксированная строка с кнопками
     kb.append([
-        InlineKeyboardButton("Изменить день", callback_data="change_day"),
-        InlineKeyboardButton("Изменить услуги", callback_data="change_services")
+        InlineKeyboardButton("Изменить день", callback_data=encode_callback("chd", state)),
+        InlineKeyboardButton("Изменить услуги", callback_data=encode_callback("chs", state))
     ])
 
     await update.callback_query.message.reply_text(
@@ -125,173 +256,127 @@ async def show_hours(update: Update, context: CallbackContext, chosen_date: str)
     )
     return CHOOSING_HOUR
 
-async def handle_hour_selection(update: Update, context: CallbackContext):
-    query = update.callback_query
-    data = query.data
-    await query.answer()
+async def resolve_nearest_times(session, chosen_date, chosen_hour):
+    """
+    Ближайшее свободное время до и после chosen_hour:00 для режима auto,
+    локально по маске стартов дня (без get_nearest_available_time).
+    Возвращает список "HH:MM" без повторов (0, 1 или 2 варианта).
+    """
+    parts = await fetch_start_masks(session, chosen_date)
+    if parts is None:
+        raise RuntimeError("availability is unavailable")
+    before, after = mask_nearest(merged_mask(parts), chosen_hour * 60)
+
+    candidates = []
+    for minute in (before, after):
+        if minute is not None and minutes_to_hm(minute) not in candidates:
+            candidates.append(minutes_to_hm(minute))
+    return candidates
+
+async def reply_time_choice(message, session, chosen_date, candidates):
+    """
+    Сводка записи с найденным временем и кнопками подтверждения (по одной
+    на каждый вариант) — для режима auto и «ближайшего свободного времени».
+    """
+    # Форматируем дату для вывода (например, "30 января")
+    try:
+        dt_obj = datetime.strptime(chosen_date, "%Y-%m-%d")
+        day_num = dt_obj.day
+        month_num = dt_obj.month
+        ru_months = [
+            "января", "февраля", "марта", "апреля", "мая", "июня",
+            "июля", "августа", "сентября", "октября", "ноября", "декабря"
+        ]
+        month_name_ru = ru_months[month_num - 1]
+        date_str = f"{day_num} {month_name_ru}"
+    except ValueError:
+        date_str = chosen_date
+
+    # Форматируем время, заменяя двоеточие на символ "։"
+    time_str = " или ".join(hm.replace(":", "։") for hm in candidates)
+    barber_name = await barber_display_name(session, chosen_date, candidates[0] if len(candidates) == 1 else None)
+
+    chosen_names = [svc.name for svc in await get_chosen_services(session)]
+    services_str = ", ".join(chosen_names) if chosen_names else "не выбраны"
 
+    text = (
+        f"Ближайшее свободное время: {date_str} {time_str}\n\n"
+        f"Мастер: {barber_name}\n"
+        f"Услуги: {services_str}"
+    )
+
+    # Формируем inline-клавиатуру: по кнопке на каждый вариант (до и после выбранного часа)
+    state = await session_state(session, date=chosen_date)
+    buttons = []
+    for hm_str in candidates:
+        buttons.append(InlineKeyboardButton(
+            f"Подтвердить заказ во {hm_str}",
+            callback_data=encode_callback("conf", state.replace(time=hm_to_minutes(hm_str)))
+        ))
+    # Добавляем кнопки для изменения выбора
+    buttons.append(InlineKeyboardButton("Изменить час", callback_data=encode_callback("chh", state)))
+    buttons.append(InlineKeyboardButton("Изменить услуги", callback_data=encode_callback("chs", state)))
+    kb = InlineKeyboardMarkup([[btn] for btn in buttons])
+    await message.reply_text(
+        f"{text}\n\nВыберите время для подтверждения заказа:",
+        reply_markup=kb
+    )
+    return CONFIRM_BOOKING
+
+async def handle_hour_selection(update: Update, context: CallbackContext, action, state):
+    query = update.callback_query
     user_id = query.from_user.id
     session = get_session(user_id)
 
-    # Если нажата кнопка "change_day" или "change_services", обрабатываем их отдельно:
-    if data == "change_day":
+    await restore_session(session, state)
+    await query.answer()
+
+    # Кнопка "Изменить день" ("Изменить услуги" — handle_change_services)
+    if action == "chd":
         return await choose_day(update, context)
-    if data == "change_services":
-        from handlers.services import choose_services
-        return await choose_services(update, context)
 
-    if not data.startswith("hour_"):
+    if action != "hour" or not state.date:
         await query.message.reply_text("Некорректный выбор часа.")
         return CHOOSING_HOUR
 
-    try:
-        chosen_hour = int(data.split("_", 1)[1])
-    except ValueError:
-        await query.message.reply_text("Некорректный формат выбранного часа.")
-        return CHOOSING_HOUR
-
+    chosen_hour = state.arg
     session["chosen_hour"] = chosen_hour
-    chosen_date = session.get("chosen_date", "")
+    chosen_date = state.date
 
     # Определяем режим бронирования для телеграм (например, в сессии сохранён параметр "appointment_mod")
     appointment_mod = session.get("appointment_mod", "handler")
     logger.warning("Telegram bot: appointment_mod = %r", appointment_mod)
 
-    # Если режим auto, вместо стандартного показа минут вызываем API get_nearest_available_time
+    # Если режим auto, вместо стандартного показа минут предлагаем ближайшее время
     if appointment_mod == "auto":
 
-        total_duration = session.get("total_service_duration", 30)
-        booking_details = session.get("booking_details", [])
-        payload = {
-            "salon_id": session["salon_id"],
-            "date": chosen_date,
-            "chosen_hour": chosen_hour,
-            "booking_details": booking_details,
-            "total_service_duration": total_duration
-        }
-        logger.info("[handle_hour_selection] Payload for auto mode: %r", payload)
         try:
-            # Здесь можно использовать requests (синхронно) или aiohttp/async requests; для примера используем requests
-            api_url = f"https://reservon.am/api/salons/get_nearest_available_time/"
-            resp = requests.post(api_url, json=payload)
-            if resp.status_code != 200:
-                await query.message.reply_text(f"Ошибка сервера: {resp.status_code}")
-                return CHOOSING_HOUR
-            data_json = resp.json()
-            logger.info("[handle_hour_selection] Received: %r", data_json)
+            candidates = await resolve_nearest_times(session, chosen_date, chosen_hour)
         except Exception as e:
-            logger.error("Ошибка вызова API get_nearest_available_time: %s", e)
+            logger.error("Ошибка поиска ближайшего времени: %s", e)
             await query.message.reply_text("Ошибка получения доступного времени.")
             return CHOOSING_HOUR
 
-        # Извлекаем варианты
-        nearest_before = data_json.get("nearest_before")
-        nearest_after = data_json.get("nearest_after")
-
-        # Преобразуем nearest_before
-        h1, m1 = map(int, nearest_before.replace("։", ":").split(":"))
-        diff_minutes = 0
-
-        if "nearest_after" in data and nearest_after:
-            h2, m2 = map(int, nearest_after.replace("։", ":").split(":"))
-            diff_minutes = (h2 * 60 + m2) - (h1 * 60 + m1)
-
-        print("Ближайшее время:", nearest_before, nearest_after, diff_minutes)
-
-         # Форматируем дату для вывода (например, "30 января")
-        chosen_date = session.get("chosen_date", "")
-
-        # Определяем выбранное время
-        chosen_time = None
-        if nearest_after and nearest_before and (nearest_before == nearest_after or diff_minutes < 30):
-            later_time = nearest_after if nearest_after > nearest_before else nearest_before
-            chosen_time = later_time
-        elif nearest_before:
-            chosen_time = nearest_before
-        elif nearest_after:
-            chosen_time = nearest_after
-        else:
+        if not candidates:
             await query.message.reply_text("Нет доступного времени для бронирования в этот час.")
             return CHOOSING_HOUR
 
-        # Определяем hm_str как выбранное время
-        hm_str = chosen_time
-        session["chosen_time"] = hm_str  # сохраняем выбранное время в сессии
-
-        # Форматируем дату для вывода (например, "30 января")
-        chosen_date = session.get("chosen_date", "")
-        try:
-            dt_obj = datetime.strptime(chosen_date, "%Y-%m-%d")
-            day_num = dt_obj.day
-            month_num = dt_obj.month
-            ru_months = [
-                "января", "февраля", "марта", "апреля", "мая", "июня",
-                "июля", "августа", "сентября", "октября", "ноября", "декабря"
-            ]
-            month_name_ru = ru_months[month_num - 1]
-            date_str = f"{day_num} {month_name_ru}"
-        except ValueError:
-            date_str = chosen_date
-
-        # Форматируем время, заменяя двоеточие на символ "։"
-        time_str = hm_str.replace(":", "։")
-        barber = session.get("chosen_barber")
-        barber_name = barber["name"] if barber else "—"
-
-        chosen_services = session.get("chosen_services", [])
-        services_list = session.get("services_list", [])
-        chosen_names = [svc["name"] for svc in services_list if str(svc["id"]) in chosen_services]
-        services_str = ", ".join(chosen_names) if chosen_names else "не выбраны"
-
-        text = (
-            f"Вы выбрали: {date_str} {time_str}\n\n"
-            f"Мастер: {barber_name}\n"
-            f"Услуги: {services_str}"
-        )
-
-        # Формируем inline-клавиатуру
-        buttons = []
-        # Если доступен только один вариант (мы уже выбрали chosen_time), показываем одну кнопку
-        buttons.append(InlineKeyboardButton(
-            f"Подтвердить заказ во {hm_str}",
-            callback_data=f"confirm_{hm_str}"
-        ))
-        # Добавляем кнопки для изменения выбора
-        buttons.append(InlineKeyboardButton("Изменить час", callback_data="change_hour"))
-        buttons.append(InlineKeyboardButton("Изменить услуги", callback_data="change_services"))
-        kb = InlineKeyboardMarkup([[btn] for btn in buttons])
-        await query.message.reply_text(
-            f"{text}\n\nВыберите время для подтверждения заказа:",
-            reply_markup=kb
-        )
-        return CONFIRM_BOOKING
+        return await reply_time_choice(query.message, session, chosen_date, candidates)
 
     else:
-        # Режим handler — стандартная логика: например, запрашиваем доступные минуты через get_available_minutes
-        payload = {
-            "salon_id": session["salon_id"],
-            "date": chosen_date,
-            "hours": [chosen_hour],
-            "booking_details": session.get("booking_details", []),
-            "total_service_duration": session.get("total_service_duration", 30)
-        }
-        logger.info("[handle_hour_selection] Payload for handler mode: %r", payload)
-        try:
-            response = get_available_minutes(payload)
-            data_json = response.json()
-            logger.info("[handle_hour_selection] Got available minutes: %r", data_json)
-        except Exception as e:
-            logger.error("Error in get_available_minutes: %s", e)
+        # Режим handler — стандартная логика: свободные минуты выбранного часа
+        parts = await fetch_start_masks(session, chosen_date)
+        if parts is None:
             await query.message.reply_text("Ошибка сервера (час).")
             return CHOOSING_HOUR
 
-        avail = data_json.get("available_minutes", {})
-        minute_list = avail.get(str(chosen_hour), [])
+        minute_list = mask_minutes_in_hour(merged_mask(parts), chosen_hour)
         if not minute_list:
             await query.message.reply_text("Нет доступных минут для этого часа.")
             return CHOOSING_HOUR
 
         # Строим клавиатуру для выбора минут (как ранее)
+        state = state.replace(arg=0)
         minute_buttons = []
         for m in minute_list:
             m_int = int(m)
@@ -303,43 +388,34 @@ async def handle_hour_selection(update: Update, context: CallbackContext):
             start_str = f"{chosen_hour}:{m_int:02d}"
             end_str = f"{end_h}:{end_m:02d}"
             txt = f"{start_str}-{end_str}"
-            cb = f"min_{chosen_hour}:{m_int:02d}"
+            cb = encode_callback("min", state.replace(time=chosen_hour * 60 + m_int))
             minute_buttons.append(InlineKeyboardButton(txt, callback_data=cb))
         kb = InlineKeyboardMarkup([[btn] for btn in minute_buttons] +
-                                  [[InlineKeyboardButton("Изменить час", callback_data="change_hour"),
-                                    InlineKeyboardButton("Изменить услуги", callback_data="change_services")]])
+                                  [[InlineKeyboardButton("Изменить час", callback_data=encode_callback("chh", state)),
+                                    InlineKeyboardButton("Изменить услуги", callback_data=encode_callback("chs", state))]])
         await query.message.reply_text(
             f"Вы выбрали час {chosen_hour}:00. Выберите точное время:",
             reply_markup=kb
         )
         return CHOOSING_MINUTES
 
-async def handle_minute_selection(update: Update, context: CallbackContext):
+async def handle_minute_selection(update: Update, context: CallbackContext, action, state):
     query = update.callback_query
-    data = query.data
-    await query.answer()
-
     user_id = query.from_user.id
     session = get_session(user_id)
 
-    if data == "change_hour":
-        # Вместо попытки изменить update.callback_query.data, просто вызываем show_hours
-        chosen_date = session.get("chosen_date", "")
-        return await show_hours(update, context, chosen_date)
-    if data == "change_services":
-        from handlers.services import choose_services
-        return await choose_services(update, context)
+    await restore_session(session, state)
+    await query.answer()
 
-    if not data.startswith("min_"):
+    if action != "min" or state.time is None or not state.date:
         await query.message.reply_text("Некорректный формат минут.")
         return CHOOSING_MINUTES
 
-    # Пример: data = "min_14:20"
-    hm_str = data.split("_", 1)[1]  # "14:20"
-    session["chosen_time"] = hm_str
+    # Время уже восстановлено из кнопки: session["chosen_time"] = "14:20"
+    hm_str = session["chosen_time"]
 
     # Форматируем дату для вывода (например, "30 января")
-    chosen_date = session.get("chosen_date", "")
+    chosen_date = state.date
     try:
         dt_obj = datetime.strptime(chosen_date, "%Y-%m-%d")
         day_num = dt_obj.day
@@ -354,12 +430,9 @@ async def handle_minute_selection(update: Update, context: CallbackContext):
         date_str = chosen_date
 
     time_str = hm_str.replace(":", "։")
-    barber = session.get("chosen_barber")
-    barber_name = barber["name"] if barber else "—"
+    barber_name = await barber_display_name(session, chosen_date, hm_str)
 
-    chosen_services = session.get("chosen_services", [])
-    services_list = session.get("services_list", [])
-    chosen_names = [svc["name"] for svc in services_list if str(svc["id"]) in chosen_services]
+    chosen_names = [svc.name for svc in await get_chosen_services(session)]
     services_str = ", ".join(chosen_names) if chosen_names else "не выбраны"
 
     text = (
@@ -372,7 +445,7 @@ async def handle_minute_selection(update: Update, context: CallbackContext):
 
     kb = [
         [
-            InlineKeyboardButton("Подтвердить", callback_data="confirm_booking"),
+            InlineKeyboardButton("Подтвердить", callback_data=encode_callback("conf", state)),
             InlineKeyboardButton("Отменить", callback_data="cancel_booking")
         ]
     ]
@@ -382,19 +455,19 @@ async def handle_minute_selection(update: Update, context: CallbackContext):
     )
     return CONFIRM_BOOKING
 
-async def handle_change_hour(update: Update, context: CallbackContext):
+async def handle_change_hour(update: Update, context: CallbackContext, action, state):
     """Возврат к выбору часа."""
     query = update.callback_query
-    await query.answer()
     user_id = query.from_user.id
     session = get_session(user_id)
-    chosen_date = session.get("chosen_date", "")
+    await restore_session(session, state)
+    await query.answer()
     # Возвращаемся к выбору часов, например, вызывая show_hours:
-    return await show_hours(update, context, chosen_date)
+    return await show_hours(update, context, state.date)
 
-async def handle_change_services(update: Update, context: CallbackContext):
+async def handle_change_services(update: Update, context: CallbackContext, action, state):
     """Возврат к выбору услуг."""
     query = update.callback_query
+    await restore_session(get_session(query.from_user.id), state)
     await query.answer()
-    from handlers.services import choose_services
-    return await choose_services(update, context)
+    return await go_to(CHOOSING_SERVICES, update, context)
@@ -5,6 +5,8 @@ from utils.localization import get_texts, LANGUAGES
 from utils.session import set_user_language, get_user_language
 from states import CHOOSING_LANGUAGE, CHOOSING_SALON, CHOOSING_BARBERS, CHOOSING_SERVICES, CHOOSING_DATE, CHOOSING_HOUR, CHOOSING_MINUTES
 from utils.session import  get_session
+from utils.catalog import get_barbers
+from utils.thumbnails import thumbnail_service
 
 import logging
 
@@ -19,8 +21,8 @@ LANGUAGE_KEYBOARD = ReplyKeyboardMarkup(
 )
 
 from handlers.salon import ask_for_salon
-from handlers.barbers import handle_barber_selection
-from handlers.services import handle_service_selection
+from handlers.barbers import handle_barber_selection, barber_callback
+from handlers.services import choose_services
 
 async def handle_language_command(update: Update, context: CallbackContext):
     logger.info('Команда /language вызвана')
@@ -64,21 +66,23 @@ async def handle_language_selection(update: Update, context: CallbackContext):
                 return await ask_for_salon(update, context)
             elif previous_state == CHOOSING_BARBERS:
                 # Переотправка списка барберов
-                barbers = get_session(user_id).get('barbers_list', [])
-                for barber in barbers:
-                    compressed_image = compress_image(barber["avatar"])
+                salon_id = get_session(user_id).get("salon_id")
+                barbers = await get_barbers(salon_id) if salon_id else []
+                # Миниатюры всех мастеров готовятся параллельно и берутся из кэша
+                thumbnails = await thumbnail_service.get_many([b.avatar for b in barbers], (128, 128))
+                for barber, thumbnail in zip(barbers, thumbnails):
                     await update.message.reply_photo(
-                        photo=compressed_image,
-                        caption=f"<b>{barber['name']}</b>\n{barber['description']}",
+                        photo=thumbnail or barber.avatar,
+                        caption=f"<b>{barber.name}</b>\n{barber.description}",
                         parse_mode="HTML",
                         reply_markup=InlineKeyboardMarkup([
-                            [InlineKeyboardButton(text=f"Выбрать {barber['name']}", callback_data=f"barber_{barber['id']}")]
+                            [InlineKeyboardButton(text=f"Выбрать {barber.name}", callback_data=barber_callback(salon_id, barber.id))]
                         ])
                     )
                 return CHOOSING_BARBERS
             elif previous_state == CHOOSING_SERVICES:
                 # Повторный запрос на выбор услуг
-                return await handle_service_selection(update, context)
+                return await choose_services(update, context)
             # elif previous_state == CHOOSING_DATE:
             #     # Повторный запрос даты
             #     return await received_date(update, context)
@@ -99,17 +103,3 @@ async def handle_language_selection(update: Update, context: CallbackContext):
         texts = get_texts(lang)
         await update.message.reply_text(texts["select_language_error"], reply_markup=LANGUAGE_KEYBOARD)
         return CHOOSING_LANGUAGE
-
-def compress_image(image_url, size=(128, 128)):
-    """Функция для сжатия изображения до указанного размера."""
-    import requests
-    from PIL import Image
-    from io import BytesIO
-
-    response = requests.get(image_url)
-    image = Image.open(BytesIO(response.content))
-    image.thumbnail(size)  # Устанавливаем размер
-    output = BytesIO()
-    image.save(output, format="JPEG")
-    output.seek(0)
-    return output
@@ -3,6 +3,8 @@ from telegram import ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMa
 from telegram.ext import CallbackContext
 from utils.localization import get_texts
 from utils.session import get_user_language
+from handlers.services import choose_services
+from handlers.language import LANGUAGE_KEYBOARD
 # from utils.api import get_services, get_barbers
 
 CHOOSING_OPTION = 2
@@ -36,7 +38,6 @@ async def main_options_callback(update, context: CallbackContext):
     message = update.message.text if update.message else update.callback_query.data
 
     if message in ["Book a Service", "Забронировать услугу", "Ամրագրել ծառայություն"]:
-        from handlers.services import choose_services
         return await choose_services(update, context)
 
     elif message in ["View Bookings", "Просмотреть бронирования", "Տեսնել ամրագրումները"]:
@@ -45,7 +46,6 @@ async def main_options_callback(update, context: CallbackContext):
         return CHOOSING_OPTION
 
     elif message in ["Change Language", "Изменить язык", "Փոխել լեզուն"]:
-        from handlers.language import LANGUAGE_KEYBOARD, get_texts
         await update.effective_message.reply_text(
             texts["language_prompt"],
             reply_markup=LANGUAGE_KEYBOARD
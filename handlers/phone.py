@@ -1,20 +1,20 @@
 # handlers/phone.py
 
 import logging
-from telegram import ReplyKeyboardRemove, Update
+from telegram import ReplyKeyboardRemove, ReplyKeyboardMarkup, KeyboardButton, Update
 from telegram.ext import CallbackContext
 from utils.session import get_session
 from states import ASK_TG_PHONE, CONFIRM_BOOKING
 from handlers.booking_handler import confirm_booking_logic
+from handlers.steps import step
 
 logger = logging.getLogger(__name__)
 
+@step(ASK_TG_PHONE)
 async def ask_telegram_phone(update: Update, context: CallbackContext):
     """
     Показываем кнопку request_contact. 
     """
-    from telegram import ReplyKeyboardMarkup, KeyboardButton
-
     kb = [[
         KeyboardButton("Поделиться номером телефона", request_contact=True),
         KeyboardButton("Отмена")
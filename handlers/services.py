@@ -2,13 +2,17 @@
 import logging
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CallbackContext
-from utils.api import get_salon_details
+from utils.catalog import get_barber, get_barber_services, get_chosen_services
+from utils.callback_data import CallbackTooLong, encode_callback
+from utils.booking_state import session_state, restore_session
 from utils.session import get_user_language, get_session
 from states import CHOOSING_SERVICES
 from handlers.datetime_handler import choose_day
+from handlers.steps import step
 
 logger = logging.getLogger(__name__)
 
+@step(CHOOSING_SERVICES)
 async def choose_services(update, context: CallbackContext):
     """
     Показывает услуги в сетке (toggle).
@@ -28,56 +32,41 @@ async def choose_services(update, context: CallbackContext):
         await message.reply_text("Salon not found in session.")
         return
 
-    salon_data = get_salon_details(salon_id)
-    # Определяем режим работы салона: category или barber
-    salon_mod = salon_data.get("mod", "category")
-    
-    # Получаем выбранного мастера (должен быть сохранён в session["chosen_barber"])
-    chosen_barber = session.get("chosen_barber")
-    
-    if salon_mod == "barber":
-        # Режим barbers: показываем услуги из BarberService мастера
-        if chosen_barber:
-            # Предполагаем, что в данных мастера есть список barber_services
-            services = chosen_barber.get("barber_services", [])
-        else:
-            services = []
-    else:
-        # Режим category: показываем услуги из модели Service, отфильтрованные по категориям мастера
-        all_services = salon_data.get("services", [])
-        if chosen_barber:
-            allowed_categories = chosen_barber.get("categories", [])
-            # Фильтруем услуги: оставляем те, у которых поле category содержится в allowed_categories
-            services = [svc for svc in all_services if svc.get("category") in allowed_categories]
-        else:
-            services = all_services
-
-    # Сохраняем отфильтрованные услуги в сессию
-    session["services_list"] = services
+    # Услуги мастера берём из общего каталога (режим салона category / barber
+    # учитывается там же); в сессии остаются только id выбранных услуг.
+    services = await get_barber_services(salon_id, session.get("chosen_barber_id"))
 
     # Если нужно, можно сбросить выбранные услуги:
     # session["chosen_services"] = []
 
-    kb = build_services_keyboard(services, session.get("chosen_services", []))
+    try:
+        kb = build_services_keyboard(services, await session_state(session))
+    except CallbackTooLong:
+        # Выбор из сессии не помещается в кнопки — начинаем выбор заново
+        logger.warning("Chosen services do not fit into callback data, selection reset")
+        session["chosen_services"] = []
+        kb = build_services_keyboard(services, await session_state(session))
     await message.reply_text(
         "Выберите услуги и нажмите готово.",
         reply_markup=InlineKeyboardMarkup(kb)
     )
     return CHOOSING_SERVICES
 
-def build_services_keyboard(services, chosen_ids, row_size=2):
+def build_services_keyboard(services, state, row_size=2):
     """
     Строит кнопки по row_size=2.
     Если услуга выбрана -> "✔" префикс.
     Последняя строка содержит две фиксированные кнопки:
     "Готово" и "Сменить мастера".
+    Все кнопки подписаны и несут текущий выбор (state.services — битовая
+    маска по индексу услуги в services), у кнопки услуги arg — её индекс.
+    CallbackTooLong, если выбор не помещается в callback_data.
     """
     buttons = []
-    for svc in services:
-        sid_str = str(svc["id"])
-        prefix = "✅ " if sid_str in chosen_ids else ""
-        text = prefix + svc["name"]
-        cb_data = f"svc_{sid_str}"
+    for i, svc in enumerate(services):
+        prefix = "✅ " if state.services >> i & 1 else ""
+        text = prefix + svc.name
+        cb_data = encode_callback("svc", state.replace(arg=i))
         buttons.append(InlineKeyboardButton(text, callback_data=cb_data))
 
     # Создаем клавиатуру с кнопками услуг
@@ -87,105 +76,59 @@ def build_services_keyboard(services, chosen_ids, row_size=2):
 
     # фиксированный ряд с двумя кнопками: "Готово" и "Сменить мастера"
     keyboard.append([
-        InlineKeyboardButton("Готово", callback_data="services_done"),
-        InlineKeyboardButton("Сменить мастера", callback_data="change_barber")
+        InlineKeyboardButton("Готово", callback_data=encode_callback("sdone", state)),
+        InlineKeyboardButton("Сменить мастера", callback_data=encode_callback("chb", state))
     ])
 
     return keyboard
 
-
-async def handle_service_selection(update: Update, context: CallbackContext):
+async def handle_service_selection(update: Update, context: CallbackContext, action, state):
     """
-    Toggle услугу (svc_xx) или "services_done" -> формируем booking_details и переходим к choose_day.
+    Toggle услугу ("svc") или "sdone" -> формируем booking_details и переходим к choose_day.
+    Выбор целиком приходит в подписанной кнопке, сессия восстанавливается по нему.
     """
     query = update.callback_query
-    data = query.data
     user_id = query.from_user.id
     session = get_session(user_id)
 
-    services = session.get("services_list", [])
-    chosen_ids = session.get("chosen_services", [])
-
-    if data == "services_done":
-        from utils.functions import parse_duration_to_minutes
-
-        # Если выбраны услуги, формируем booking_details на их основе
-        if chosen_ids:
-            sum_duration = 0
-            service_objects = []
-            chosen_names = []
-            category_id = None  # Если услуги из одной категории
-
-            for svc in services:
-                sid_str = str(svc["id"])
-                if sid_str in chosen_ids:
-                    # Запоминаем категорию (если услуг несколько, будет последняя, но обычно услуги из одной категории)
-                    category_id = svc.get("category")
-                    chosen_names.append(svc["name"])
-                    dur_minutes = parse_duration_to_minutes(svc.get("duration"))
-                    sum_duration += dur_minutes
-                    service_objects.append({
-                        "serviceId": svc["id"],
-                        "duration": dur_minutes,
-                        "categoryId": category_id
-                    })
-
-            booking_details = [{
-                "categoryId": category_id,
-                "services": service_objects,
-                "barberId": session["chosen_barber"]["id"],
-                "duration": sum_duration
-            }]
-            session["booking_details"] = booking_details
-            session["total_service_duration"] = sum_duration
-
-            if chosen_names:
-                await query.message.reply_text(
-                    f"Вы выбрали: {', '.join(chosen_names)} (общая длит. ~{sum_duration} мин)"
-                )
-            else:
-                await query.message.reply_text("Вы ничего не выбрали (неизв. ошибка).")
+    await restore_session(session, state)
+
+    if action == "sdone":
+        # booking_details уже собраны по выбранным услугам (utils/booking_state.py)
+        chosen_services = await get_chosen_services(session)
+        sum_duration = session["total_service_duration"]
+        if chosen_services:
+            chosen_names = [svc.name for svc in chosen_services]
+            await query.message.reply_text(
+                f"Вы выбрали: {', '.join(chosen_names)} (общая длит. ~{sum_duration} мин)"
+            )
+        elif session["booking_details"]:
+            # Услуги не выбраны, но выбран мастер (или «любой мастер»):
+            # бронирование с длительностью по умолчанию
+            chosen_barber = await get_barber(session["salon_id"], session.get("chosen_barber_id"))
+            barber_name = chosen_barber.name if chosen_barber else "любой свободный"
+            await query.message.reply_text(
+                f"Вы не выбрали услуги, но выбран мастер {barber_name}. "
+                f"Бронирование будет оформлено с длительностью по умолчанию ~{sum_duration} мин."
+            )
         else:
-            # Если услуги не выбраны, но, возможно, выбран мастер
-            if "chosen_barber" in session and session["chosen_barber"]:
-                # Используем дефолтную длительность для бронирования.
-                # Здесь можно использовать значение из настроек салона или задать фиксированное значение, например, 30 минут.
-                default_duration = session.get("salon_default_duration", 30)
-                booking_details = [{
-                    "categoryId": None,       # Услуги не выбраны, поэтому категория отсутствует
-                    "services": [],
-                    "barberId": session["chosen_barber"]["id"],
-                    "duration": default_duration
-                }]
-                session["booking_details"] = booking_details
-                session["total_service_duration"] = default_duration
-                await query.message.reply_text(
-                    f"Вы не выбрали услуги, но выбран мастер {session['chosen_barber']['name']}. "
-                    f"Бронирование будет оформлено с длительностью по умолчанию ~{default_duration} мин."
-                )
-            else:
-                # Если и мастер не выбран (маловероятно), просто устанавливаем дефолт
-                session["booking_details"] = []
-                session["total_service_duration"] = 30
-                await query.message.reply_text("Вы не выбрали ни одной услуги.")
+            await query.message.reply_text("Вы не выбрали ни одной услуги.")
 
         # Переходим к выбору даты
-        from handlers.datetime_handler import choose_day
         return await choose_day(update, context)
 
-    elif data.startswith("svc_"):
-        sid_str = data.split("_")[1]
-        if sid_str in chosen_ids:
-            chosen_ids.remove(sid_str)
-        else:
-            chosen_ids.append(sid_str)
-        session["chosen_services"] = chosen_ids
-
-        new_kb = build_services_keyboard(services, chosen_ids)
+    elif action == "svc":
+        state = state.replace(services=state.services ^ (1 << state.arg))
+        services = await get_barber_services(session["salon_id"], session.get("chosen_barber_id"))
+        try:
+            new_kb = build_services_keyboard(services, state)
+        except CallbackTooLong:
+            # Выбор остаётся прежним: кнопки с ним уже на экране
+            await query.answer("Слишком много услуг для одной записи.", show_alert=True)
+            return CHOOSING_SERVICES
+        await restore_session(session, state)
         await query.edit_message_reply_markup(InlineKeyboardMarkup(new_kb))
         return CHOOSING_SERVICES
 
     else:
         await query.answer("Неизвестная команда")
-        return CHOOSING_SERVICES
-
@@ -0,0 +1,15 @@
+# handlers/steps.py
+# Переходы «назад» между шагами записи (к услугам, к телефону) без
+# взаимных импортов модулей handlers. Модуль шага регистрирует функцию входа
+# по константе из states.py, остальные вызывают go_to(состояние, ...).
+_STEPS = {}
+
+def step(state):
+    """Декоратор: функция входа в шаг state."""
+    def register(func):
+        _STEPS[state] = func
+        return func
+    return register
+
+async def go_to(state, update, context):
+    return await _STEPS[state](update, context)
@@ -3,14 +3,46 @@ from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
     MessageHandler,
-    CallbackQueryHandler,
     ConversationHandler,
     filters
 )
 from telegram import BotCommand
+from telegram.error import TelegramError
 import asyncio
 
-from config import TELEGRAM_BOT_TOKEN
+from config import (
+    TELEGRAM_BOT_TOKEN,
+    PERSISTENCE_PATH,
+    PERSISTENCE_FLUSH_INTERVAL,
+    MAX_CONCURRENT_UPDATES,
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    BOT_WORKERS,
+    WORKER_BASE_PORT,
+    WORKER_INDEX,
+    RATE_LIMIT_GLOBAL_PER_SECOND,
+    RATE_LIMIT_CHAT_PER_SECOND,
+    RATE_LIMIT_GROUP_PER_MINUTE,
+    RATE_LIMIT_CHAT_BURST,
+    RATE_LIMIT_MAX_RETRIES,
+    CATALOG_WARM_CONCURRENCY,
+)
+from utils.api import close_client, get_cache_stats
+from utils.session import session_store, get_session_stats
+from utils.media_cache import media_cache, get_media_stats
+from utils.thumbnails import thumbnail_service
+from utils.catalog_warmer import catalog_warmer
+from utils.storage import StateStorage
+from utils.persistence import StoragePersistence
+from utils.updates import PerUserUpdateProcessor
+from utils.ratelimit import PriorityRateLimiter
+from utils.webhook import serve_webhook
+from utils.callback_router import CallbackRouter
+from utils.sharding import spawn_worker, stop_workers, serve_front, WorkerSupervisor
 from handlers.admin import get_admin_conv_handler
 from handlers.language import handle_language_command, handle_language_selection
 from handlers.salon import ask_for_salon, choose_salon_callback
@@ -53,12 +85,133 @@ async def set_bot_commands(application):
     ]
     await application.bot.set_my_commands(commands)
 
-def main():
-    app = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+# Хранилище сессий и состояний диалогов (None — сохранение отключено)
+storage = None
+update_processor = PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES)
+rate_limiter = PriorityRateLimiter(
+    global_per_second=RATE_LIMIT_GLOBAL_PER_SECOND,
+    chat_per_second=RATE_LIMIT_CHAT_PER_SECOND,
+    chat_burst=RATE_LIMIT_CHAT_BURST,
+    group_per_minute=RATE_LIMIT_GROUP_PER_MINUTE,
+    max_retries=RATE_LIMIT_MAX_RETRIES,
+)
+
+# Все inline-кнопки диалога записи. Подписанные кнопки (utils/callback_data.py)
+# несут всё состояние записи, поэтому роутер — точка входа: нажатие
+# принимается в любом состоянии диалога, после перезапуска и на любом
+# рабочем процессе.
+callback_router = (
+    CallbackRouter()
+    .signed("bar", handle_barber_selection)
+    .signed(("svc", "sdone"), handle_service_selection)
+    .signed("chb", handle_change_barber)
+    .signed(("day", "earl"), handle_day_selection)
+    .signed(("hour", "chd"), handle_hour_selection)
+    .signed("min", handle_minute_selection)
+    .signed("chh", handle_change_hour)
+    .signed("chs", handle_change_services)
+    .signed("conf", confirm_booking)
+    .route("salon", choose_salon_callback, int)
+    .route("cancel_booking", cancel_booking)
+)
+
+async def post_init(application):
+    if storage:
+        storage.start(PERSISTENCE_FLUSH_INTERVAL)
+    # Команды регистрирует один процесс: в многопроцессном режиме — рабочий 0
+    if WORKER_INDEX in ("", "0"):
+        try:
+            await set_bot_commands(application)
+        except TelegramError as e:
+            logger.warning("set_my_commands failed: %s", e)
+    # Каталог загружается до первого /start; дальше его обновляет JobQueue
+    if catalog_warmer.interval > 0:
+        await catalog_warmer.warm()
+        catalog_warmer.schedule(application.job_queue)
+
+async def post_shutdown(application):
+    thumbnail_service.shutdown()
+    await close_client()
+    if storage:
+        await storage.close()
+
+def health_stats():
+    """Статистика для /healthz в режиме webhook."""
+    return {
+        "worker": WORKER_INDEX or None,
+        "updates": update_processor.stats(),
+        "callbacks": callback_router.stats(),
+        "outbound": rate_limiter.stats(),
+        "sessions": get_session_stats(),
+        "caches": get_cache_stats(),
+        "media": get_media_stats(),
+        "thumbnails": thumbnail_service.stats(),
+        "catalog_warmer": catalog_warmer.stats(),
+        "storage": storage.stats() if storage else None,
+    }
+
+def run_front():
+    """Фронт многопроцессного режима: рабочие процессы + пересылка обновлений."""
+    # Общий лимит Telegram на бота и число одновременных запросов прогрева
+    # каталога (у каждого рабочего свой кэш) делятся между рабочими процессами
+    env = {
+        "RATE_LIMIT_GLOBAL_PER_SECOND": str(RATE_LIMIT_GLOBAL_PER_SECOND / BOT_WORKERS),
+        "CATALOG_WARM_CONCURRENCY": str(max(1, CATALOG_WARM_CONCURRENCY // BOT_WORKERS)),
+    }
+
+    def respawn(index):
+        return spawn_worker(index, WORKER_BASE_PORT, PERSISTENCE_PATH, WEBHOOK_SECRET, env=env)
+
+    workers = [respawn(index) for index in range(BOT_WORKERS)]
+    supervisor = WorkerSupervisor(workers, respawn)
+    try:
+        asyncio.run(serve_front(
+            TELEGRAM_BOT_TOKEN,
+            mode=BOT_MODE,
+            workers=BOT_WORKERS,
+            base_port=WORKER_BASE_PORT,
+            secret_token=WEBHOOK_SECRET,
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            max_connections=MAX_CONCURRENT_UPDATES,
+            supervisor=supervisor,
+        ))
+    finally:
+        # Список процессов supervisor обновляет при перезапусках
+        stop_workers(supervisor.processes)
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(set_bot_commands(app))
+def build_application(bot=None):
+    """
+    Собирает Application со всеми хендлерами, не обращаясь к Telegram.
+    bot — готовый экземпляр ExtBot вместо TELEGRAM_BOT_TOKEN
+    (benchmarks/bench_startup.py); ограничитель исходящих запросов тогда
+    задаётся в самом боте.
+    """
+    global storage
+    if PERSISTENCE_PATH:
+        storage = StateStorage(PERSISTENCE_PATH)
+
+    builder = ApplicationBuilder()
+    if bot:
+        builder = builder.bot(bot)
+    else:
+        builder = builder.token(TELEGRAM_BOT_TOKEN).rate_limiter(rate_limiter)
+    builder = (
+        builder
+        .concurrent_updates(update_processor)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if storage:
+        session_store.attach(storage)
+        media_cache.attach(storage)
+        thumbnail_service.attach(storage)
+        builder = builder.persistence(
+            StoragePersistence(storage, update_interval=PERSISTENCE_FLUSH_INTERVAL)
+        )
+    app = builder.build()
 
     language_handler = CommandHandler("language", handle_language_command)
     app.add_handler(language_handler)
@@ -68,47 +221,27 @@ def main():
         entry_points=[
             CommandHandler("start", ask_for_salon),
             # CommandHandler("admin", admin_start)
+            callback_router,
         ],
 
+        # Кнопки всех шагов записи разбирает callback_router: он же точка входа
+        # (нажатие без активного диалога, после перезапуска), а в состояниях,
+        # которые возвращают его хендлеры, он зарегистрирован, чтобы диалог
+        # знал эти состояния.
         states={
             CHOOSING_LANGUAGE: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, handle_language_selection)
             ],
-            CHOOSING_SALON: [
-                CallbackQueryHandler(choose_salon_callback, pattern="^salon_.*")
-            ],
-            CHOOSING_BARBERS: [
-                CallbackQueryHandler(handle_barber_selection, pattern="^barber_.*")
-            ],
+            CHOOSING_SALON: [callback_router],
+            CHOOSING_BARBERS: [callback_router],
             CHOOSING_SERVICES: [
                 CommandHandler("services", choose_services),
-                CallbackQueryHandler(handle_service_selection, pattern="^(svc_\\d+|services_done)$"),
-                CallbackQueryHandler(handle_change_barber, pattern="^change_barber$")
-            ],
-            CHOOSING_DATE: [
-                CallbackQueryHandler(
-                    handle_day_selection, 
-                    pattern="^(day_\\d{4}-\\d{2}-\\d{2}|change_day|change_services)$"
-                )
-            ],
-            CHOOSING_HOUR: [
-                CallbackQueryHandler(
-                    handle_hour_selection, 
-                    pattern="^(hour_\\d+|change_day|change_services)$"
-                )
-            ],
-            CHOOSING_MINUTES: [
-                CallbackQueryHandler(
-                    handle_minute_selection, 
-                    pattern="^(min_\\d+:\\d{2}|change_hour|change_services)$"
-                )
-            ],
-            CONFIRM_BOOKING: [
-                CallbackQueryHandler(confirm_booking, pattern="^confirm_.*"),
-                CallbackQueryHandler(cancel_booking, pattern="^cancel_booking$"),
-                CallbackQueryHandler(handle_change_hour, pattern="^change_hour$"),
-                CallbackQueryHandler(handle_change_services, pattern="^change_services$")
+                callback_router,
             ],
+            CHOOSING_DATE: [callback_router],
+            CHOOSING_HOUR: [callback_router],
+            CHOOSING_MINUTES: [callback_router],
+            CONFIRM_BOOKING: [callback_router],
             ASK_TG_PHONE: [
                 MessageHandler(filters.CONTACT | filters.TEXT, handle_telegram_phone)
             ]
@@ -118,14 +251,36 @@ def main():
         ],
         allow_reentry=True,
         per_user=True,
-        per_chat=False
+        per_chat=False,
+        name="booking",
+        persistent=bool(storage)
     )
 
-    admin_conv_handler = get_admin_conv_handler()
+    admin_conv_handler = get_admin_conv_handler(persistent=bool(storage))
     app.add_handler(admin_conv_handler)
 
     app.add_handler(conv_handler)
-    app.run_polling()
+    return app
+
+def main():
+    if BOT_WORKERS > 1:
+        run_front()
+        return
+
+    app = build_application()
+    if BOT_MODE == "webhook":
+        asyncio.run(serve_webhook(
+            app,
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            webhook_url=WEBHOOK_URL,
+            max_connections=MAX_CONCURRENT_UPDATES,
+            stats=health_stats,
+        ))
+    else:
+        app.run_polling()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,11 @@
+# tests/conftest.py
+# config.py читает окружение при импорте: задаём безопасные значения до
+# импорта модулей бота (реальный токен и сеть тестам не нужны).
+import os
+import sys
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "1:test")
+os.environ.setdefault("CALLBACK_SECRET", "test-secret")
+os.environ.setdefault("API_BASE_URL", "http://reservon.test/api")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
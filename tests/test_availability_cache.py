@@ -0,0 +1,70 @@
+# tests/test_availability_cache.py
+# Кэш свободного времени (utils/api.py): сброс после бронирования, пока
+# запрос к серверу ещё выполняется.
+import asyncio
+import json
+
+import httpx
+
+import utils.api as api
+
+PAYLOAD = {
+    "salon_id": 1,
+    "date": "2099-01-01",
+    "hours": [10],
+    "booking_details": [{"categoryId": None, "services": [], "barberId": 7, "duration": 30}],
+    "total_service_duration": 30,
+}
+
+def run_with_server(scenario):
+    """Сервер отдаёт slots[0] и ждёт release; возвращает результат scenario."""
+    slots = [{"10": [0, 30]}]
+    release = asyncio.Event()
+    requests = []
+
+    async def handler(request):
+        requests.append(json.loads(request.content))
+        answer = slots[0]
+        await release.wait()
+        return httpx.Response(200, json={"available_minutes": answer})
+
+    async def main():
+        api._availability_cache.clear()
+        api._availability_generations.clear()
+        api._client = httpx.AsyncClient(base_url=api.API_BASE_URL, transport=httpx.MockTransport(handler))
+        try:
+            return await scenario(slots, release, requests)
+        finally:
+            await api.close_client()
+
+    return asyncio.run(main())
+
+def test_invalidate_while_in_flight_does_not_join_old_request():
+    async def scenario(slots, release, requests):
+        before = asyncio.ensure_future(api.get_available_minutes(PAYLOAD))
+        await asyncio.sleep(0.01)
+        # Бронирование 10:00 подтверждено, пока запрос A ещё у сервера
+        slots[0] = {"10": [30]}
+        api.invalidate_availability(1, 7, "2099-01-01")
+        after = asyncio.ensure_future(api.get_available_minutes(PAYLOAD))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await before, await after, len(requests)
+
+    old, new, calls = run_with_server(scenario)
+    assert old == {"available_minutes": {"10": [0, 30]}}
+    assert new == {"available_minutes": {"10": [30]}}
+    assert calls == 2
+    cached = api._availability_cache.peek(api.availability_key(PAYLOAD))
+    assert cached["10"][0] == [30]
+
+def test_concurrent_requests_of_same_generation_are_coalesced():
+    async def scenario(slots, release, requests):
+        tasks = [asyncio.ensure_future(api.get_available_minutes(PAYLOAD)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*tasks), len(requests)
+
+    results, calls = run_with_server(scenario)
+    assert calls == 1
+    assert all(r == {"available_minutes": {"10": [0, 30]}} for r in results)
@@ -0,0 +1,139 @@
+# tests/test_callback_data.py
+# Кодек подписанных callback_data (utils/callback_data.py): кодирование без
+# потерь, лимит Telegram в 64 байта, отказ при подделке, чужой версии и
+# устаревшем каталоге услуг.
+import asyncio
+import base64
+import random
+
+import pytest
+
+import utils.api as api
+import utils.callback_data as callback_data
+from utils.booking_state import restore_session, session_state
+from utils.callback_data import (
+    CALLBACK_VERSION,
+    MAX_CALLBACK_BYTES,
+    CallbackState,
+    CallbackTooLong,
+    InvalidCallback,
+    StaleCallback,
+    decode_callback,
+    encode_callback,
+)
+from utils.models import Salon
+
+# Все подписанные действия (utils/callback_router.py, main.py)
+ACTIONS = ["bar", "svc", "sdone", "chb", "day", "earl", "hour", "chd", "min", "chh", "chs", "conf"]
+
+def full_state(**changes):
+    """Самое длинное реалистичное состояние: все поля заполнены и максимальны."""
+    state = CallbackState(
+        2**32 - 1, barber_id=2**32 - 1, any_barber=True, services=2**120 - 1,
+        date="2030-12-31", time=23 * 60 + 55, arg=2**16 - 1, catalog=2**32 - 1,
+    )
+    return state.replace(**changes) if changes else state
+
+def reencode(data, mutate):
+    """Заново подписанные данные с изменённым payload (как если бы их выдал другой код)."""
+    action, _, token = data.partition(":")
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    payload = mutate(bytearray(raw[:-callback_data.MAC_BYTES]))
+    payload = bytes(payload)
+    token = base64.urlsafe_b64encode(payload + callback_data._mac(action, payload)).rstrip(b"=").decode()
+    return f"{action}:{token}"
+
+@pytest.mark.parametrize("action", ACTIONS)
+def test_round_trip_every_action(action):
+    rnd = random.Random(action)
+    for _ in range(200):
+        state = CallbackState(
+            rnd.randint(1, 2**32 - 1),
+            barber_id=rnd.choice([None, rnd.randint(1, 2**32 - 1)]),
+            any_barber=rnd.random() < 0.3,
+            services=rnd.getrandbits(rnd.choice([0, 8, 40, 120])),
+            date=rnd.choice([None, f"{rnd.randint(2024, 2030)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"]),
+            time=rnd.choice([None, 0, rnd.randrange(0, 24 * 60, 5)]),
+            arg=rnd.randint(0, 2**16 - 1),
+            catalog=rnd.getrandbits(32),
+        )
+        data = encode_callback(action, state)
+        assert len(data.encode()) <= MAX_CALLBACK_BYTES
+        assert decode_callback(data) == (action, state)
+
+@pytest.mark.parametrize("action", ACTIONS)
+def test_largest_state_fits_limit(action):
+    data = encode_callback(action, full_state())
+    assert len(data.encode()) <= MAX_CALLBACK_BYTES
+    assert decode_callback(data) == (action, full_state())
+
+def test_few_services_from_long_list_fit():
+    # «Любой мастер»: все услуги салона, выбраны несколько в конце списка
+    state = full_state(services=(1 << 199) | (1 << 150) | (1 << 3))
+    data = encode_callback("sdone", state)
+    assert len(data.encode()) <= MAX_CALLBACK_BYTES
+    assert decode_callback(data)[1] == state
+
+def test_oversized_state_raises_callback_too_long():
+    with pytest.raises(CallbackTooLong):
+        encode_callback("sdone", full_state(services=2**200 - 1))
+
+def test_tampered_data_is_rejected():
+    data = encode_callback("conf", full_state())
+    action, _, token = data.partition(":")
+    raw = bytearray(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    for i in range(len(raw)):
+        forged = bytearray(raw)
+        forged[i] ^= 1
+        token = base64.urlsafe_b64encode(bytes(forged)).rstrip(b"=").decode()
+        with pytest.raises(InvalidCallback):
+            decode_callback(f"{action}:{token}")
+    # Подпись привязана к действию
+    with pytest.raises(InvalidCallback):
+        decode_callback("svc:" + data.partition(":")[2])
+
+@pytest.mark.parametrize("junk", ["", "svc", "svc:", "svc:!!!", "salon_12", "svc:AAAA"])
+def test_junk_is_rejected(junk):
+    with pytest.raises(InvalidCallback):
+        decode_callback(junk)
+
+def test_unknown_version_is_rejected():
+    data = encode_callback("day", full_state())
+
+    def bump_version(payload):
+        payload[0] = CALLBACK_VERSION + 1
+        return payload
+
+    with pytest.raises(InvalidCallback, match="version"):
+        decode_callback(reencode(data, bump_version))
+
+SALON = {
+    "id": 3, "name": "S", "mod": "category", "appointment_mod": "handler",
+    "barbers": [{"id": 1, "name": "A", "categories": [2]}],
+    "services": [
+        {"id": 5, "name": "Cut", "category": 2, "duration": "00:30:00"},
+        {"id": 6, "name": "Beard", "category": 2, "duration": "00:20:00"},
+    ],
+}
+
+def test_changed_catalog_raises_stale_callback():
+    async def scenario():
+        api._salon_details_cache.set("3", Salon.from_dict(SALON))
+        session = {"salon_id": "3", "chosen_barber_id": 1, "chosen_services": ["6"]}
+        state = decode_callback(encode_callback("sdone", await session_state(session)))[1]
+
+        # Та же версия каталога — выбор восстанавливается
+        restored = {}
+        await restore_session(restored, state)
+        assert restored["chosen_services"] == ["6"]
+
+        # Услугу добавили в начало списка: индекс в маске указывает на другую услугу
+        changed = dict(SALON, services=[{"id": 4, "name": "Wash", "category": 2, "duration": "00:10:00"}] + SALON["services"])
+        api._salon_details_cache.set("3", Salon.from_dict(changed))
+        with pytest.raises(StaleCallback):
+            await restore_session({}, state)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        api._salon_details_cache.clear()
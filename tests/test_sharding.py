@@ -0,0 +1,47 @@
+# tests/test_sharding.py
+# Перезапуск упавших рабочих процессов (utils/sharding.py, WorkerSupervisor).
+from utils.sharding import WorkerSupervisor
+
+class FakeProcess:
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+def make_supervisor(count=2, **kwargs):
+    spawned = []
+
+    def respawn(index):
+        process = FakeProcess()
+        spawned.append(index)
+        return process
+
+    supervisor = WorkerSupervisor([FakeProcess() for _ in range(count)], respawn, **kwargs)
+    return supervisor, spawned
+
+def test_dead_worker_is_restarted_after_delay():
+    supervisor, spawned = make_supervisor(min_delay=1, max_delay=60)
+    supervisor._started = [0, 0]
+    supervisor.processes[1].returncode = 1
+
+    supervisor.check(now=100)
+    assert spawned == []
+    supervisor.check(now=101)
+    assert spawned == [1]
+    assert supervisor.stats() == {"restarts": [0, 1], "alive": [True, True]}
+
+def test_crash_loop_backs_off():
+    supervisor, spawned = make_supervisor(count=1, min_delay=1, max_delay=8)
+    restarts_at = []
+    now = 0.0
+    while now < 40:
+        supervisor.processes[0].returncode = 1  # падает сразу после запуска
+        before = len(spawned)
+        supervisor.check(now=now)
+        if len(spawned) > before:
+            restarts_at.append(now)
+        now += 0.5
+    # Пауза удваивается до max_delay (+0.5 с: падение видно при следующей проверке)
+    gaps = [b - a for a, b in zip(restarts_at, restarts_at[1:])]
+    assert gaps[:4] == [2.5, 4.5, 8.5, 8.5]
@@ -0,0 +1,82 @@
+# tests/test_slots.py
+# Локальный расчёт слотов (utils/slots.py) против перебора, как на сервере.
+import random
+
+from utils.slots import (
+    DayAvailability,
+    combined_start_mask,
+    hours_mask,
+    mask_hours,
+    mask_minutes_in_hour,
+    mask_nearest,
+    mask_starts,
+)
+
+STEP = 5
+WORKING = (10 * 60, 20 * 60)
+
+def make_busy(seed, count=12):
+    rnd = random.Random(seed)
+    busy = []
+    for _ in range(count):
+        start = rnd.randrange(WORKING[0], WORKING[1], STEP)
+        busy.append((start, start + rnd.choice([15, 20, 30, 45, 60])))
+    return busy
+
+def is_free(busy, start, end):
+    return WORKING[0] <= start and end <= WORKING[1] and all(end <= b or start >= e for b, e in busy)
+
+def naive_starts(segments):
+    """segments — [(busy, duration)]: части подряд, каждая у своего мастера."""
+    starts = []
+    for start in range(0, 24 * 60, STEP):
+        offset = start
+        ok = True
+        for busy, duration in segments:
+            if not is_free(busy, offset, offset + duration):
+                ok = False
+                break
+            offset += duration
+        if ok:
+            starts.append(start)
+    return starts
+
+def day_from_server(busy):
+    """DayAvailability так, как её собирает api.get_day_availability: ответ для длительности = шаг."""
+    starts = naive_starts([(busy, STEP)])
+    available = {}
+    for start in starts:
+        available.setdefault(str(start // 60), []).append(start % 60)
+    return DayAvailability.from_available_minutes(available, STEP, STEP)
+
+def test_single_duration_matches_naive():
+    busy = make_busy(1)
+    day = day_from_server(busy)
+    for duration in (5, 15, 30, 45, 50, 90, 120):
+        assert day.start_minutes(duration) == naive_starts([(busy, duration)])
+
+def test_multi_service_segments_match_naive():
+    busy_a, busy_b = make_busy(2), make_busy(3)
+    day_a, day_b = day_from_server(busy_a), day_from_server(busy_b)
+    for durations in ([30, 20], [15, 45, 30], [60, 5]):
+        # Все части у одного мастера
+        mask = combined_start_mask([(day_a, d) for d in durations])
+        assert mask_starts(mask) == naive_starts([(busy_a, d) for d in durations])
+        # Части у разных мастеров
+        mask = combined_start_mask([(day_a, durations[0])] + [(day_b, d) for d in durations[1:]])
+        assert mask_starts(mask) == naive_starts([(busy_a, durations[0])] + [(busy_b, d) for d in durations[1:]])
+
+def test_mask_queries():
+    busy = make_busy(4)
+    day = day_from_server(busy)
+    mask = combined_start_mask([(day, 50)]) & hours_mask(range(11, 18))
+    starts = [s for s in naive_starts([(busy, 50)]) if 11 * 60 <= s < 18 * 60]
+
+    assert mask_starts(mask) == starts
+    assert mask_hours(mask) == sorted({s // 60 for s in starts})
+    for hour in range(24):
+        assert mask_minutes_in_hour(mask, hour) == [s % 60 for s in starts if s // 60 == hour]
+        target = hour * 60
+        before = [s for s in starts if s <= target]
+        after = [s for s in starts if s >= target]
+        assert mask_nearest(mask, target) == (before[-1] if before else None, after[0] if after else None)
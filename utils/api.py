@@ -1,20 +1,296 @@
 # utils/api.py
-import requests
-from config import API_BASE_URL
+import asyncio
+import datetime
+import json
+import logging
+import time
+import httpx
+from config import (
+    API_BASE_URL,
+    API_TIMEOUT,
+    API_CONNECT_TIMEOUT,
+    API_MAX_CONNECTIONS,
+    API_MAX_KEEPALIVE,
+    CATALOG_TTL,
+    CATALOG_STALE_TTL,
+    CATALOG_MAX_ENTRIES,
+    AVAILABILITY_TTL,
+    AVAILABILITY_MAX_ENTRIES,
+    AVAILABILITY_PREFETCH_CONCURRENCY,
+    SLOT_STEP_MINUTES,
+)
+from utils.cache import TTLCache, SingleFlight
+from utils.models import Salon, SalonList
+from utils.slots import DayAvailability
 
-def get_salons():
-    r = requests.get(f"{API_BASE_URL}/salons")
+logger = logging.getLogger(__name__)
+
+# Один общий AsyncClient на всё приложение: пул соединений и keep-alive
+# переиспользуются всеми хендлерами, запросы не блокируют event loop.
+_client = None
+
+def get_client():
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            timeout=httpx.Timeout(API_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=API_MAX_CONNECTIONS,
+                max_keepalive_connections=API_MAX_KEEPALIVE,
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+async def close_client(*args):
+    """Закрывает общий клиент (вызывается при остановке приложения)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+# Каталог (список салонов и детали салона) меняется редко, а в одном
+# сценарии бронирования запрашивается несколько раз — держим его в кэше.
+# В кэше лежат уже разобранные модели (utils/models.py): JSON разбирается
+# один раз на обновление, а не при каждом нажатии кнопки.
+_salons_cache = TTLCache("salons", CATALOG_TTL, CATALOG_STALE_TTL, max_entries=1)
+_salon_details_cache = TTLCache(
+    "salon_details", CATALOG_TTL, CATALOG_STALE_TTL, max_entries=CATALOG_MAX_ENTRIES
+)
+
+# Валидаторы последних ответов каталога (ETag / Last-Modified): обновление
+# уходит с If-None-Match / If-Modified-Since, и неизменившийся каталог стоит
+# ответа 304 без тела — JSON не передаётся и модели не собираются заново.
+_validators = {}  # путь -> заголовки условного запроса
+_not_modified = 0
+
+async def _fetch_catalog(path, conditional=False):
+    """JSON каталога или None, если сервер ответил 304 Not Modified."""
+    global _not_modified
+    headers = _validators.get(path) if conditional else None
+    r = await get_client().get(path, headers=headers)
+    if headers and r.status_code == 304:
+        _not_modified += 1
+        return None
     r.raise_for_status()
+    validators = {}
+    if r.headers.get("etag"):
+        validators["If-None-Match"] = r.headers["etag"]
+    if r.headers.get("last-modified"):
+        validators["If-Modified-Since"] = r.headers["last-modified"]
+    if validators:
+        _validators[path] = validators
+    else:
+        _validators.pop(path, None)
     return r.json()
 
-def get_salon_details(salon_id):
-    r = requests.get(f"{API_BASE_URL}/salons/{salon_id}")
+async def _fetch_salons(conditional=False):
+    return await _fetch_catalog("/salons", conditional)
+
+async def _fetch_salon_details(salon_id, conditional=False):
+    return await _fetch_catalog(f"/salons/{salon_id}", conditional)
+
+# Если модель уже в кэше (пусть и устаревшая), запрос условный: на 304
+# загрузчик возвращает её же, и TTLCache только обновляет время записи.
+async def _load_salons():
+    current = _salons_cache.peek_stale("all")
+    data = await _fetch_salons(conditional=current is not None)
+    return current if data is None else SalonList.from_list(data)
+
+async def _load_salon_details(salon_id):
+    current = _salon_details_cache.peek_stale(salon_id)
+    data = await _fetch_salon_details(salon_id, conditional=current is not None)
+    return current if data is None else Salon.from_dict(data)
+
+async def get_salons():
+    """Список салонов (SalonList)."""
+    return await _salons_cache.get("all", _load_salons)
+
+async def get_salon_details(salon_id):
+    """Салон с мастерами и услугами (Salon)."""
+    salon_id = str(salon_id)
+    return await _salon_details_cache.get(salon_id, lambda: _load_salon_details(salon_id))
+
+async def refresh_salons():
+    """Обновляет список салонов в кэше, даже если он ещё свежий (utils/catalog_warmer.py)."""
+    return await _salons_cache.refresh("all", _load_salons)
+
+async def refresh_salon_details(salon_id):
+    """Обновляет детали салона в кэше, даже если они ещё свежие."""
+    salon_id = str(salon_id)
+    return await _salon_details_cache.refresh(salon_id, lambda: _load_salon_details(salon_id))
+
+def get_cache_stats():
+    return {
+        "salons": _salons_cache.stats(),
+        "salon_details": _salon_details_cache.stats(),
+        "catalog_not_modified": _not_modified,
+        "availability": _availability_cache.stats(),
+        "availability_inflight": _availability_flight.stats(),
+    }
+
+# Одинаковые запросы свободного времени (один салон/мастер/день/длительность)
+# от разных пользователей в одно и то же время отправляются на сервер один раз.
+_availability_flight = SingleFlight("availability")
+
+def normalize_availability_payload(payload):
+    """Ключ запроса: одинаковый для эквивалентных payload (порядок ключей, типы id, порядок часов)."""
+    normalized = dict(payload)
+    normalized["salon_id"] = str(payload.get("salon_id"))
+    if "hours" in normalized:
+        normalized["hours"] = sorted(int(h) for h in normalized["hours"])
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+
+async def _fetch_available_minutes(payload):
+    r = await get_client().post("/salons/availability/", json=payload)
     r.raise_for_status()
     return r.json()
 
-def get_available_minutes(payload):
-    url = f"{API_BASE_URL}/salons/availability/"
-    r = requests.post(url, json=payload, timeout=10)
-    r.raise_for_status()
-    return r 
+# Кэш свободного времени: (salon_id, barberIds, date, total_service_duration) ->
+# {час: ([минуты], время загрузки)} для уже запрошенных часов. Без
+# stale-while-revalidate: устаревшие слоты показывать нельзя, поэтому возраст
+# проверяется у каждого часа — дозапрос новых часов не продлевает старые.
+_availability_cache = TTLCache(
+    "availability", AVAILABILITY_TTL, max_entries=AVAILABILITY_MAX_ENTRIES
+)
+# Поколение (salon_id, barberId, date) увеличивается при каждом сбросе, чтобы
+# ответ, запрошенный до бронирования, не попал в кэш после него. Поколения
+# прошедших дней удаляются (_prune_generations).
+_availability_generations = {}
+
+def availability_key(payload):
+    barber_ids = tuple(
+        str(detail.get("barberId")) for detail in payload.get("booking_details") or []
+    )
+    return (
+        str(payload.get("salon_id")),
+        barber_ids,
+        payload.get("date"),
+        int(payload.get("total_service_duration") or 0),
+    )
+
+def _generation(key):
+    salon_id, barber_ids, date, _ = key
+    return tuple(
+        _availability_generations.get((salon_id, barber_id, date), 0)
+        for barber_id in barber_ids
+    )
+
+def _fresh_hours(key):
+    """Часы записи кэша, загруженные меньше AVAILABILITY_TTL назад: {час: (минуты, время)}."""
+    cached = _availability_cache.peek(key)
+    if cached is None:
+        return {}
+    deadline = time.monotonic() - AVAILABILITY_TTL
+    return {h: entry for h, entry in cached.items() if entry[1] > deadline}
+
+async def get_available_minutes(payload):
+    if "hours" in payload and not payload["hours"]:
+        # Салон в этот день не работает — спрашивать нечего
+        return {"available_minutes": {}}
+    key = availability_key(payload)
+    hours = [str(h) for h in payload.get("hours", [])]
+    fresh = _fresh_hours(key)
+    if all(h in fresh for h in hours):
+        _availability_cache.hits += 1
+        return {"available_minutes": {h: fresh[h][0] for h in hours}}
+    _availability_cache.misses += 1
+
+    generation = _generation(key)
+    fetched_at = time.monotonic()
+    # Поколение входит в ключ: запрос после бронирования не присоединится к
+    # запросу, отправленному до него, и не получит занятый слот как свободный
+    flight_key = (normalize_availability_payload(payload), generation)
+    data = await _availability_flight.do(flight_key, lambda: _fetch_available_minutes(payload))
+
+    if _generation(key) == generation:
+        avail = data.get("available_minutes", {})
+        # Свежие часы из кэша сохраняют своё время загрузки, устаревшие отбрасываются
+        merged = _fresh_hours(key)
+        for h in hours:
+            merged[h] = (avail.get(h, []), fetched_at)
+        _availability_cache.set(key, merged)
+    return data
+
+async def get_available_minutes_many(payloads, concurrency=AVAILABILITY_PREFETCH_CONCURRENCY):
+    """
+    Параллельно (не больше `concurrency` запросов одновременно) получает
+    свободное время для нескольких payload. Для неудачных запросов — None.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(payload):
+        async with semaphore:
+            try:
+                return await get_available_minutes(payload)
+            except Exception as e:
+                logger.warning("Availability prefetch failed for %s: %s", payload.get("date"), e)
+                return None
+
+    return await asyncio.gather(*(fetch(payload) for payload in payloads))
+
+def day_availability_payload(salon_id, barber_id, date, step=SLOT_STEP_MINUTES):
+    """
+    Свободное время мастера на весь день одним запросом: длительность = шаг
+    сетки, все часы. Из ответа DayAvailability восстанавливает свободные
+    минуты, и старты для любых длительностей считаются локально.
+    """
+    return {
+        "salon_id": salon_id,
+        "date": date,
+        "hours": list(range(24)),
+        "booking_details": [{
+            "categoryId": None,
+            "services": [],
+            "barberId": barber_id,
+            "duration": step
+        }],
+        "total_service_duration": step
+    }
+
+async def get_day_availability(salon_id, barber_id, date, step=SLOT_STEP_MINUTES):
+    """
+    DayAvailability мастера на день. Запрос идёт через кэш свободного
+    времени и сбрасывается вместе с ним после бронирования.
+    """
+    data = await get_available_minutes(day_availability_payload(salon_id, barber_id, date, step))
+    return DayAvailability.from_available_minutes(data.get("available_minutes", {}), step, step)
+
+async def get_day_availability_many(salon_id, requests, step=SLOT_STEP_MINUTES):
+    """
+    requests — [(barber_id, date)]; запросы идут параллельно (как
+    get_available_minutes_many). Для неудачных — None.
+    """
+    results = await get_available_minutes_many([
+        day_availability_payload(salon_id, barber_id, date, step) for barber_id, date in requests
+    ])
+    return [
+        None if data is None
+        else DayAvailability.from_available_minutes(data.get("available_minutes", {}), step, step)
+        for data in results
+    ]
+
+def _prune_generations():
+    # Прошедшие дни больше не запрашиваются (сутки запаса на разницу часовых поясов)
+    cutoff = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    for gen_key in [k for k in _availability_generations if str(k[2]) < cutoff]:
+        del _availability_generations[gen_key]
+
+def invalidate_availability(salon_id, barber_id, date):
+    """Сбрасывает кэш свободного времени мастера на день (после бронирования)."""
+    salon_id, barber_id = str(salon_id), str(barber_id)
+    _prune_generations()
+    gen_key = (salon_id, barber_id, date)
+    _availability_generations[gen_key] = _availability_generations.get(gen_key, 0) + 1
+    removed = _availability_cache.invalidate_where(
+        lambda key: key[0] == salon_id and key[2] == date and barber_id in key[1]
+    )
+    logger.info("Availability invalidated for %s/%s/%s (%d entries)", salon_id, barber_id, date, removed)
+
+async def book_salon(salon_id, payload):
+    # Возвращаем сам ответ: хендлеры сами разбирают коды ошибок бронирования
+    return await get_client().post(f"/salons/{salon_id}/book/", json=payload)
 
+async def verify_admin(phone_number):
+    return await get_client().post("/admin/verify/", json={"phone_number": phone_number})
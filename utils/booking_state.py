@@ -0,0 +1,85 @@
+# utils/booking_state.py
+# Состояние записи: сессия <-> подписанные кнопки (utils/callback_data.py).
+# Хендлеры восстанавливают сессию из нажатой кнопки (её разбирает
+# utils/callback_router.py), поэтому поток записи не зависит от того,
+# сохранилась ли сессия и какой процесс принял нажатие.
+from utils.api import get_salon_details
+from utils.callback_data import CallbackState, StaleCallback
+from utils.slots import minutes_to_hm
+
+DEFAULT_DURATION = 30
+
+def build_booking_details(chosen_services, barber_id, any_barber, default_duration=DEFAULT_DURATION):
+    """booking_details и общая длительность для /book/ и /salons/availability/."""
+    if chosen_services:
+        total = sum(svc.duration for svc in chosen_services)
+        # Если услуг несколько, категория — последней (обычно услуги из одной категории)
+        category_id = chosen_services[-1].category
+        details = [{
+            "categoryId": category_id,
+            "services": [
+                {"serviceId": svc.id, "duration": svc.duration, "categoryId": svc.category}
+                for svc in chosen_services
+            ],
+            "barberId": barber_id,
+            "duration": total
+        }]
+        return details, total
+    if barber_id is not None or any_barber:
+        # Услуги не выбраны — бронируем мастера на длительность по умолчанию
+        return [{
+            "categoryId": None,
+            "services": [],
+            "barberId": barber_id,
+            "duration": default_duration
+        }], default_duration
+    return [], DEFAULT_DURATION
+
+async def session_state(session, **changes):
+    """Состояние записи из сессии для кнопки; changes — date, time, arg и т. п."""
+    salon = await get_salon_details(session["salon_id"])
+    barber_id = session.get("chosen_barber_id")
+    chosen = set(session.get("chosen_services", []))
+    mask = 0
+    for i, svc in enumerate(salon.services_for_barber(barber_id)):
+        if str(svc.id) in chosen:
+            mask |= 1 << i
+    state = CallbackState(
+        session["salon_id"],
+        barber_id=barber_id,
+        any_barber=session.get("any_barber"),
+        services=mask,
+        catalog=salon.services_digest(barber_id),
+    )
+    return state.replace(**changes) if changes else state
+
+async def restore_session(session, state):
+    """
+    Переписывает поля записи в сессии по состоянию из кнопки. StaleCallback,
+    если маска услуг (и индекс услуги в arg) относится к другой версии каталога.
+    """
+    salon = await get_salon_details(state.salon_id)
+    barber = salon.barber(state.barber_id)
+    barber_id = barber.id if barber else None
+    # Кнопки выбора мастера (handlers/barbers.py) без услуг — без версии каталога
+    if state.catalog and state.catalog != salon.services_digest(barber_id):
+        raise StaleCallback("services catalog changed")
+    services = salon.services_for_barber(barber_id)
+    chosen = [svc for i, svc in enumerate(services) if state.services >> i & 1]
+
+    session["salon_id"] = str(state.salon_id)
+    session["appointment_mod"] = salon.appointment_mod
+    session["any_barber"] = state.any_barber
+    session["chosen_barber_id"] = barber_id
+    session["chosen_services"] = [str(svc.id) for svc in chosen]
+    details, total = build_booking_details(
+        chosen, barber_id, state.any_barber,
+        session.get("salon_default_duration", DEFAULT_DURATION)
+    )
+    session["booking_details"] = details
+    session["total_service_duration"] = total
+    if state.date:
+        session["chosen_date"] = state.date
+    if state.time is not None:
+        session["chosen_time"] = minutes_to_hm(state.time)
+    return chosen
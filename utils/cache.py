@@ -0,0 +1,166 @@
+# utils/cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """
+    Асинхронный кэш с TTL и stale-while-revalidate.
+
+    - запись свежая `ttl` секунд: отдаём из памяти;
+    - ещё `stale_ttl` секунд после этого: отдаём устаревшее значение
+      и обновляем его в фоне (один фоновый запрос на ключ);
+    - дальше — обычный промах, ждём загрузчик.
+    Размер ограничен `max_entries`, вытесняются давно не использованные ключи.
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, max_entries=1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._inflight = {}            # key -> asyncio.Task загрузки
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    async def get(self, key, loader):
+        """
+        Возвращает значение по ключу; `loader` — корутинная функция без
+        аргументов, которая загружает значение при промахе.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self.refreshes += 1
+                    self._load(key, loader)
+                return value
+
+        self.misses += 1
+        # Одновременные промахи по одному ключу ждут одну и ту же загрузку
+        return await asyncio.shield(self._load(key, loader))
+
+    async def refresh(self, key, loader):
+        """Загружает значение заново, даже если запись ещё свежая (фоновый прогрев)."""
+        self.refreshes += 1
+        return await asyncio.shield(self._load(key, loader))
+
+    def _load(self, key, loader):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_loaded(key, t))
+        return task
+
+    def _on_loaded(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            # Для фонового обновления оставляем старое значение до следующей попытки
+            logger.warning("[%s] failed to load %r: %s", self.name, key, exc)
+            return
+        self.set(key, task.result())
+
+    def peek(self, key):
+        """Свежее значение без загрузки или None (счётчики не меняются)."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            return entry[0]
+        return None
+
+    def peek_stale(self, key):
+        """Значение независимо от возраста записи или None (счётчики не меняются)."""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Удаляет все ключи, для которых predicate(key) истинно; возвращает их число."""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+        }
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые запросы: пока запрос с ключом
+    `key` выполняется, остальные вызовы ждут его результат вместо
+    отправки своего.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}  # key -> asyncio.Task
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, func):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self.coalesced += 1
+            logger.debug("[%s] coalesced request %r", self.name, key)
+        # shield: отмена одного ожидающего не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    def _on_done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Забираем исключение, даже если все ожидающие уже отменены
+            task.exception()
+
+    def stats(self):
+        return {
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,143 @@
+# utils/callback_data.py
+# Компактные подписанные callback_data. Кнопка несёт всё состояние записи
+# (салон, мастер, услуги, дата, время), поэтому нажатие можно обработать без
+# сессии — после перезапуска или на другом рабочем процессе.
+#
+# Формат: "<action>:<base64url(payload + hmac)>", не длиннее 64 байт.
+#   payload: версия B, флаги B, salon_id I, barber_id I, дата H (дни от
+#   2000-01-01), время H (минуты от полуночи), arg H, версия каталога I,
+#   затем выбранные услуги (индексы в списке услуг мастера, см.
+#   Salon.services_for_barber): битовая маска или, если так короче (мало
+#   услуг выбрано из длинного списка), по байту на индекс — флаг _FLAG_LIST.
+#   hmac: первые 8 байт HMAC-SHA256 от "<action>:" + payload.
+# Версия каталога — отпечаток этого списка услуг (Salon.services_digest): если
+# после отправки кнопки каталог изменился, маска указывает на другие услуги, и
+# restore_session (utils/booking_state.py) отклоняет кнопку (StaleCallback).
+import base64
+import hashlib
+import hmac
+import struct
+from datetime import date, timedelta
+
+from config import CALLBACK_SECRET
+
+CALLBACK_VERSION = 2
+MAX_CALLBACK_BYTES = 64
+MAC_BYTES = 8
+
+_HEADER = struct.Struct(">BBIIHHHI")
+_EPOCH = date(2000, 1, 1)
+
+_FLAG_ANY_BARBER = 1
+_FLAG_DATE = 2
+_FLAG_TIME = 4
+_FLAG_LIST = 8
+
+_KEY = hashlib.sha256(b"reservon-callback:" + CALLBACK_SECRET.encode()).digest()
+
+class InvalidCallback(ValueError):
+    """Подпись не совпала, неизвестная версия или повреждённые данные."""
+
+class StaleCallback(InvalidCallback):
+    """Кнопка подписана верно, но каталог услуг с тех пор изменился."""
+
+class CallbackTooLong(ValueError):
+    """Состояние не помещается в 64 байта (выбрано слишком много услуг)."""
+
+class CallbackState:
+    __slots__ = ("salon_id", "barber_id", "any_barber", "services", "date", "time", "arg", "catalog")
+
+    def __init__(self, salon_id, barber_id=None, any_barber=False, services=0,
+                 date=None, time=None, arg=0, catalog=0):
+        self.salon_id = int(salon_id)
+        self.barber_id = int(barber_id) if barber_id else None
+        self.any_barber = bool(any_barber)
+        self.services = services  # битовая маска
+        self.date = date          # "YYYY-MM-DD" или None
+        self.time = time          # минуты от полуночи или None
+        self.arg = arg            # параметр действия (индекс услуги, час)
+        self.catalog = catalog    # отпечаток списка услуг, к которому относится маска
+
+    def replace(self, **changes):
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return CallbackState(**fields)
+
+    def __eq__(self, other):
+        return isinstance(other, CallbackState) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"CallbackState({fields})"
+
+def _mac(action, payload):
+    return hmac.new(_KEY, action.encode() + b":" + payload, hashlib.sha256).digest()[:MAC_BYTES]
+
+def encode_callback(action, state):
+    flags = 0
+    if state.any_barber:
+        flags |= _FLAG_ANY_BARBER
+    days = 0
+    if state.date:
+        flags |= _FLAG_DATE
+        days = (date.fromisoformat(state.date) - _EPOCH).days
+    if state.time is not None:
+        flags |= _FLAG_TIME
+    as_list, services = _pack_services(state.services)
+    if as_list:
+        flags |= _FLAG_LIST
+    payload = _HEADER.pack(
+        CALLBACK_VERSION, flags, state.salon_id, state.barber_id or 0,
+        days, state.time or 0, state.arg, state.catalog,
+    ) + services
+    token = base64.urlsafe_b64encode(payload + _mac(action, payload)).rstrip(b"=").decode()
+    data = f"{action}:{token}"
+    if len(data.encode()) > MAX_CALLBACK_BYTES:
+        raise CallbackTooLong(f"callback_data is {len(data.encode())} bytes, limit {MAX_CALLBACK_BYTES}")
+    return data
+
+def _pack_services(mask):
+    """(списком ли, байты): маска или индексы по байту — что короче."""
+    as_mask = mask.to_bytes((mask.bit_length() + 7) // 8, "big")
+    if not mask or mask.bit_length() > 256:
+        return False, as_mask
+    as_list = bytes(i for i in range(mask.bit_length()) if mask >> i & 1)
+    return (True, as_list) if len(as_list) < len(as_mask) else (False, as_mask)
+
+def decode_callback(data):
+    """"<action>:<token>" -> (action, CallbackState); InvalidCallback при любой ошибке."""
+    action, sep, token = data.partition(":")
+    if not sep:
+        raise InvalidCallback("no action separator")
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError) as e:
+        raise InvalidCallback("bad encoding") from e
+    if len(raw) < _HEADER.size + MAC_BYTES:
+        raise InvalidCallback("too short")
+    payload, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if not hmac.compare_digest(mac, _mac(action, payload)):
+        raise InvalidCallback("bad signature")
+    version, flags, salon_id, barber_id, days, minutes, arg, catalog = _HEADER.unpack_from(payload)
+    if version != CALLBACK_VERSION:
+        raise InvalidCallback(f"unsupported version {version}")
+    return action, CallbackState(
+        salon_id,
+        barber_id=barber_id or None,
+        any_barber=flags & _FLAG_ANY_BARBER,
+        services=_unpack_services(payload[_HEADER.size:], flags & _FLAG_LIST),
+        date=(_EPOCH + timedelta(days=days)).isoformat() if flags & _FLAG_DATE else None,
+        time=minutes if flags & _FLAG_TIME else None,
+        arg=arg,
+        catalog=catalog,
+    )
+
+def _unpack_services(data, as_list):
+    if not as_list:
+        return int.from_bytes(data, "big")
+    mask = 0
+    for i in data:
+        mask |= 1 << i
+    return mask
@@ -0,0 +1,131 @@
+# utils/callback_router.py
+# Один обработчик для всех inline-кнопок диалога вместо цепочки
+# CallbackQueryHandler с регулярными выражениями. callback_data разбирается
+# один раз, маршрут ищется по префиксному дереву токенов, а хендлер получает
+# уже разобранные типизированные аргументы.
+from telegram import Update
+from telegram.ext import BaseHandler
+
+from utils.callback_data import InvalidCallback, StaleCallback, decode_callback
+
+class Route:
+    __slots__ = ("name", "callback", "converters", "signed", "hits")
+
+    def __init__(self, name, callback, converters=(), signed=False):
+        self.name = name
+        self.callback = callback
+        self.converters = converters
+        self.signed = signed
+        self.hits = 0
+
+class _Node:
+    __slots__ = ("children", "route")
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+async def answer_stale_callback(update, context):
+    """Кнопка с неверной подписью, неизвестной версией или из устаревшего меню."""
+    await update.callback_query.answer("Меню устарело. Начните заново: /start", show_alert=True)
+
+class CallbackRouter(BaseHandler):
+    """
+    Маршруты:
+      signed("day", handler)        — подписанные "<action>:<token>"
+                                      (utils/callback_data.py):
+                                      handler(update, context, action, state);
+      route("salon", handler, int)  — простые данные из токенов через "_":
+                                      "salon_12" -> handler(update, context, 12).
+    Подписанные кнопки с неверной подписью уходят в callback
+    (по умолчанию answer_stale_callback), туда же — кнопки, для которых хендлер
+    выбросил StaleCallback (каталог изменился). У каждого маршрута — счётчик
+    срабатываний.
+    """
+
+    def __init__(self, callback=answer_stale_callback, block=True):
+        super().__init__(callback, block=block)
+        self._root = _Node()
+        self.routes = []
+        self.invalid = 0
+        self.stale = 0
+        self.misses = 0
+
+    def _add(self, tokens, route):
+        node = self._root
+        for token in tokens:
+            node = node.children.setdefault(token, _Node())
+        if node.route is not None:
+            raise ValueError(f"route {route.name!r} is already registered")
+        node.route = route
+        self.routes.append(route)
+
+    def signed(self, actions, callback):
+        for action in (actions,) if isinstance(actions, str) else actions:
+            self._add([action], Route(action, callback, signed=True))
+        return self
+
+    def route(self, path, callback, *converters):
+        self._add(path.split("_"), Route(path, callback, converters))
+        return self
+
+    def match(self, data):
+        """(Route или None для испорченной подписи, args) либо None, если маршрута нет."""
+        head, sep, _ = data.partition(":")
+        if sep:
+            node = self._root.children.get(head)
+            if node is None or node.route is None or not node.route.signed:
+                return None
+            try:
+                return node.route, decode_callback(data)
+            except InvalidCallback:
+                return None, ()
+
+        tokens = data.split("_")
+        node = self._root
+        i = 0
+        while i < len(tokens):
+            child = node.children.get(tokens[i])
+            if child is None:
+                break
+            node = child
+            i += 1
+        route = node.route
+        if route is None or route.signed or len(tokens) - i != len(route.converters):
+            return None
+        try:
+            args = tuple(convert(token) for convert, token in zip(route.converters, tokens[i:]))
+        except ValueError:
+            return None
+        return route, args
+
+    def check_update(self, update):
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        result = self.match(data)
+        if result is None:
+            self.misses += 1
+        return result
+
+    async def handle_update(self, update, application, check_result, context):
+        route, args = check_result
+        if route is None:
+            self.invalid += 1
+            return await self.callback(update, context)
+        route.hits += 1
+        try:
+            return await route.callback(update, context, *args)
+        except StaleCallback:
+            self.stale += 1
+            return await self.callback(update, context)
+
+    def stats(self):
+        return {
+            "hits": {route.name: route.hits for route in self.routes},
+            "invalid": self.invalid,
+            "stale": self.stale,
+            "misses": self.misses,
+        }
@@ -0,0 +1,28 @@
+# utils/catalog.py
+# Общий каталог салонов. Мастера и услуги берутся из кэшированных деталей
+# салона (utils/api.py, модели utils/models.py) — одна копия на всех
+# пользователей, а в сессиях хранятся только id: salon_id, chosen_barber_id,
+# chosen_services.
+from utils.api import get_salon_details
+
+async def get_barbers(salon_id):
+    salon = await get_salon_details(salon_id)
+    return salon.barbers
+
+async def get_barber(salon_id, barber_id):
+    salon = await get_salon_details(salon_id)
+    return salon.barber(barber_id)
+
+async def get_barber_services(salon_id, barber_id):
+    """Услуги, доступные у мастера (см. Salon.services_for_barber)."""
+    salon = await get_salon_details(salon_id)
+    return salon.services_for_barber(barber_id)
+
+async def get_chosen_services(session):
+    """Выбранные пользователем услуги (объекты каталога) в порядке каталога."""
+    chosen_ids = session.get("chosen_services", [])
+    if not chosen_ids:
+        return []
+    services = await get_barber_services(session["salon_id"], session.get("chosen_barber_id"))
+    chosen_ids = set(chosen_ids)
+    return [svc for svc in services if str(svc.id) in chosen_ids]
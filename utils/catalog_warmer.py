@@ -0,0 +1,78 @@
+# utils/catalog_warmer.py
+# Фоновый прогрев каталога: периодическая задача JobQueue обновляет список
+# салонов и детали каждого салона (не больше concurrency запросов сразу),
+# чтобы пользователь не ждал загрузки после истечения TTL. Запросы условные
+# (utils/api.py): неизменившийся каталог стоит ответа 304. Первый прогрев
+# выполняется при старте (post_init), до приёма обновлений.
+import asyncio
+import logging
+import time
+
+from config import CATALOG_WARM_INTERVAL, CATALOG_WARM_CONCURRENCY, CATALOG_MAX_ENTRIES
+from utils.api import refresh_salons, refresh_salon_details
+
+logger = logging.getLogger(__name__)
+
+class CatalogWarmer:
+    def __init__(self, interval, concurrency, max_salons):
+        self.interval = interval
+        self.concurrency = concurrency
+        # Больше салонов, чем вмещает кэш деталей, прогревать бессмысленно
+        self.max_salons = max_salons
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+        self.last_salons = 0
+
+    async def warm(self):
+        """Обновляет каталог; возвращает число салонов, детали которых обновлены."""
+        t0 = time.perf_counter()
+        self.runs += 1
+        try:
+            salons = await refresh_salons()
+        except Exception as e:
+            self.failures += 1
+            logger.warning("Catalog warm-up failed: %s", e)
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(salon_id):
+            async with semaphore:
+                try:
+                    await refresh_salon_details(salon_id)
+                    return True
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning("Catalog warm-up failed for salon %s: %s", salon_id, e)
+                    return False
+
+        ids = [salon.id for salon in salons][:self.max_salons]
+        done = sum(await asyncio.gather(*(refresh(salon_id) for salon_id in ids)))
+        self.last_salons = done
+        self.last_duration = time.perf_counter() - t0
+        logger.info("Catalog warmed: %d/%d salons in %.2fs", done, len(ids), self.last_duration)
+        return done
+
+    def schedule(self, job_queue):
+        """Периодический прогрев (первый запуск — через interval после старта)."""
+        if self.interval <= 0:
+            return
+        if job_queue is None:
+            logger.warning("JobQueue unavailable (python-telegram-bot[job-queue]), catalog warm-up disabled")
+            return
+        job_queue.run_repeating(self._job, interval=self.interval, first=self.interval, name="catalog_warmer")
+
+    async def _job(self, context):
+        await self.warm()
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_salons": self.last_salons,
+            "last_duration_ms": round(self.last_duration * 1000) if self.last_duration is not None else None,
+        }
+
+catalog_warmer = CatalogWarmer(CATALOG_WARM_INTERVAL, CATALOG_WARM_CONCURRENCY, CATALOG_MAX_ENTRIES)
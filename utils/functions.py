@@ -1,4 +1,6 @@
 # C:\Reservon Bot\utils\functions.py
+from datetime import datetime
+
 def parse_duration_to_minutes(dur_str):
     """
     Convert "00:30:00" or "0:20:00" to integer minutes.
@@ -14,3 +16,77 @@ def parse_duration_to_minutes(dur_str):
         return hh*60 + mm
     except:
         return 0
+
+WEEKDAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+def _parse_weekday(day):
+    if isinstance(day, int):
+        return day if 0 <= day <= 6 else None
+    day = str(day).strip().lower()
+    if day.isdigit():
+        return int(day) if 0 <= int(day) <= 6 else None
+    for i, name in enumerate(WEEKDAY_NAMES):
+        if day[:3] == name[:3]:
+            return i
+    return None
+
+def _parse_open_close(value):
+    """{"open": "10:00", "close": "18:00"} / "10:00-18:00" / ["10:00", "18:00"] -> (600, 1080)."""
+    if not value:
+        return None
+    if isinstance(value, dict):
+        if value.get("closed") or value.get("is_closed"):
+            return None
+        start = value.get("open") or value.get("start") or value.get("from")
+        end = value.get("close") or value.get("end") or value.get("to")
+    elif isinstance(value, str):
+        if "-" not in value:
+            return None
+        start, end = value.split("-", 1)
+    else:
+        start, end = value[0], value[1]
+    start = parse_duration_to_minutes(str(start).strip())
+    end = parse_duration_to_minutes(str(end).strip())
+    if end <= start:
+        return None
+    return start, end
+
+def parse_working_hours(salon_data):
+    """
+    Рабочие часы салона по дням недели из деталей салона (поле
+    "opening_hours" или "working_hours"):
+      {"monday": {"open": "10:00", "close": "18:00"}, "sunday": null, ...}
+      [{"day": "monday", "open": "10:00", "close": "18:00"}, ...]
+    Возвращает {weekday (0 = пн): (open_min, close_min) или None (выходной)}.
+    Дни, о которых ничего не сказано, в результат не попадают.
+    """
+    raw = salon_data.get("opening_hours") or salon_data.get("working_hours")
+    result = {}
+    if isinstance(raw, dict):
+        items = raw.items()
+    elif isinstance(raw, list):
+        items = [(item.get("day", item.get("weekday")), item) for item in raw if isinstance(item, dict)]
+    else:
+        return result
+    for day, value in items:
+        weekday = _parse_weekday(day)
+        if weekday is not None:
+            result[weekday] = _parse_open_close(value)
+    return result
+
+def working_hours_for_date(schedule, date_str, default_hours):
+    """
+    Часы, в которые в этот день можно начать запись: от часа открытия до
+    последнего часа перед закрытием. schedule — результат parse_working_hours
+    (Salon.schedule). Выходной — []. Нет данных — default_hours.
+    """
+    try:
+        weekday = datetime.strptime(date_str, "%Y-%m-%d").weekday()
+    except ValueError:
+        return list(default_hours)
+    if weekday not in schedule:
+        return list(default_hours)
+    if schedule[weekday] is None:
+        return []
+    open_min, close_min = schedule[weekday]
+    return list(range(open_min // 60, (close_min - 1) // 60 + 1))
@@ -0,0 +1,97 @@
+# utils/gallery.py
+# Галерея мастеров за один-два вызова API вместо сообщения на каждого
+# мастера (telegram_barbersMod):
+#   "media_group" — альбом sendMediaGroup (по 10 фото) + одна клавиатура;
+#   "collage"     — одна картинка с пронумерованными плитками и клавиатурой.
+# Фото альбома и готовый коллаж отправляются по file_id (utils/media_cache.py).
+# Коллаж собирается один раз на салон и версию каталога: ключ кэша зависит
+# от мастеров (id, имя, URL фото) и версий их фотографий. Плитки берутся из
+# кэша миниатюр, сборка идёт в пуле процессов (utils/thumbnails.py).
+import asyncio
+import hashlib
+import logging
+
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest
+
+from config import GALLERY_TILE_SIZE, GALLERY_COLUMNS, GALLERY_FONT_PATH
+from utils.cache import SingleFlight
+from utils.imaging import render_collage
+from utils.media_cache import media_cache, reply_photo_cached
+from utils.thumbnails import thumbnail_service
+
+logger = logging.getLogger(__name__)
+
+# Telegram принимает в альбоме от 2 до 10 фото
+MEDIA_GROUP_LIMIT = 10
+
+_LABEL_HEIGHT = 40
+_collage_flight = SingleFlight("collage")
+
+def barber_label(index, barber):
+    return f"{index}. {barber.name}"
+
+async def send_album(message, barbers):
+    """Фото мастеров альбомами по 10; мастера без фото пропускаются."""
+    with_photo = [(i, b) for i, b in enumerate(barbers, 1) if b.avatar]
+    lookups = await asyncio.gather(*(media_cache.lookup(b.avatar) for _, b in with_photo))
+    for start in range(0, len(with_photo), MEDIA_GROUP_LIMIT):
+        chunk = with_photo[start:start + MEDIA_GROUP_LIMIT]
+        chunk_lookups = lookups[start:start + MEDIA_GROUP_LIMIT]
+        if len(chunk) == 1:
+            i, barber = chunk[0]
+            await reply_photo_cached(message, barber.avatar, caption=barber_label(i, barber))
+            continue
+        media = [
+            InputMediaPhoto(file_id or barber.avatar, caption=barber_label(i, barber))
+            for (i, barber), (file_id, _) in zip(chunk, chunk_lookups)
+        ]
+        try:
+            sent = await message.reply_media_group(media)
+        except BadRequest as e:
+            if not any(file_id for file_id, _ in chunk_lookups):
+                raise
+            # Какой-то file_id устарел — сбрасываем кэш альбома и шлём по URL
+            logger.warning("Cached album rejected: %s", e)
+            for _, barber in chunk:
+                media_cache.invalidate(barber.avatar)
+            chunk_lookups = [(None, version) for _, version in chunk_lookups]
+            sent = await message.reply_media_group([
+                InputMediaPhoto(barber.avatar, caption=barber_label(i, barber))
+                for i, barber in chunk
+            ])
+        for (_, barber), (file_id, version), msg in zip(chunk, chunk_lookups, sent):
+            if not file_id and msg and msg.photo:
+                media_cache.remember(barber.avatar, version, msg.photo[-1].file_id)
+
+async def _build_collage(barbers):
+    tile = GALLERY_TILE_SIZE
+    tiles = await thumbnail_service.get_many([b.avatar for b in barbers], (tile, tile), crop=True)
+    labels = [barber_label(i, b) for i, b in enumerate(barbers, 1)]
+    return await thumbnail_service.run(
+        render_collage, tiles, labels, tile, GALLERY_COLUMNS, GALLERY_FONT_PATH, _LABEL_HEIGHT
+    )
+
+async def collage_version(salon_id, barbers):
+    versions = await asyncio.gather(*(media_cache.version(b.avatar) for b in barbers))
+    digest = hashlib.sha256(repr([
+        (b.id, b.name, b.avatar, v) for b, v in zip(barbers, versions)
+    ]).encode()).hexdigest()[:16]
+    return f"collage:{salon_id}", digest
+
+async def send_collage(message, salon_id, barbers, **kwargs):
+    """Коллаж мастеров одним фото (kwargs — caption, reply_markup и т.п.)."""
+    key, version = await collage_version(salon_id, barbers)
+    file_id = media_cache.get(key, version)
+    if file_id:
+        try:
+            return await message.reply_photo(photo=file_id, **kwargs)
+        except BadRequest as e:
+            logger.warning("Cached collage %s rejected: %s", key, e)
+            media_cache.invalidate(key)
+    # Одновременные просмотры одного салона собирают коллаж один раз
+    data = await _collage_flight.do((key, version), lambda: _build_collage(barbers))
+    sent = await message.reply_photo(photo=data, **kwargs)
+    if sent and sent.photo:
+        media_cache.remember(key, version, sent.photo[-1].file_id)
+    return sent
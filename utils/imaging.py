@@ -0,0 +1,61 @@
+# utils/imaging.py
+# Обработка картинок для пула процессов (utils/thumbnails.py): функции
+# принимают и возвращают байты, PIL загружается только в рабочем процессе.
+import io
+
+def resize_image(data, size, crop=False, quality=85):
+    """
+    JPEG-миниатюра: crop=False — вписать в size с сохранением пропорций,
+    crop=True — заполнить size целиком, обрезав края.
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    # JPEG декодируется сразу в уменьшенном масштабе (не меньше size)
+    image.draft("RGB", size)
+    image = image.convert("RGB")
+    if crop:
+        image = ImageOps.fit(image, size)
+    else:
+        image.thumbnail(size)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+def _load_font(path, size):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default(size=size)
+
+def render_collage(images, labels, tile, columns, font_path, label_height=40, quality=85):
+    """
+    Коллаж: плитки tile x tile с подписью снизу, columns в ряд. images —
+    байты квадратных миниатюр (None — серая плитка). Возвращает JPEG.
+    """
+    from PIL import Image, ImageDraw
+
+    columns = max(1, min(columns, len(labels)))
+    rows = (len(labels) + columns - 1) // columns
+    cell_height = tile + label_height
+    canvas = Image.new("RGB", (columns * tile, rows * cell_height), "white")
+    draw = ImageDraw.Draw(canvas)
+    font = _load_font(font_path, label_height // 2)
+    for n, (data, label) in enumerate(zip(images, labels)):
+        x, y = (n % columns) * tile, (n // columns) * cell_height
+        photo = None
+        if data:
+            try:
+                photo = Image.open(io.BytesIO(data)).convert("RGB")
+                if photo.size != (tile, tile):
+                    photo = photo.resize((tile, tile))
+            except OSError:
+                photo = None
+        if photo is None:
+            photo = Image.new("RGB", (tile, tile), (220, 220, 220))
+        canvas.paste(photo, (x, y))
+        draw.text((x + 8, y + tile + label_height // 4), label, fill="black", font=font)
+    output = io.BytesIO()
+    canvas.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
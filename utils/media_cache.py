@@ -0,0 +1,169 @@
+# utils/media_cache.py
+# Кэш file_id Telegram для фотографий мастеров. Первая отправка идёт по URL
+# (Telegram сам скачивает и обрабатывает картинку), дальше — по file_id из
+# ответа: без скачивания с reservon.am и без повторной обработки.
+#
+# Запись привязана к версии картинки: ETag, Last-Modified + размер или, если
+# сервер их не отдаёт, sha256 содержимого. Версия перепроверяется раз в
+# MEDIA_REVALIDATE_TTL секунд (в фоне, как каталог в utils/api.py); новая
+# версия или BadRequest на отправке по file_id сбрасывают запись.
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+import httpx
+from telegram.error import BadRequest
+
+from config import MEDIA_REVALIDATE_TTL, CATALOG_MAX_ENTRIES
+from utils.api import get_client
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FILE_ID_NAMESPACE = "file_id"
+
+# Картинки, скачанные ради версии (сервер без ETag и Last-Modified), ненадолго
+# остаются в памяти: utils/thumbnails.py берёт их, а не скачивает второй раз
+BODY_TTL = 60
+BODY_MAX_ENTRIES = 16
+
+async def fetch_media_version(url):
+    """
+    (версия, содержимое или None) картинки по URL; httpx.HTTPError, если
+    сервер недоступен. Содержимое есть, только если картинку пришлось скачать.
+    """
+    r = await get_client().head(url)
+    if r.is_success:
+        etag = r.headers.get("etag")
+        if etag:
+            return etag, None
+        modified = r.headers.get("last-modified")
+        if modified:
+            return f"{modified}|{r.headers.get('content-length', '')}", None
+    r = await get_client().get(url)
+    r.raise_for_status()
+    return "sha256:" + hashlib.sha256(r.content).hexdigest(), r.content
+
+class MediaCache:
+    """
+    Ключ (URL картинки или ключ сгенерированной картинки, см. utils/gallery.py)
+    -> {"version", "file_id", "ts"}; сохраняется в StateStorage, если
+    подключено. Не больше max_entries записей: сверх лимита вытесняются
+    самые давно использованные (LRU, как в SessionStore).
+    """
+
+    def __init__(self, revalidate_ttl, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # старые — в начале
+        self._versions = TTLCache(
+            "media_versions", revalidate_ttl, revalidate_ttl, max_entries=max_entries
+        )
+        self._bodies = TTLCache("media_bodies", BODY_TTL, max_entries=BODY_MAX_ENTRIES)
+        self._storage = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def attach(self, storage):
+        self._storage = storage
+        # Порядок после перезапуска — по времени сохранения (ts)
+        saved = sorted(storage.load(FILE_ID_NAMESPACE).items(), key=lambda item: item[1].get("ts", 0))
+        self._entries.update(saved)
+        self._evict()
+
+    async def version(self, url):
+        """Версия картинки по URL (из памяти, перепроверяется раз в revalidate_ttl)."""
+        if not url:
+            return None
+        try:
+            return await self._versions.get(url, lambda: self._fetch_version(url))
+        except httpx.HTTPError:
+            # Ошибка не кэшируется (TTLCache её только логирует): следующий
+            # показ спросит сервер снова, а при фоновой перепроверке остаётся
+            # прежняя версия
+            return None
+
+    async def _fetch_version(self, url):
+        version, content = await fetch_media_version(url)
+        if content is not None:
+            self._bodies.set(url, (version, content))
+        return version
+
+    def take_content(self, url, version):
+        """Картинка, скачанная при проверке этой версии, или None; отдаётся один раз."""
+        entry = self._bodies.peek(url)
+        if entry is None or entry[0] != version:
+            return None
+        self._bodies.invalidate(url)
+        return entry[1]
+
+    def get(self, key, version):
+        """file_id, сохранённый для этой версии, или None (устаревшая запись удаляется)."""
+        entry = self._entries.get(key)
+        # Версию узнать не удалось — Telegram её тоже не скачает; берём что есть
+        if entry is not None and (version is None or entry["version"] == version):
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry["file_id"]
+        if entry is not None:
+            self.invalidate(key)
+        self.misses += 1
+        return None
+
+    async def lookup(self, url):
+        """(file_id или None, текущая версия картинки)."""
+        version = await self.version(url)
+        return self.get(url, version), version
+
+    def remember(self, key, version, file_id):
+        entry = {"version": version, "file_id": file_id, "ts": time.time()}
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if self._storage is not None:
+            self._storage.put(FILE_ID_NAMESPACE, key, entry)
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            if self._storage is not None:
+                self._storage.delete(FILE_ID_NAMESPACE, key)
+
+    def invalidate(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+            if self._storage is not None:
+                self._storage.delete(FILE_ID_NAMESPACE, key)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "versions": self._versions.stats(),
+        }
+
+media_cache = MediaCache(MEDIA_REVALIDATE_TTL, CATALOG_MAX_ENTRIES * 16)
+
+async def reply_photo_cached(message, url, **kwargs):
+    """message.reply_photo по file_id из кэша; при его отсутствии или ошибке — по URL."""
+    file_id, version = await media_cache.lookup(url)
+    if file_id:
+        try:
+            return await message.reply_photo(photo=file_id, **kwargs)
+        except BadRequest as e:
+            logger.warning("Cached file_id for %s rejected: %s", url, e)
+            media_cache.invalidate(url)
+    sent = await message.reply_photo(photo=url, **kwargs)
+    if sent and sent.photo:
+        media_cache.remember(url, version, sent.photo[-1].file_id)
+    return sent
+
+def get_media_stats():
+    return media_cache.stats()
@@ -0,0 +1,160 @@
+# utils/models.py
+# Модели каталога салонов. JSON от API разбирается в них один раз при
+# обновлении кэша (utils/api.py); индексы по id и категориям строятся там же,
+# поэтому поиск мастера, услуги или салона в хендлерах — O(1).
+# Объекты общие для всех пользователей: изменять их в хендлерах нельзя.
+import hashlib
+
+from utils.functions import parse_duration_to_minutes, parse_working_hours
+
+class Service:
+    __slots__ = ("id", "name", "category", "duration")
+
+    def __init__(self, id, name, category, duration):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.duration = duration  # минуты
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("id"),
+            data.get("name", ""),
+            data.get("category"),
+            parse_duration_to_minutes(data.get("duration")),
+        )
+
+    def __repr__(self):
+        return f"Service(id={self.id!r}, name={self.name!r})"
+
+class Barber:
+    __slots__ = ("id", "name", "description", "avatar", "categories", "services")
+
+    def __init__(self, id, name, description, avatar, categories, services):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.avatar = avatar
+        self.categories = categories  # frozenset id категорий (режим category)
+        self.services = services      # собственные услуги мастера (режим barber)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("id"),
+            data.get("name") or "Без имени",
+            data.get("description") or "",
+            data.get("avatar"),
+            frozenset(data.get("categories") or ()),
+            tuple(Service.from_dict(s) for s in data.get("barber_services") or ()),
+        )
+
+    def __repr__(self):
+        return f"Barber(id={self.id!r}, name={self.name!r})"
+
+class Salon:
+    """
+    Салон с мастерами и услугами. Индексы:
+      barbers_by_id / services_by_id — по строковому id (как в callback_data);
+      services_by_category — категория -> услуги в порядке каталога;
+      barber_services — id мастера -> доступные ему услуги.
+    Элементы списка салонов (get_salons) — тоже Salon, но без мастеров и услуг.
+    """
+    __slots__ = (
+        "id", "name", "mod", "appointment_mod", "barbers_mod", "schedule",
+        "barbers", "services",
+        "barbers_by_id", "services_by_id", "services_by_category", "barber_services",
+        "_digests",
+    )
+
+    def __init__(self, id, name, mod="category", appointment_mod="handler",
+                 barbers_mod="with_images", schedule=None, barbers=(), services=()):
+        self.id = id
+        self.name = name
+        self.mod = mod
+        self.appointment_mod = appointment_mod
+        self.barbers_mod = barbers_mod
+        self.schedule = schedule or {}  # см. utils/functions.parse_working_hours
+        self.barbers = barbers
+        self.services = services
+
+        self.barbers_by_id = {str(b.id): b for b in barbers}
+        self.services_by_id = {str(s.id): s for s in services}
+        by_category = {}
+        for service in services:
+            by_category.setdefault(service.category, []).append(service)
+        self.services_by_category = {c: tuple(items) for c, items in by_category.items()}
+        if mod == "barber":
+            self.barber_services = {str(b.id): b.services for b in barbers}
+        else:
+            self.barber_services = {
+                str(b.id): tuple(s for s in services if s.category in b.categories)
+                for b in barbers
+            }
+        self._digests = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("id"),
+            data.get("name", ""),
+            mod=data.get("mod") or "category",
+            appointment_mod=data.get("appointment_mod") or "handler",
+            barbers_mod=data.get("telegram_barbersMod") or "with_images",
+            schedule=parse_working_hours(data),
+            barbers=tuple(Barber.from_dict(b) for b in data.get("barbers") or ()),
+            services=tuple(Service.from_dict(s) for s in data.get("services") or ()),
+        )
+
+    def barber(self, barber_id):
+        if barber_id is None:
+            return None
+        return self.barbers_by_id.get(str(barber_id))
+
+    def services_for_barber(self, barber_id):
+        """
+        Услуги, доступные у мастера. Режим салона "barber" — собственные услуги
+        мастера, режим "category" — услуги салона из категорий мастера.
+        Без мастера («любой мастер») — все услуги салона.
+        """
+        if barber_id is None:
+            return () if self.mod == "barber" else self.services
+        return self.barber_services.get(str(barber_id), ())
+
+    def services_digest(self, barber_id):
+        """
+        Отпечаток (32 бита) списка services_for_barber: id услуг по порядку.
+        Меняется, если услугу добавили, удалили или переставили.
+        """
+        key = None if barber_id is None else str(barber_id)
+        digest = self._digests.get(key)
+        if digest is None:
+            ids = ",".join(str(s.id) for s in self.services_for_barber(barber_id))
+            digest = int.from_bytes(hashlib.blake2b(ids.encode(), digest_size=4).digest(), "big")
+            self._digests[key] = digest
+        return digest
+
+    def __repr__(self):
+        return f"Salon(id={self.id!r}, name={self.name!r})"
+
+class SalonList:
+    """Список салонов (порядок API) с индексом по id."""
+    __slots__ = ("salons", "by_id")
+
+    def __init__(self, salons):
+        self.salons = salons
+        self.by_id = {str(s.id): s for s in salons}
+
+    @classmethod
+    def from_list(cls, data):
+        return cls(tuple(Salon.from_dict(s) for s in data or ()))
+
+    def get(self, salon_id):
+        return self.by_id.get(str(salon_id))
+
+    def __iter__(self):
+        return iter(self.salons)
+
+    def __len__(self):
+        return len(self.salons)
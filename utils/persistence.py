@@ -0,0 +1,77 @@
+# utils/persistence.py
+import json
+from telegram.ext import BasePersistence, PersistenceInput
+from utils.storage import StateStorage
+
+class StoragePersistence(BasePersistence):
+    """
+    Persistence для PTB поверх StateStorage: состояния ConversationHandler,
+    user_data, chat_data и bot_data переживают перезапуск процесса.
+    Обновления только буферизуются — на диск их пачкой пишет StateStorage.
+    """
+
+    def __init__(self, storage: StateStorage, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(
+                bot_data=True, chat_data=True, user_data=True, callback_data=False
+            ),
+            update_interval=update_interval,
+        )
+        self.storage = storage
+
+    @staticmethod
+    def _conversation_namespace(name):
+        return f"conversation:{name}"
+
+    async def get_user_data(self):
+        return {int(key): value for key, value in self.storage.load("user_data").items()}
+
+    async def get_chat_data(self):
+        return {int(key): value for key, value in self.storage.load("chat_data").items()}
+
+    async def get_bot_data(self):
+        return self.storage.load("bot_data").get("bot_data", {})
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        saved = self.storage.load(self._conversation_namespace(name))
+        return {tuple(json.loads(key)): state for key, state in saved.items()}
+
+    async def update_conversation(self, name, key, new_state):
+        namespace = self._conversation_namespace(name)
+        if new_state is None:
+            self.storage.delete(namespace, json.dumps(list(key)))
+        else:
+            self.storage.put(namespace, json.dumps(list(key)), new_state)
+
+    async def update_user_data(self, user_id, data):
+        self.storage.put("user_data", user_id, data)
+
+    async def update_chat_data(self, chat_id, data):
+        self.storage.put("chat_data", chat_id, data)
+
+    async def update_bot_data(self, data):
+        self.storage.put("bot_data", "bot_data", data)
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_user_data(self, user_id):
+        self.storage.delete("user_data", user_id)
+
+    async def drop_chat_data(self, chat_id):
+        self.storage.delete("chat_data", chat_id)
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        await self.storage.flush()
@@ -0,0 +1,257 @@
+# utils/ratelimit.py
+import asyncio
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты очереди: ответы пользователю идут раньше массовых отправок
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+# Методы, которые по умолчанию считаются массовыми (галерея мастеров)
+BULK_ENDPOINTS = frozenset({"sendPhoto", "sendMediaGroup"})
+
+# Как часто удалять корзины чатов, которые давно полные (секунды)
+_PRUNE_INTERVAL = 60
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def delay(self, now):
+        """Через сколько секунд будет доступен токен (0 — уже есть)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, seconds, now):
+        """Следующий токен — не раньше чем через seconds."""
+        self.delay(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+class _Waiter:
+    __slots__ = ("chat_id", "future")
+
+    def __init__(self, chat_id, future):
+        self.chat_id = chat_id
+        self.future = future
+
+class PriorityRateLimiter(BaseRateLimiter):
+    """
+    Планировщик исходящих запросов ExtBot (ApplicationBuilder.rate_limiter):
+
+    - общий лимит global_per_second и лимит на чат — chat_per_second для
+      личных чатов, group_per_minute для групп и каналов (запас chat_burst);
+    - запросы ждут в очередях по приоритету: interactive (по умолчанию) идут
+      раньше bulk (sendPhoto, sendMediaGroup или rate_limit_args={"priority": "bulk"});
+      запрос, чей чат исчерпал лимит, не задерживает запросы других чатов;
+    - после RetryAfter на указанное время приостанавливается отправка в этот
+      чат (для запросов без chat_id — вся отправка), а запрос повторяется
+      (до max_retries раз) первым в своей очереди.
+
+    Лимиты действуют в пределах процесса; в многопроцессном режиме общий
+    лимит делится между рабочими (main.run_front).
+    """
+
+    def __init__(self, global_per_second=30, chat_per_second=1, chat_burst=3,
+                 group_per_minute=20, max_retries=3):
+        self.global_per_second = global_per_second
+        self.chat_per_second = chat_per_second
+        self.chat_burst = chat_burst
+        self.group_per_minute = group_per_minute
+        self.max_retries = max_retries
+        self._global = None
+        self._chats = {}  # chat_id -> TokenBucket
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self._paused_until = 0.0
+        self._pruned_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        self.sent = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.queued_total = 0
+        self.retries = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def initialize(self):
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for queue in self._queues.values():
+            while queue:
+                queue.popleft().future.cancel()
+
+    @staticmethod
+    def _priority(endpoint, rate_limit_args):
+        if isinstance(rate_limit_args, dict) and "priority" in rate_limit_args:
+            priority = rate_limit_args["priority"]
+            return PRIORITY_BULK if priority in (PRIORITY_BULK, "bulk") else PRIORITY_INTERACTIVE
+        return PRIORITY_BULK if endpoint in BULK_ENDPOINTS else PRIORITY_INTERACTIVE
+
+    def _bucket(self, chat_id, now):
+        if chat_id is None:
+            return None
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательный id или @username — группа/канал
+            if isinstance(chat_id, int) and chat_id > 0:
+                rate = self.chat_per_second
+            else:
+                rate = self.group_per_minute / 60
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now):
+        self._pruned_at = now
+        for chat_id in [c for c, b in self._chats.items() if b.delay(now) == 0 and b.tokens >= b.capacity]:
+            del self._chats[chat_id]
+
+    def _release(self, now):
+        """
+        Выпускает все запросы, для которых есть токены. Возвращает, через
+        сколько секунд проверить снова, или None, если очереди пусты.
+        """
+        if now - self._pruned_at > _PRUNE_INTERVAL:
+            self._prune(now)
+        while True:
+            if not any(self._queues.values()):
+                return None
+            if self._paused_until > now:
+                return self._paused_until - now
+            delay = self._global.delay(now)
+            if delay > 0:
+                return delay
+            blocked = set()  # чаты без токенов: их запросы дальше не проверяем
+            chosen = None
+            soonest = None
+            for queue in self._queues.values():
+                for i, waiter in enumerate(queue):
+                    if waiter.chat_id in blocked:
+                        continue
+                    bucket = self._bucket(waiter.chat_id, now)
+                    wait = bucket.delay(now) if bucket else 0.0
+                    if wait == 0:
+                        chosen = (queue, i, waiter, bucket)
+                        break
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    blocked.add(waiter.chat_id)
+                if chosen:
+                    break
+            if chosen is None:
+                return soonest
+            queue, i, waiter, bucket = chosen
+            del queue[i]
+            if waiter.future.done():  # запрос отменён, пока ждал
+                continue
+            self._global.take()
+            if bucket:
+                bucket.take()
+            waiter.future.set_result(None)
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._release(time.monotonic())
+            if delay is None:
+                await self._wakeup.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _acquire(self, priority, chat_id, retry):
+        now = time.monotonic()
+        if self._global is None:
+            self._global = TokenBucket(self.global_per_second, self.global_per_second, now)
+        await self.initialize()
+
+        queue = self._queues[priority]
+        # Быстрый путь: очередь пуста и токены есть
+        if not any(self._queues.values()) and self._paused_until <= now and self._global.delay(now) == 0:
+            bucket = self._bucket(chat_id, now)
+            if bucket is None or bucket.delay(now) == 0:
+                self._global.take()
+                if bucket:
+                    bucket.take()
+                return
+
+        waiter = _Waiter(chat_id, asyncio.get_running_loop().create_future())
+        if retry:
+            queue.appendleft(waiter)
+        else:
+            queue.append(waiter)
+        self.queued_total += 1
+        self._wakeup.set()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            waiter.future.cancel()
+            raise
+        wait = time.monotonic() - now
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def _pause(self, chat_id, seconds):
+        now = time.monotonic()
+        bucket = self._bucket(chat_id, now)
+        if bucket is not None:
+            # Лимит чата: остальные чаты продолжают получать сообщения
+            bucket.pause(seconds, now)
+        else:
+            self._paused_until = max(self._paused_until, now + seconds)
+        self._wakeup.set()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = self._priority(endpoint, rate_limit_args)
+        chat_id = data.get("chat_id")
+        attempt = 0
+        while True:
+            await self._acquire(priority, chat_id, retry=attempt > 0)
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt >= self.max_retries:
+                    self.failed += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.warning("%s to %s: flood control, retry %s in %ss",
+                               endpoint, chat_id, attempt, e.retry_after)
+                self._pause(chat_id, float(e.retry_after))
+                continue
+            self.sent[PRIORITY_NAMES[priority]] += 1
+            return result
+
+    def stats(self):
+        waited = self.queued_total
+        return {
+            "queued": {PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()},
+            "sent": dict(self.sent),
+            "queued_total": waited,
+            "avg_wait_ms": round(self.total_wait / waited * 1000, 1) if waited else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "retries": self.retries,
+            "failed": self.failed,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "chats": len(self._chats),
+        }
@@ -1,14 +1,108 @@
 # utils/session.py
+import time
+from collections import OrderedDict
+from config import SESSION_IDLE_TTL, SESSION_MAX_ENTRIES
 from utils.localization import DEFAULT_LANGUAGE
 
-user_session = {}
+SESSION_NAMESPACE = "session"
+
+class _SessionRecord(dict):
+    """Сессия с отметкой времени; сериализуется при сбросе хранилища."""
+
+    def __init__(self, session):
+        super().__init__(data=session, ts=time.time())
+
+class SessionStore:
+    """
+    Сессии пользователей в памяти. Сессия удаляется, если к ней не
+    обращались idle_ttl секунд, а при превышении max_entries вытесняются
+    самые давно использованные (LRU).
+    """
+
+    def __init__(self, idle_ttl, max_entries):
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self._sessions = OrderedDict()  # user_id -> (session, last_access); старые — в начале
+        self.expirations = 0
+        self.evictions = 0
+        self._storage = None
+
+    def attach(self, storage):
+        """
+        Подключает StateStorage: загружает сохранённые сессии (кроме
+        истёкших) и дальше сохраняет каждую использованную сессию.
+        """
+        self._storage = storage
+        now_wall = time.time()
+        now = time.monotonic()
+        saved = sorted(storage.load(SESSION_NAMESPACE).items(), key=lambda item: item[1]["ts"])
+        for user_id, record in saved[-self.max_entries:]:
+            idle = now_wall - record["ts"]
+            if idle > self.idle_ttl:
+                storage.delete(SESSION_NAMESPACE, user_id)
+                continue
+            self._sessions[int(user_id)] = (record["data"], now - idle)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        entry = self._sessions.get(user_id)
+        if entry is not None and now - entry[1] > self.idle_ttl:
+            entry = None
+            self.expirations += 1
+        session = entry[0] if entry is not None else {}
+        self._sessions[user_id] = (session, now)
+        self._sessions.move_to_end(user_id)
+        if self._storage is not None:
+            # Сессию меняют после get(), поэтому помечаем её к сохранению
+            # при каждом обращении; на диск она попадёт при ближайшем сбросе.
+            self._storage.put(SESSION_NAMESPACE, user_id, _SessionRecord(session))
+        self._evict(now)
+        return session
+
+    def peek(self, user_id):
+        """Сессия без продления и создания; None, если её нет или она истекла."""
+        entry = self._sessions.get(user_id)
+        if entry is None or time.monotonic() - entry[1] > self.idle_ttl:
+            return None
+        return entry[0]
+
+    def _evict(self, now):
+        # Порядок — по времени последнего обращения, поэтому достаточно
+        # смотреть на начало словаря.
+        while self._sessions:
+            user_id, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access > self.idle_ttl:
+                self.expirations += 1
+            elif len(self._sessions) > self.max_entries:
+                self.evictions += 1
+            else:
+                break
+            del self._sessions[user_id]
+            if self._storage is not None:
+                self._storage.delete(SESSION_NAMESPACE, user_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        return {
+            "size": len(self._sessions),
+            "max_entries": self.max_entries,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+session_store = SessionStore(SESSION_IDLE_TTL, SESSION_MAX_ENTRIES)
 
 def get_user_language(user_id):
-    return user_session.get(user_id, {}).get("lang", DEFAULT_LANGUAGE)
+    session = session_store.peek(user_id) or {}
+    return session.get("lang", DEFAULT_LANGUAGE)
 
 def set_user_language(user_id, lang_code):
-    user_session.setdefault(user_id, {})
-    user_session[user_id]["lang"] = lang_code
+    session_store.get(user_id)["lang"] = lang_code
 
 def get_session(user_id):
-    return user_session.setdefault(user_id, {})
+    return session_store.get(user_id)
+
+def get_session_stats():
+    return session_store.stats()
@@ -0,0 +1,351 @@
+# utils/sharding.py
+# Многопроцессный режим: N рабочих процессов бота, каждый обслуживает свою
+# часть пользователей (user_id % N), и лёгкий фронт-процесс, который получает
+# обновления (webhook или polling) и пересылает JSON как есть рабочему,
+# владеющему пользователем. Состояния ConversationHandler и сессии живут
+# только в «своём» рабочем процессе; у каждого рабочего свой файл состояния
+# и свои кэши каталога. Упавший рабочий фронт перезапускает (WorkerSupervisor):
+# он продолжает с того же файла состояния.
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+from telegram import Bot, Update
+from tornado.httpserver import HTTPServer
+from tornado.web import Application as WebApplication, RequestHandler
+
+from utils.webhook import SECRET_HEADER
+
+logger = logging.getLogger(__name__)
+
+def update_user_id(data):
+    """
+    user_id отправителя из JSON обновления (message.from, callback_query.from,
+    poll_answer.user ...); для обновлений без пользователя — id чата.
+    """
+    for key, value in data.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        for field in ("from", "user"):
+            user = value.get(field)
+            if isinstance(user, dict) and "id" in user:
+                return user["id"]
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+    return None
+
+def shard_for_update(data, workers):
+    user_id = update_user_id(data)
+    return int(user_id) % workers if user_id is not None else 0
+
+def worker_persistence_path(path, index):
+    """bot_state.sqlite3 -> bot_state.worker0.sqlite3"""
+    if not path:
+        return ""
+    base, ext = os.path.splitext(path)
+    return f"{base}.worker{index}{ext}"
+
+class ShardRouter:
+    """Пересылает обновления рабочим процессам по шарду user_id."""
+
+    def __init__(self, worker_urls, secret_token, retries=5):
+        self.worker_urls = worker_urls
+        self.secret_token = secret_token
+        self.retries = retries
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(10, connect=2))
+        self.forwarded = [0] * len(worker_urls)
+        self.failed = 0
+        # update_id, уже доставленные после подтверждённого offset getUpdates:
+        # при повторной доставке пачки они не пересылаются второй раз
+        self._delivered = set()
+
+    async def forward(self, data, body=None):
+        """Отправляет обновление владельцу; возвращает HTTP-статус рабочего."""
+        shard = shard_for_update(data, len(self.worker_urls))
+        headers = {"Content-Type": "application/json"}
+        if self.secret_token:
+            headers[SECRET_HEADER] = self.secret_token
+        content = body if body is not None else json.dumps(data).encode()
+        r = await self._client.post(self.worker_urls[shard], content=content, headers=headers)
+        if r.status_code == 200:
+            self.forwarded[shard] += 1
+        return r.status_code
+
+    async def forward_batch(self, updates):
+        """
+        Пачка обновлений из getUpdates: внутри шарда — строго по порядку,
+        шарды — параллельно. Неудачную отправку повторяем с паузой; если
+        рабочий так и не принял обновление, остальные обновления его шарда
+        не отправляются. Возвращает последний update_id, до которого
+        (включительно) пачка доставлена целиком, или None — offset сдвигается
+        только до него, остальное Telegram пришлёт снова.
+        """
+        by_shard = {}
+        for data in updates:
+            by_shard.setdefault(shard_for_update(data, len(self.worker_urls)), []).append(data)
+
+        async def send(items):
+            for data in items:
+                if data["update_id"] in self._delivered:
+                    continue
+                for attempt in range(self.retries):
+                    try:
+                        if await self.forward(data) == 200:
+                            self._delivered.add(data["update_id"])
+                            break
+                    except httpx.HTTPError as e:
+                        logger.warning("Forward to worker failed: %s", e)
+                    await asyncio.sleep(min(2 ** attempt, 10))
+                else:
+                    self.failed += 1
+                    logger.error("Update %s not delivered after %s attempts, will retry",
+                                 data["update_id"], self.retries)
+                    return
+
+        await asyncio.gather(*(send(items) for items in by_shard.values()))
+
+        last = None
+        for data in updates:
+            if data["update_id"] not in self._delivered:
+                break
+            last = data["update_id"]
+        if last is not None:
+            self._delivered = {update_id for update_id in self._delivered if update_id > last}
+        return last
+
+    async def worker_health(self):
+        result = []
+        for url in self.worker_urls:
+            try:
+                r = await self._client.get(httpx.URL(url).copy_with(path="/healthz"))
+                result.append(r.json())
+            except (httpx.HTTPError, ValueError):
+                result.append({"status": "down"})
+        return result
+
+    async def wait_ready(self, timeout=60):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            if all(h.get("status") == "ok" for h in await self.worker_health()):
+                return True
+            await asyncio.sleep(0.5)
+        return False
+
+    async def close(self):
+        await self._client.aclose()
+
+    def stats(self):
+        return {"forwarded": list(self.forwarded), "failed": self.failed}
+
+class FrontWebhookHandler(RequestHandler):
+    def initialize(self, router, secret_token):
+        self.router = router
+        self.secret_token = secret_token
+
+    async def post(self):
+        if self.secret_token:
+            received = self.request.headers.get(SECRET_HEADER, "")
+            if not hmac.compare_digest(received.encode(), self.secret_token.encode()):
+                self.set_status(403)
+                return
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            self.set_status(400)
+            return
+        try:
+            status = await self.router.forward(data, self.request.body)
+        except httpx.HTTPError as e:
+            logger.warning("Forward to worker failed: %s", e)
+            status = 502
+        # Не 200 — Telegram повторит доставку позже
+        self.set_status(200 if status == 200 else 502)
+
+class FrontHealthHandler(RequestHandler):
+    def initialize(self, router, supervisor=None):
+        self.router = router
+        self.supervisor = supervisor
+
+    async def get(self):
+        workers = await self.router.worker_health()
+        ok = all(w.get("status") == "ok" for w in workers)
+        self.set_status(200 if ok else 503)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({
+            "status": "ok" if ok else "degraded",
+            "router": self.router.stats(),
+            "workers": workers,
+            "supervisor": self.supervisor.stats() if self.supervisor else None,
+        }, default=str))
+
+def spawn_worker(index, base_port, persistence_path, secret_token, script=None, env=None):
+    """
+    Запускает рабочий процесс index: main.py в режиме webhook без
+    регистрации в Telegram. env — дополнительные переменные окружения.
+    """
+    script = script or os.path.abspath(sys.argv[0])
+    worker_env = dict(
+        os.environ,
+        **(env or {}),
+        BOT_WORKERS="0",
+        WORKER_INDEX=str(index),
+        BOT_MODE="webhook",
+        WEBHOOK_URL="",
+        WEBHOOK_LISTEN="127.0.0.1",
+        WEBHOOK_PORT=str(base_port + index),
+        WEBHOOK_SECRET=secret_token,
+        PERSISTENCE_PATH=worker_persistence_path(persistence_path, index),
+    )
+    return subprocess.Popen([sys.executable, script], env=worker_env)
+
+def spawn_workers(count, base_port, persistence_path, secret_token, script=None, env=None):
+    return [
+        spawn_worker(index, base_port, persistence_path, secret_token, script, env)
+        for index in range(count)
+    ]
+
+class WorkerSupervisor:
+    """
+    Перезапускает завершившиеся рабочие процессы: без этого шард упавшего
+    рабочего остаётся без обработчика (502 в webhook, стоящий offset в
+    polling). Если процесс падает вскоре после запуска, пауза перед
+    следующим перезапуском удваивается (до max_delay).
+    """
+
+    def __init__(self, processes, respawn, min_delay=1.0, max_delay=60.0):
+        self.processes = processes
+        self.respawn = respawn  # index -> новый Popen
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        now = time.monotonic()
+        self.restarts = [0] * len(processes)
+        self._started = [now] * len(processes)
+        self._delay = [min_delay / 2] * len(processes)
+        self._restart_at = [None] * len(processes)
+
+    def check(self, now=None):
+        """Проверяет процессы и перезапускает те, чья пауза истекла."""
+        now = time.monotonic() if now is None else now
+        for index, process in enumerate(self.processes):
+            if process.poll() is None:
+                continue
+            if self._restart_at[index] is None:
+                crashed_early = now - self._started[index] < self.max_delay
+                self._delay[index] = (
+                    min(self._delay[index] * 2, self.max_delay) if crashed_early else self.min_delay
+                )
+                self._restart_at[index] = now + self._delay[index]
+                logger.error("Worker %s exited with code %s, restarting in %.0fs",
+                             index, process.returncode, self._delay[index])
+            if now >= self._restart_at[index]:
+                self.processes[index] = self.respawn(index)
+                self.restarts[index] += 1
+                self._started[index] = now
+                self._restart_at[index] = None
+
+    async def run(self, stop, interval=1.0):
+        while not stop.is_set():
+            self.check()
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return {
+            "restarts": list(self.restarts),
+            "alive": [process.poll() is None for process in self.processes],
+        }
+
+def stop_workers(processes, timeout=15):
+    for process in processes:
+        if process.poll() is None:
+            process.send_signal(signal.SIGTERM)
+    for process in processes:
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def _poll_updates(bot, router, stop):
+    offset = None
+    await bot.delete_webhook()
+    while not stop.is_set():
+        try:
+            updates = await bot.do_api_request(
+                "getUpdates",
+                api_kwargs={"offset": offset, "timeout": 30, "allowed_updates": Update.ALL_TYPES},
+                read_timeout=40,
+            )
+        except Exception as e:
+            logger.warning("getUpdates failed: %s", e)
+            await asyncio.sleep(1)
+            continue
+        if updates:
+            # Недоставленные обновления остаются за offset и придут снова
+            last = await router.forward_batch(updates)
+            if last is not None:
+                offset = last + 1
+
+async def serve_front(token, mode, workers, base_port, secret_token,
+                      listen, port, path, webhook_url=None, max_connections=40,
+                      supervisor=None):
+    """
+    Фронт-процесс: ждёт готовности рабочих и пересылает им обновления,
+    полученные через webhook (mode="webhook") или getUpdates. Работает до
+    SIGINT/SIGTERM. supervisor (WorkerSupervisor) перезапускает упавших
+    рабочих. /healthz показывает пересылку и здоровье рабочих.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    router = ShardRouter(
+        [f"http://127.0.0.1:{base_port + i}{path}" for i in range(workers)], secret_token
+    )
+    if not await router.wait_ready():
+        logger.error("Workers are not ready, starting anyway")
+
+    server = HTTPServer(WebApplication([
+        (path, FrontWebhookHandler, {"router": router, "secret_token": secret_token}),
+        ("/healthz", FrontHealthHandler, {"router": router, "supervisor": supervisor}),
+    ]))
+    server.listen(port, address=listen)
+    logger.warning("Front listener on %s:%s%s, %s workers", listen, port, path, workers)
+
+    supervising = asyncio.ensure_future(supervisor.run(stop)) if supervisor else None
+    bot = Bot(token)
+    try:
+        async with bot:
+            if mode == "webhook":
+                if webhook_url:
+                    await bot.set_webhook(
+                        url=webhook_url.rstrip("/") + path,
+                        secret_token=secret_token or None,
+                        allowed_updates=Update.ALL_TYPES,
+                        max_connections=max_connections,
+                    )
+                await stop.wait()
+            else:
+                poller = asyncio.ensure_future(_poll_updates(bot, router, stop))
+                await stop.wait()
+                poller.cancel()
+    finally:
+        stop.set()
+        if supervising:
+            await supervising
+        server.stop()
+        await router.close()
@@ -0,0 +1,175 @@
+# utils/slots.py
+# Локальный расчёт свободного времени мастера.
+# Свободные минуты дня хранятся битовой маской (int на 1440 бит): бит i
+# установлен, если минута i (от 00:00) свободна. Поиск «N минут подряд»
+# сводится к нескольким сдвигам и AND, без запросов к серверу.
+from functools import lru_cache
+
+MINUTES_PER_DAY = 24 * 60
+DAY_MASK = (1 << MINUTES_PER_DAY) - 1
+
+def hm_to_minutes(hm_str):
+    """"14:20" (или "14։20") -> 860."""
+    h, m = hm_str.replace("։", ":").split(":")
+    return int(h) * 60 + int(m)
+
+def minutes_to_hm(minute):
+    """860 -> "14:20"."""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def _interval_mask(start, end):
+    start = max(0, start)
+    end = min(MINUTES_PER_DAY, end)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+@lru_cache(maxsize=None)
+def _grid_mask(step):
+    mask = 0
+    for minute in range(0, MINUTES_PER_DAY, step):
+        mask |= 1 << minute
+    return mask
+
+def _iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class DayAvailability:
+    """
+    Свободное время одного мастера за один день.
+    step — шаг сетки, по которой можно начинать запись (минуты).
+    """
+
+    __slots__ = ("bits", "step", "_grid", "_runs")
+
+    def __init__(self, bits=0, step=5):
+        self.bits = bits & DAY_MASK
+        self.step = step
+        self._grid = _grid_mask(step)
+        self._runs = {}  # duration -> маска допустимых стартов
+
+    @classmethod
+    def from_intervals(cls, working, busy=(), step=5):
+        """working / busy — пары (начало, конец) в минутах от начала дня."""
+        bits = 0
+        for start, end in working:
+            bits |= _interval_mask(start, end)
+        for start, end in busy:
+            bits &= ~_interval_mask(start, end)
+        return cls(bits, step)
+
+    @classmethod
+    def from_available_minutes(cls, available_minutes, duration, step=5):
+        """
+        Восстанавливает свободные минуты из ответа /salons/availability/
+        ({"14": [0, 20], ...}) для длительности `duration`: каждый старт s
+        означает, что [s, s + duration) свободно. При duration == step
+        результат точный для любой длительности, кратной сетке.
+        """
+        bits = 0
+        for hour, minutes in available_minutes.items():
+            for minute in minutes or []:
+                start = int(hour) * 60 + int(minute)
+                bits |= _interval_mask(start, start + duration)
+        return cls(bits, step)
+
+    def run_mask(self, duration):
+        """Маска минут, с которых свободно `duration` минут подряд (без учёта сетки)."""
+        runs = self._runs.get(duration)
+        if runs is not None:
+            return runs
+        if duration <= 0:
+            runs = self.bits
+        else:
+            # Удвоением получаем серии длины length (степень двойки), затем
+            # перекрывающимся сдвигом добираем до нужной длины.
+            runs = self.bits
+            length = 1
+            while length * 2 <= duration:
+                runs &= runs >> length
+                length *= 2
+            if length < duration:
+                runs &= runs >> (duration - length)
+        self._runs[duration] = runs
+        return runs
+
+    def start_mask(self, duration):
+        return self.run_mask(duration) & self._grid
+
+    def start_minutes(self, duration):
+        """Все допустимые старты (минуты от начала дня) по возрастанию."""
+        return mask_starts(self.start_mask(duration))
+
+    def free_starts_in_hour(self, hour, duration):
+        """Минуты (0-59) часа `hour`, с которых можно начать запись."""
+        return mask_minutes_in_hour(self.start_mask(duration), hour)
+
+    def hours_with_free_run(self, duration, hours=range(24)):
+        """Часы, в которых есть хотя бы один старт на `duration` минут."""
+        return mask_hours(self.start_mask(duration), hours)
+
+    def nearest_start(self, hour, duration):
+        """
+        Ближайшие старты к hour:00 — (до или ровно, после или ровно),
+        в минутах от начала дня; None, если такого нет.
+        """
+        return mask_nearest(self.start_mask(duration), hour * 60)
+
+    def to_available_minutes(self, duration, hours=range(24)):
+        """Ответ в формате /salons/availability/: {"14": [0, 20], ...}."""
+        return {str(h): self.free_starts_in_hour(h, duration) for h in hours}
+
+    def book(self, start, duration):
+        """Отмечает интервал занятым (например, после локального бронирования)."""
+        self.bits &= ~_interval_mask(start, start + duration)
+        self._runs.clear()
+
+def combined_start_mask(segments):
+    """
+    Старты для записи из нескольких последовательных частей booking_details:
+    segments — [(DayAvailability, duration), ...] в порядке выполнения.
+    Каждая часть начинается сразу после предыдущей, у своего мастера.
+    """
+    mask = DAY_MASK
+    offset = 0
+    for day, duration in segments:
+        mask &= day.run_mask(duration) >> offset
+        offset += duration
+    if segments:
+        mask &= segments[0][0]._grid
+    return mask
+
+# Операции над маской стартов (DayAvailability.start_mask, combined_start_mask)
+
+def hours_mask(hours):
+    """Маска минут часов `hours` — чтобы оставить старты только в часы работы салона."""
+    mask = 0
+    for hour in hours:
+        mask |= _interval_mask(int(hour) * 60, int(hour) * 60 + 60)
+    return mask
+
+def mask_starts(mask):
+    return list(_iter_bits(mask))
+
+def mask_minutes_in_hour(mask, hour):
+    """Минуты (0-59) часа `hour` с установленным битом."""
+    return list(_iter_bits((mask >> (hour * 60)) & ((1 << 60) - 1)))
+
+def mask_hours(mask, hours=range(24)):
+    """Часы из `hours`, в которых есть хотя бы один старт."""
+    hour_mask = (1 << 60) - 1
+    return [h for h in hours if (mask >> (h * 60)) & hour_mask]
+
+def mask_nearest(mask, target):
+    """
+    Ближайшие к минуте target старты: (до или ровно, после или ровно);
+    None, если такого нет.
+    """
+    before_mask = mask & ((1 << (target + 1)) - 1)
+    after_mask = mask >> target
+    before = before_mask.bit_length() - 1 if before_mask else None
+    after = target + (after_mask & -after_mask).bit_length() - 1 if after_mask else None
+    return before, after
@@ -0,0 +1,120 @@
+# utils/storage.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+class StateStorage:
+    """
+    Локальное хранилище состояния бота (SQLite в режиме WAL) с отложенной
+    записью: put/delete только запоминают изменения в памяти, а на диск они
+    уходят пачкой, одной транзакцией, раз в `interval` секунд (и при остановке).
+    Значения сериализуются в JSON в момент записи, поэтому можно передавать
+    изменяемые объекты (сессию, user_data) — на диск попадёт их актуальное состояние.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._pending = {}  # (namespace, key) -> объект или None (удаление)
+        self._task = None
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+
+    def load(self, namespace):
+        """Все записи пространства имён: {key: value}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def put(self, namespace, key, value):
+        self._pending[(namespace, str(key))] = value
+
+    def delete(self, namespace, key):
+        self._pending[(namespace, str(key))] = None
+
+    @staticmethod
+    def _serialize(pending):
+        return [
+            (namespace, key, None if value is None else json.dumps(value, ensure_ascii=False, default=str))
+            for (namespace, key), value in pending.items()
+        ]
+
+    def _write(self, items):
+        with self._lock:
+            with self._conn:
+                for namespace, key, value in items:
+                    if value is None:
+                        self._conn.execute(
+                            "DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+                        )
+                    else:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)",
+                            (namespace, key, value)
+                        )
+
+    async def flush(self):
+        if not self._pending:
+            return
+        # Сериализуем в потоке event loop (объекты могут меняться хендлерами),
+        # а запись на диск выполняем в отдельном потоке.
+        pending, self._pending = self._pending, {}
+        try:
+            items = self._serialize(pending)
+            await asyncio.to_thread(self._write, items)
+        except BaseException:
+            # Транзакция откатилась — пачка возвращается в очередь до следующего
+            # сброса; ключи, изменённые за время записи, уже новее и остаются
+            for item_key, value in pending.items():
+                self._pending.setdefault(item_key, value)
+            self.failures += 1
+            raise
+        self.flushes += 1
+        self.written += len(items)
+
+    def start(self, interval):
+        """Запускает периодический сброс на диск (нужен работающий event loop)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop(interval))
+
+    async def _flush_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("State flush failed: %s", e)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "written": self.written,
+            "failures": self.failures,
+        }
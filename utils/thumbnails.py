@@ -0,0 +1,155 @@
+# utils/thumbnails.py
+# Миниатюры картинок по URL вне event loop: асинхронное скачивание,
+# декодирование и уменьшение в пуле процессов (utils/imaging.py) и дисковый
+# кэш с адресацией по содержимому — имя файла это sha256 от URL, размера и
+# sha256 исходной картинки. Индекс (URL, размер) -> (версия, хэш исходника)
+# хранится в StateStorage; версия — ETag/Last-Modified из utils/media_cache.py.
+# Пока картинка не изменилась, повторный показ ничего не скачивает и не
+# пережимает: миниатюра читается с диска.
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from config import THUMBNAIL_CACHE_DIR, THUMBNAIL_WORKERS, THUMBNAIL_CONCURRENCY, THUMBNAIL_QUALITY
+from utils.api import get_client
+from utils.cache import SingleFlight
+from utils.imaging import resize_image
+from utils.media_cache import media_cache
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_NAMESPACE = "thumbnail"
+
+def _lower_priority():
+    # Миниатюры — фоновая работа: процессор в первую очередь у event loop бота
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class ThumbnailService:
+    def __init__(self, cache_dir, workers, concurrency, quality):
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.quality = quality
+        self._pool = None
+        self._index = {}  # "url|WxH|fit" -> {"version", "source"}
+        self._storage = None
+        self._flight = SingleFlight("thumbnail")
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.disk_hits = 0
+        self.downloads = 0
+        self.reused = 0
+        self.encodes = 0
+        self.failures = 0
+
+    def attach(self, storage):
+        self._storage = storage
+        self._index.update(storage.load(THUMBNAIL_NAMESPACE))
+
+    async def run(self, func, *args):
+        """Выполняет func(*args) в пуле процессов (функция и аргументы — picklable)."""
+        if self._pool is None:
+            # spawn: рабочие не наследуют потоки и соединения бота
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_priority,
+            )
+        return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+
+    def _path(self, key, source_hash):
+        name = hashlib.sha256(f"{key}|{source_hash}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, name[:2], name + ".jpg")
+
+    async def get(self, url, size=(128, 128), crop=False):
+        """JPEG-миниатюра картинки или None, если её не удалось получить."""
+        if not url:
+            return None
+        key = f"{url}|{size[0]}x{size[1]}|{'crop' if crop else 'fit'}"
+        return await self._flight.do(key, lambda: self._load(url, tuple(size), crop, key))
+
+    async def get_many(self, urls, size=(128, 128), crop=False):
+        """Миниатюры списка картинок (параллельно, не больше concurrency сразу)."""
+        return await asyncio.gather(*(self.get(url, size, crop) for url in urls))
+
+    async def _load(self, url, size, crop, key):
+        async with self._semaphore:
+            version = await media_cache.version(url)
+            entry = self._index.get(key)
+            if entry is not None and (version is None or entry["version"] == version):
+                data = await asyncio.to_thread(_read, self._path(key, entry["source"]))
+                if data is not None:
+                    self.disk_hits += 1
+                    return data
+
+            # Сервер без ETag/Last-Modified: картинка уже скачана проверкой версии
+            content = media_cache.take_content(url, version)
+            if content is not None:
+                self.reused += 1
+            else:
+                try:
+                    r = await get_client().get(url)
+                    r.raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.warning("Thumbnail download failed for %s: %s", url, e)
+                    self.failures += 1
+                    return None
+                self.downloads += 1
+                content = r.content
+            source_hash = hashlib.sha256(content).hexdigest()
+            path = self._path(key, source_hash)
+            # Та же картинка под новой версией — миниатюра уже на диске
+            data = await asyncio.to_thread(_read, path)
+            if data is None:
+                try:
+                    data = await self.run(resize_image, content, size, crop, self.quality)
+                except OSError as e:  # не картинка или битый файл
+                    logger.warning("Thumbnail encode failed for %s: %s", url, e)
+                    self.failures += 1
+                    return None
+                self.encodes += 1
+                await asyncio.to_thread(_write, path, data)
+
+            entry = {"version": version, "source": source_hash}
+            self._index[key] = entry
+            if self._storage is not None:
+                self._storage.put(THUMBNAIL_NAMESPACE, key, entry)
+            return data
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "indexed": len(self._index),
+            "disk_hits": self.disk_hits,
+            "downloads": self.downloads,
+            "reused": self.reused,
+            "encodes": self.encodes,
+            "failures": self.failures,
+            "inflight": self._flight.stats(),
+        }
+
+thumbnail_service = ThumbnailService(
+    THUMBNAIL_CACHE_DIR, THUMBNAIL_WORKERS, THUMBNAIL_CONCURRENCY, THUMBNAIL_QUALITY
+)
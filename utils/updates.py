@@ -0,0 +1,64 @@
+# utils/updates.py
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка обновлений: одновременно обрабатывается не больше
+    max_concurrent_updates обновлений, но обновления одного пользователя
+    выполняются строго по очереди (быстрые нажатия svc_ не гоняются за одну
+    сессию). Пока обновление ждёт своей очереди, общий лимит оно не занимает.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._user_locks = {}  # user_id -> [Lock, сколько обновлений ждут или выполняются]
+        self.processed = 0
+        self.waited = 0
+
+    @staticmethod
+    def _user_key(update):
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return None
+
+    async def process_update(self, update, coroutine):
+        key = self._user_key(update)
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+        entry = self._user_locks.get(key)
+        if entry is None:
+            entry = self._user_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        if entry[0].locked():
+            self.waited += 1
+        try:
+            async with entry[0]:
+                await super().process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._user_locks[key]
+            self.processed += 1
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def stats(self):
+        return {
+            "max_concurrent_updates": self.max_concurrent_updates,
+            "active_users": len(self._user_locks),
+            "processed": self.processed,
+            "waited": self.waited,
+        }
@@ -0,0 +1,100 @@
+# utils/webhook.py
+# Режим webhook: встроенный HTTP-сервер (tornado) принимает обновления от
+# Telegram и кладёт их в очередь приложения. Кроме пути webhook есть
+# /healthz — для проверок живости и просмотра статистики кэшей и сессий.
+import asyncio
+import hmac
+import json
+import logging
+import signal
+
+from telegram import Update
+from tornado.httpserver import HTTPServer
+from tornado.web import Application as WebApplication, RequestHandler
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class WebhookHandler(RequestHandler):
+    def initialize(self, bot_app, secret_token):
+        self.bot_app = bot_app
+        self.secret_token = secret_token
+
+    async def post(self):
+        if self.secret_token:
+            received = self.request.headers.get(SECRET_HEADER, "")
+            if not hmac.compare_digest(received.encode(), self.secret_token.encode()):
+                self.set_status(403)
+                return
+        try:
+            data = json.loads(self.request.body)
+            update = Update.de_json(data, self.bot_app.bot)
+        except Exception as e:
+            logger.warning("Bad webhook payload: %s", e)
+            self.set_status(400)
+            return
+        if update is not None:
+            await self.bot_app.update_queue.put(update)
+        self.set_status(200)
+
+class HealthHandler(RequestHandler):
+    def initialize(self, bot_app, stats):
+        self.bot_app = bot_app
+        self.stats = stats
+
+    def get(self):
+        status = "ok" if self.bot_app.running else "stopped"
+        body = {"status": status, "update_queue": self.bot_app.update_queue.qsize()}
+        if self.stats:
+            body.update(self.stats())
+        self.set_status(200 if status == "ok" else 503)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(body, default=str))
+
+def make_web_app(application, path, secret_token, stats=None):
+    return WebApplication([
+        (path, WebhookHandler, {"bot_app": application, "secret_token": secret_token}),
+        ("/healthz", HealthHandler, {"bot_app": application, "stats": stats}),
+    ])
+
+async def serve_webhook(application, listen, port, path, secret_token,
+                        webhook_url=None, max_connections=40, stats=None):
+    """
+    Запускает приложение в режиме webhook и работает до SIGINT/SIGTERM.
+    Если webhook_url задан, он регистрируется в Telegram (setWebhook); без
+    него сервер только слушает порт — так удобно отправлять записанные
+    обновления локально (benchmarks/post_updates.py).
+    post_init/post_stop/post_shutdown вызываются здесь же, как в run_polling.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    server = HTTPServer(make_web_app(application, path, secret_token, stats))
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        if webhook_url:
+            await application.bot.set_webhook(
+                url=webhook_url.rstrip("/") + path,
+                secret_token=secret_token or None,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=max_connections,
+            )
+        await application.start()
+        server.listen(port, address=listen)
+        logger.warning("Webhook listener on %s:%s%s", listen, port, path)
+        try:
+            await stop.wait()
+        finally:
+            server.stop()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    if application.post_shutdown:
+        await application.post_shutdown(application)